@@ -0,0 +1,7 @@
+from agentic.analytics.portfolio_cuts import *
+from agentic.analytics.portfolio_store import *
+from agentic.analytics.alm import *
+from agentic.analytics.metrics import *
+from agentic.analytics.ratio_panel import *
+from agentic.analytics.stress import *
+from agentic.analytics.roll_rates import *
@@ -0,0 +1,200 @@
+import re
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Maturity buckets of the RBI ALM/IRS returns, in template order: upper bound and midpoint in years
+BUCKET_UPPER_YEARS = np.array([7 / 365, 14 / 365, 1 / 12, 2 / 12, 3 / 12, 6 / 12, 1.0, 3.0, 5.0, np.inf])
+BUCKET_MIDPOINT_YEARS = np.array([3.5 / 365, 10.5 / 365, 22.5 / 365, 1.5 / 12, 2.5 / 12, 4.5 / 12, 9 / 12, 2.0, 4.0, 7.0])
+
+# RBI liquidity framework for NBFCs: net cumulative negative mismatch in the first three
+# buckets must stay within 10%, 10% and 20% of cumulative outflows
+MISMATCH_LIMITS = np.array([0.10, 0.10, 0.20])
+
+OUTFLOW_LABEL = r"^a\.\s*total outflows"
+INFLOW_LABEL = r"^b\.\s*total inflows"
+MISMATCH_LABEL = r"^c\.\s*mismatch"
+CUMULATIVE_MISMATCH_LABEL = r"^d\.\s*cumulative mismatch"
+
+BUCKET_CODE = re.compile(r"^X\d{3}$")
+ROW_CODE = re.compile(r"^Y\d+$")
+
+@dataclass
+class AlmStatement:
+    """One table of an ALM or IRS return as a row-code × bucket-code matrix"""
+    source_path: str
+    row_codes: List[str]
+    labels: List[str]
+    bucket_codes: List[str]
+    bucket_labels: List[str]
+    values: np.ndarray
+
+    def __post_init__(self):
+        self._row_index = {code: i for i, code in enumerate(self.row_codes)}
+
+    def row(self, code: str) -> np.ndarray:
+        return self.values[self._row_index[code]]
+
+    def find_row(self, pattern: str) -> Optional[str]:
+        """Row code of the first row whose label matches ``pattern`` (case-insensitive)"""
+        regex = re.compile(pattern, re.IGNORECASE)
+        return next((code for code, label in zip(self.row_codes, self.labels) if regex.search(label)), None)
+
+    @property
+    def maturity_columns(self) -> np.ndarray:
+        """Time buckets only; the Total and Non-sensitive columns are excluded"""
+        return np.array([i for i, label in enumerate(self.bucket_labels) if not re.search(r"total|non-sensitive", label, re.IGNORECASE)])
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self.values, index=self.row_codes, columns=self.bucket_codes)
+        frame.insert(0, "particulars", self.labels)
+        return frame
+
+def _build_statement(csv_path: str, grid: np.ndarray, code_row: int, positions: List[int], codes: List[str], rows: List[int]) -> AlmStatement:
+    label_row = next((r for r in range(code_row - 1, -1, -1) if grid[r, positions[0]].strip()), None)
+    bucket_labels = [" ".join(grid[label_row, p].split()) if label_row is not None else code for p, code in zip(positions, codes)]
+    block = pd.DataFrame(grid[rows][:, positions]).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    return AlmStatement(
+        source_path=str(csv_path),
+        row_codes=[grid[r, 1].strip() for r in rows],
+        labels=[" ".join(grid[r, 0].split()) for r in rows],
+        bucket_codes=codes,
+        bucket_labels=bucket_labels,
+        values=np.nan_to_num(block)
+    )
+
+def parse_alm_tables(csv_path: str) -> List[AlmStatement]:
+    """
+    Parse every table of an extracted ALM/IRS sheet.
+
+    A table starts at a row of bucket codes (X010, X020, ...) and holds the rows below it
+    whose second cell is a row code (Y010, ...). The template repeats part of the bucket
+    block to the right; only the first column carrying each bucket code is read.
+    """
+    grid = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False).to_numpy()
+    tables = []
+    current = None
+    for r in range(grid.shape[0]):
+        codes_in_row = [(p, cell.strip()) for p, cell in enumerate(grid[r]) if BUCKET_CODE.match(cell.strip())]
+        if len(codes_in_row) >= 3:
+            if current and current["rows"]:
+                tables.append(_build_statement(csv_path, grid, **current))
+            positions, codes = [], []
+            for p, code in codes_in_row:
+                if code not in codes:
+                    positions.append(p)
+                    codes.append(code)
+            current = {"code_row": r, "positions": positions, "codes": codes, "rows": []}
+        elif current is not None and grid.shape[1] > 1 and ROW_CODE.match(grid[r, 1].strip()):
+            current["rows"].append(r)
+    if current and current["rows"]:
+        tables.append(_build_statement(csv_path, grid, **current))
+    return tables
+
+def load_alm_statement(csv_path: str) -> AlmStatement:
+    """The main statement of an ALM/IRS sheet (the first table)"""
+    tables = parse_alm_tables(csv_path)
+    if not tables:
+        raise ValueError(f"No ALM/IRS table found in {csv_path}")
+    return tables[0]
+
+def _flows(statement: AlmStatement):
+    outflow_code, inflow_code = statement.find_row(OUTFLOW_LABEL), statement.find_row(INFLOW_LABEL)
+    if outflow_code is None or inflow_code is None:
+        raise ValueError(f"Total inflow/outflow rows not found in {statement.source_path}")
+    columns = statement.maturity_columns
+    if len(columns) != len(BUCKET_UPPER_YEARS):
+        raise ValueError(f"Expected {len(BUCKET_UPPER_YEARS)} maturity buckets in {statement.source_path}, found {len(columns)}")
+    return columns, statement.row(inflow_code)[columns], statement.row(outflow_code)[columns]
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.full_like(numerator, np.nan), where=denominator != 0)
+
+def _reported_difference(statement: AlmStatement, pattern: str, computed: np.ndarray, columns: np.ndarray) -> Optional[float]:
+    code = statement.find_row(pattern)
+    return float(np.max(np.abs(statement.row(code)[columns] - computed))) if code else None
+
+def _as_list(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 4) for v in values]
+
+def compute_liquidity_gaps(statement: AlmStatement) -> Dict[str, Any]:
+    """
+    Structural liquidity profile: bucket gaps (inflows - outflows), cumulative gaps,
+    gap-to-outflow ratios and the RBI short-bucket mismatch check. Amounts are in the
+    statement's own units.
+    """
+    columns, inflows, outflows = _flows(statement)
+    gap = inflows - outflows
+    cumulative_gap = np.cumsum(gap)
+    cumulative_outflows = np.cumsum(outflows)
+    cumulative_gap_to_outflow = _ratio(cumulative_gap, cumulative_outflows)
+
+    short_mismatch = np.nan_to_num(-np.minimum(cumulative_gap_to_outflow[:len(MISMATCH_LIMITS)], 0))
+    breaches = short_mismatch > MISMATCH_LIMITS
+    one_year = int(np.searchsorted(BUCKET_UPPER_YEARS, 1.0))
+
+    return {
+        "buckets": [statement.bucket_labels[c] for c in columns],
+        "inflows": _as_list(inflows),
+        "outflows": _as_list(outflows),
+        "gap": _as_list(gap),
+        "cumulative_gap": _as_list(cumulative_gap),
+        "gap_to_outflow": _as_list(_ratio(gap, outflows)),
+        "cumulative_gap_to_outflow": _as_list(cumulative_gap_to_outflow),
+        "one_year_cumulative_gap": float(cumulative_gap[one_year]),
+        "one_year_cumulative_gap_to_outflow": None if np.isnan(cumulative_gap_to_outflow[one_year]) else float(cumulative_gap_to_outflow[one_year]),
+        "short_bucket_mismatch_breaches": [statement.bucket_labels[columns[i]] for i in np.flatnonzero(breaches)],
+        "reconciliation": {
+            "mismatch_max_abs_diff": _reported_difference(statement, MISMATCH_LABEL, gap, columns),
+            "cumulative_mismatch_max_abs_diff": _reported_difference(statement, CUMULATIVE_MISMATCH_LABEL, cumulative_gap, columns)
+        }
+    }
+
+def compute_repricing_gaps(statement: AlmStatement, rate_shock_bp: float = 100.0, horizon_years: float = 1.0) -> Dict[str, Any]:
+    """
+    Repricing gap analysis on an IRS statement: rate-sensitive assets less liabilities
+    per bucket, and the earnings-at-risk estimate of a rate shock over ``horizon_years``.
+    Each bucket inside the horizon reprices at its midpoint, so its gap earns the shock
+    for (horizon - midpoint) years. ``liability_nii_impact`` isolates a cost-of-funds shock.
+    """
+    columns, assets, liabilities = _flows(statement)
+    gap = assets - liabilities
+    shock = rate_shock_bp / 10000.0
+    exposure = np.clip(horizon_years - BUCKET_MIDPOINT_YEARS, 0, None)
+
+    return {
+        "buckets": [statement.bucket_labels[c] for c in columns],
+        "rate_sensitive_assets": _as_list(assets),
+        "rate_sensitive_liabilities": _as_list(liabilities),
+        "repricing_gap": _as_list(gap),
+        "cumulative_repricing_gap": _as_list(np.cumsum(gap)),
+        "rate_shock_bp": rate_shock_bp,
+        "horizon_years": horizon_years,
+        "nii_impact": float(gap @ exposure * shock),
+        "liability_nii_impact": float(-(liabilities @ exposure) * shock),
+        "asset_nii_impact": float(assets @ exposure * shock)
+    }
+
+def find_alm_csvs(csv_paths) -> Dict[str, str]:
+    """Pick the ALM and IRS sheets out of the extracted CSVs by file name"""
+    found = {}
+    for csv_path in csv_paths:
+        stem = Path(csv_path).stem.lower()
+        if "irs" in stem:
+            found.setdefault("irs", str(csv_path))
+        elif "alm" in stem:
+            found.setdefault("alm", str(csv_path))
+    return found
+
+def analyze_alm(csv_paths, rate_shock_bp: float = 100.0) -> Dict[str, Any]:
+    """Liquidity and repricing gap analysis for whichever ALM/IRS sheets are among ``csv_paths``"""
+    found = find_alm_csvs(csv_paths)
+    results = {"sources": found}
+    if "alm" in found:
+        results["structural_liquidity"] = compute_liquidity_gaps(load_alm_statement(found["alm"]))
+    if "irs" in found:
+        results["interest_rate_sensitivity"] = compute_repricing_gaps(load_alm_statement(found["irs"]), rate_shock_bp)
+    return results
@@ -0,0 +1,270 @@
+import re
+import difflib
+import logging
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agentic.analytics.alm import load_alm_statement, find_alm_csvs
+
+# Canonical metric → row labels seen in data-room sheets. "section > label" aliases only
+# match a row under that section heading (e.g. the "Total" row under "Assets").
+METRIC_LABELS = {
+    "total_assets": ["total assets", "assets > total", "balance sheet size"],
+    "total_aum": ["portfolio outstanding", "aum", "total aum", "assets under management", "gross loan portfolio", "loan book"],
+    "loans_and_advances": ["loans and advances", "loans", "advances"],
+    "total_debt": ["borrowings", "total borrowings", "debt", "total debt"],
+    "net_worth": ["net worth", "networth", "total equity", "shareholders funds"],
+    "tier1_capital": ["tier i capital", "tier 1 capital", "tier1 capital"],
+    "cash_and_equivalents": ["cash and cash equivalents", "cash and bank balances", "cash and equivalents"],
+    "interest_income": ["interest income", "income from operations > interest income"],
+    "other_income": ["other income"],
+    "other_operating_income": ["other operating income"],
+    "total_income": ["income > total", "total income", "total revenue"],
+    "net_interest_income": ["net interest income", "nii"],
+    "interest_expense": ["finance cost", "finance costs", "interest expense", "interest expenses"],
+    "operating_expenses": ["operating cost", "operating costs", "operating expenses", "opex"],
+    "provisions": ["provisions", "impairment on financial instruments", "credit cost", "provisions and write offs"],
+    "total_expenses": ["expenditure > total", "total expenses", "total expenditure"],
+    "profit_before_tax": ["pbt", "profit before tax"],
+    "tax": ["tax", "tax expense", "total tax expense"],
+    "profit_after_tax": ["pat", "profit after tax", "net profit"],
+    "gross_npa": ["gross npa", "gnpa", "gross non performing assets", "gross stage 3"],
+    "net_npa": ["net npa", "nnpa", "net non performing assets", "net stage 3"],
+    "stage3_assets": ["stage 3 assets", "stage iii assets", "stage 3"],
+    "operating_branches": ["no of operating branches", "operating branches"],
+    "active_borrowers": ["no of active borrowers", "no of borrowers"],
+    "employees": ["no of employees"],
+    "disbursements": ["value of loan disbursed", "disbursements"],
+    "collections": ["collections"],
+    "secured_share": ["secured %", "secured share", "secured portfolio %"]
+}
+
+# Which statement a metric belongs to, for the associate's financial_data layout
+METRIC_STATEMENTS = {
+    "balance_sheet": {"total_assets", "total_aum", "loans_and_advances", "total_debt", "net_worth", "tier1_capital", "cash_and_equivalents"},
+    "profit_loss": {"interest_income", "other_income", "other_operating_income", "total_income", "net_interest_income", "interest_expense", "operating_expenses", "provisions", "total_expenses", "profit_before_tax", "tax", "profit_after_tax"},
+    "asset_quality": {"gross_npa", "net_npa", "stage3_assets"}
+}
+
+# ALM return rows (Particulars column), read from the statement's Total column
+ALM_METRIC_LABELS = {
+    "equity_capital": ["capital"],
+    "reserves_and_surplus": ["reserves and surplus"],
+    "total_debt": ["borrowings"],
+    "cash": ["cash", "cash in 1 to 30 31 day time bucket"],
+    "balances_with_banks": ["balances with banks"],
+    "investments": ["investments"],
+    "performing_advances": ["advances performing"],
+    "gross_npa": ["gross non performing loans gnpa", "gross non performing loans"],
+    "total_outflows": ["total outflows"],
+    "total_inflows": ["total inflows"]
+}
+
+LABEL_HEADERS = {"particulars", "parameters", "parameter", "metric", "metrics", "item", "items"}
+FUZZY_CUTOFF = 0.88
+
+def normalize_label(label: str) -> str:
+    """Lower-case a row label and drop numbering, units and formula suffixes: '2.Reserves & Surplus (i+ii)' → 'reserves and surplus'"""
+    text = " ".join(str(label).split()).lower()
+    text = re.sub(r"^(\d+\s*\.|\(?[ivx]+\)+|\(?[a-h]\)|[a-h]\.)\s*", "", text)
+    text = re.sub(r"\((?:[ivx+\s]+|[a-h+\s]+|in\s+\w+|rs\.?\s+in\s+\w+|sum of [^)]*)\)", "", text)
+    text = text.replace("&", " and ").replace("-", " ")
+    return " ".join(re.sub(r"[^a-z0-9%]+", " ", text).split())
+
+def fiscal_year(cell: str) -> Optional[str]:
+    """'FY23', 'FY 2023', 'FY2022-23' and '2022-23' → 'FY2023'"""
+    text = str(cell).strip().upper().replace(" ", "")
+    match = re.fullmatch(r"FY(\d{2}|\d{4})(?:[-/](\d{2}|\d{4}))?", text) or re.fullmatch(r"(\d{4})[-/](\d{2})", text)
+    if not match:
+        return None
+    year = match.group(2) or match.group(1)
+    year = int(year)
+    return f"FY{year + 2000 if year < 100 else year}"
+
+def _to_number(cell: str) -> float:
+    text = str(cell).strip().replace(",", "")
+    if text in ("-", "–"):
+        return 0.0  # accounting dash
+    if re.fullmatch(r"\(\d+(\.\d+)?\)", text):
+        text = "-" + text[1:-1]
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+class LabelMatcher:
+    """Resolves row labels to canonical metrics: exact alias first, then a fuzzy match on the bare label"""
+
+    def __init__(self, labels: Dict[str, List[str]] = METRIC_LABELS, cutoff: float = FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self.qualified = {}
+        self.aliases = {}
+        for metric, aliases in labels.items():
+            for alias in aliases:
+                if ">" in alias:
+                    section, label = alias.split(">", 1)
+                    self.qualified[(normalize_label(section), normalize_label(label))] = metric
+                else:
+                    self.aliases[normalize_label(alias)] = metric
+        self._fuzzy_keys = list(self.aliases)
+        self._cache = {}
+
+    def match(self, label: str, section: str = "") -> Optional[str]:
+        key = (normalize_label(section), normalize_label(label))
+        if key not in self._cache:
+            self._cache[key] = self._match(*key)
+        return self._cache[key]
+
+    def _match(self, section: str, label: str) -> Optional[str]:
+        if (section, label) in self.qualified:
+            return self.qualified[(section, label)]
+        if label in self.aliases:
+            return self.aliases[label]
+        close = difflib.get_close_matches(label, self._fuzzy_keys, n=1, cutoff=self.cutoff)
+        return self.aliases[close[0]] if close else None
+
+@dataclass
+class UnresolvedRow:
+    csv_path: str
+    section: str
+    label: str
+    values: Dict[str, float]
+
+@dataclass
+class MetricExtraction:
+    values: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    provenance: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    unresolved: List[UnresolvedRow] = field(default_factory=list)
+    alm: Dict[str, Any] = field(default_factory=dict)
+
+    def add(self, fy: str, metric: str, value: float, source: str) -> bool:
+        """Record a value unless an earlier sheet already supplied it; returns whether it was used"""
+        if np.isnan(value) or metric in self.values.get(fy, {}):
+            return False
+        self.values.setdefault(fy, {})[metric] = float(value)
+        self.provenance.setdefault(fy, {})[metric] = source
+        return True
+
+    def missing(self, metrics: Iterable[str]) -> List[str]:
+        found = {metric for fy_values in self.values.values() for metric in fy_values}
+        return [metric for metric in metrics if metric not in found]
+
+    def apply_label_mapping(self, mapping: Dict[str, str], source: str = "llm_label_mapping") -> int:
+        """Fill metrics from unresolved rows whose label has been mapped (e.g. by the LLM fallback)"""
+        applied = 0
+        remaining = []
+        for row in self.unresolved:
+            metric = mapping.get(row.label)
+            if metric not in METRIC_LABELS:
+                remaining.append(row)
+                continue
+            for fy, value in row.values.items():
+                applied += self.add(fy, metric, value, f"{row.csv_path}: {row.label} ({source})")
+        self.unresolved = remaining
+        return applied
+
+    def derive(self):
+        """Fill metrics that follow arithmetically from extracted ones"""
+        for fy, fy_values in self.values.items():
+            if "interest_income" in fy_values and "interest_expense" in fy_values:
+                self.add(fy, "net_interest_income", fy_values["interest_income"] - fy_values["interest_expense"], "derived: interest_income - interest_expense")
+
+    def to_financial_data(self) -> Dict[str, Any]:
+        """The associate's layout: statement → fiscal year → every metric extracted for that year"""
+        financial_data = {"balance_sheet": {}, "profit_loss": {}, "cash_flow": {}, "asset_quality": {}, "alm_data": {}}
+        for fy in sorted(self.values):
+            fy_values = {**self.values[fy], "fiscal_year": fy}
+            for statement, metrics in METRIC_STATEMENTS.items():
+                if metrics & fy_values.keys():
+                    financial_data[statement][fy] = fy_values
+        if self.alm:
+            financial_data["alm_data"]["latest_return"] = self.alm
+        financial_data["provenance"] = self.provenance
+        return financial_data
+
+def find_label_blocks(grid: np.ndarray) -> List[Tuple[int, int, List[Tuple[int, str]]]]:
+    """(header_row, label_column, [(column, fiscal_year), ...]) for every Particulars-style block with FY columns"""
+    blocks = []
+    for r in range(grid.shape[0]):
+        for c in range(grid.shape[1]):
+            if grid[r, c].strip().lower() not in LABEL_HEADERS:
+                continue
+            fy_columns = []
+            for p in range(c + 1, grid.shape[1]):
+                fy = fiscal_year(grid[r, p])
+                if fy is None:
+                    if grid[r, p].strip() and not fy_columns:
+                        continue
+                    break
+                fy_columns.append((p, fy))
+            if fy_columns:
+                blocks.append((r, c, fy_columns))
+    return blocks
+
+def extract_sheet_metrics(csv_path: str, extraction: MetricExtraction, matcher: LabelMatcher):
+    grid = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False).to_numpy()
+    blocks = find_label_blocks(grid)
+    for index, (header_row, label_column, fy_columns) in enumerate(blocks):
+        # A block runs until the next header in the same column
+        end = next((r for r, c, _ in blocks[index + 1:] if c == label_column and r > header_row), grid.shape[0])
+        section = ""
+        for r in range(header_row + 1, end):
+            label = grid[r, label_column].strip()
+            if not label:
+                continue
+            values = {fy: _to_number(grid[r, p]) for p, fy in fy_columns}
+            if all(np.isnan(v) for v in values.values()):
+                section = label
+                continue
+            metric = matcher.match(label, section)
+            if metric is None:
+                extraction.unresolved.append(UnresolvedRow(str(csv_path), section, label, {fy: v for fy, v in values.items() if not np.isnan(v)}))
+                continue
+            for fy, value in values.items():
+                extraction.add(fy, metric, value, f"{csv_path}: {label}")
+
+def extract_alm_metrics(csv_path: str) -> Dict[str, Any]:
+    """Headline figures from an ALM return's Particulars rows, in the statement's own units"""
+    statement = load_alm_statement(csv_path)
+    total_column = next((i for i, label in enumerate(statement.bucket_labels) if label.strip().lower() == "total"), len(statement.bucket_codes) - 1)
+    matcher = LabelMatcher(ALM_METRIC_LABELS, cutoff=0.95)
+    metrics = {}
+    for code, label, row in zip(statement.row_codes, statement.labels, statement.values):
+        metric = matcher.match(label)
+        if metric and metric not in metrics:
+            metrics[metric] = float(row[total_column])
+            metrics.setdefault("row_codes", {})[metric] = code
+    metrics["source"] = str(csv_path)
+    return metrics
+
+def extract_financial_metrics(csv_paths: Iterable[str], matcher: Optional[LabelMatcher] = None) -> MetricExtraction:
+    """
+    Read financial metrics straight from extracted sheets without an LLM.
+
+    Every "Particulars"/"Parameters" block with fiscal-year columns is scanned; rows are
+    matched against ``METRIC_LABELS`` and labels that cannot be matched are kept in
+    ``unresolved`` for a fallback. The ALM return contributes its Particulars totals.
+    """
+    logger = logging.getLogger("MetricExtractor")
+    matcher = matcher or LabelMatcher()
+    extraction = MetricExtraction()
+    csv_paths = sorted(str(p) for p in csv_paths)
+    for csv_path in csv_paths:
+        if Path(csv_path).suffix.lower() != ".csv":
+            continue
+        try:
+            extract_sheet_metrics(csv_path, extraction, matcher)
+        except Exception as e:
+            logger.warning(f"Could not extract metrics from {csv_path}: {e}")
+    alm_csv = find_alm_csvs(csv_paths).get("alm")
+    if alm_csv:
+        try:
+            extraction.alm = extract_alm_metrics(alm_csv)
+        except Exception as e:
+            logger.warning(f"Could not extract ALM metrics from {alm_csv}: {e}")
+    extraction.derive()
+    return extraction
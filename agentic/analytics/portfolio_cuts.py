@@ -0,0 +1,246 @@
+import re
+import logging
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.base.file_manifest import hash_file
+from agentic.ingestion.excel_engine import parquet_available
+
+PARSER_VERSION = 2
+PORTFOLIO_CACHE_DIR = DEFAULT_CACHE_DIR / "portfolio_cuts"
+
+MONTHS = {m: i for i, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+# Ordered DPD buckets used across every section; amounts are in crores like the source sheets
+DPD_BUCKETS = ["par_1_30_cr", "par_31_60_cr", "par_61_90_cr", "par_91_120_cr", "par_121_150_cr", "par_151_180_cr", "par_181_365_cr", "par_365_plus_cr"]
+
+TEXT_COLUMNS = {"branch_code", "branch_name", "district", "state", "geography", "segment"}
+
+# Exact header labels (lower-cased, whitespace collapsed) → canonical column
+COLUMN_LABELS = {
+    "sn": "sn",
+    "branch code": "branch_code",
+    "mbri_code": "branch_code",
+    "branch name": "branch_name",
+    "branch": "branch_name",
+    "mbri_name": "branch_name",
+    "district": "district",
+    "state": "state",
+    "branch classification rural / urban": "geography",
+    "branch classification": "geography",
+    "number of active loans": "loans",
+    "number of activeloans": "loans",
+    "number of loans": "loans",
+    "no of loans": "loans",
+    "principal outstanding of active loans (in crs)": "principal_outstanding_cr",
+    "total principal outstanding (in crs)": "principal_outstanding_cr",
+    "outstanding princiapl": "principal_outstanding_cr",
+    "standard portfolio with 0 dpd": "standard_cr",
+    "principal without overdues (in crs)": "standard_cr",
+    "no of loans in arrears": "loans_in_arrears",
+    "no of od loans": "loans_in_arrears",
+    "no of loans written off": "loans_written_off",
+    "write offs in the quarter (in crs)": "write_offs_cr",
+    "written off value in the quarter (in crs)": "write_offs_cr",
+    "total par (in crs)": "par_total_cr",
+    "% of portolio": "portfolio_share",
+    "% of portfolio": "portfolio_share",
+    "% of total aum": "portfolio_share",
+    "gnpa %": "gnpa_pct",
+    "npa (par 90)": "gnpa_pct",
+    "par >0 days": "par_0_plus_cr",
+    "% of par >0 days": "par_0_plus_pct",
+    "par >90days": "par_90_plus_cr",
+    "% of par >90 days": "par_90_plus_pct",
+}
+
+# First column after SN → section, for the breakdowns keyed on a segment label
+SEGMENT_SECTIONS = [
+    (r"tenor", "tenor"),
+    (r"ticket", "ticket_size"),
+    (r"\birr\b", "irr"),
+    (r"category", "utilisation"),
+    (r"frequency", "repayment_frequency"),
+    (r"geography", "geography"),
+    (r"product", "product"),
+    (r"cycle", "loan_cycle"),
+    (r"balance sheet", "balance_sheet"),
+    (r"\bltv\b", "ltv"),
+]
+
+def _normalize_label(label: str) -> str:
+    return " ".join(str(label).split()).lower()
+
+def canonical_column(label: str) -> str:
+    normalized = _normalize_label(label)
+    if normalized in COLUMN_LABELS:
+        return COLUMN_LABELS[normalized]
+    bucket = re.match(r"^(\d+)\s*(?:-|to)\s*(\d+)\b", normalized)
+    if bucket:
+        return f"par_{bucket.group(1)}_{bucket.group(2)}_cr"
+    if re.match(r"^>\s*365\b", normalized):
+        return "par_365_plus_cr"
+    return re.sub(r"[^a-z0-9]+", "_", normalized).strip("_")
+
+def month_from_name(name: str) -> Optional[str]:
+    """'portfolio_cuts_Mar25' → '2025-03'; None for sheets without a month token"""
+    match = re.search(r"(?<![a-z])(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s_-]*'?(\d{2}|\d{4})(?!\d)", Path(name).stem.lower())
+    if not match:
+        return None
+    year = int(match.group(2))
+    year = year + 2000 if year < 100 else year
+    return f"{year:04d}-{MONTHS[match.group(1)]:02d}"
+
+def _is_integer_like(value: str) -> bool:
+    return bool(re.fullmatch(r"\d+(\.0+)?", value.strip()))
+
+def _is_total_row(row: np.ndarray) -> bool:
+    # Some blocks number their Total row like a data row ("5,Total,..."), so the label decides, not the SN
+    label = next((cell.strip() for cell in row if cell.strip() and not _is_integer_like(cell)), "")
+    return label.lower() == "total"
+
+@dataclass
+class PortfolioSection:
+    name: str
+    title: str
+    table: pd.DataFrame
+    totals: Dict[str, Any] = field(default_factory=dict)
+
+def _section_title(grid: np.ndarray, header_row: int) -> str:
+    # The title sits in the few rows above the header; notes are long sentences, titles are short
+    for row in range(header_row - 1, max(-1, header_row - 4), -1):
+        cells = [c.strip() for c in grid[row] if c.strip()]
+        if cells and not _is_integer_like(cells[0]) and len(cells[0]) < 60 and not cells[0].startswith("Unnamed"):
+            return cells[0]
+    return ""
+
+def _section_name(columns: List[str], labels: List[str], title: str) -> str:
+    if "branch_code" in columns:
+        return "branch"
+    first_dimension = columns[1] if len(columns) > 1 else ""
+    if first_dimension in ("district", "state"):
+        return first_dimension
+    for text in (_normalize_label(labels[1]) if len(labels) > 1 else "", _normalize_label(title)):
+        for pattern, section in SEGMENT_SECTIONS:
+            if re.search(pattern, text):
+                return section
+    return canonical_column(title) or "section"
+
+def _parse_block(grid: np.ndarray, header_row: int, month: Optional[str]) -> PortfolioSection:
+    header = grid[header_row]
+    column_positions = [i for i, label in enumerate(header) if label.strip()]
+    labels = [header[i] for i in column_positions]
+    columns = [canonical_column(label) for label in labels]
+    title = _section_title(grid, header_row)
+    name = _section_name(columns, labels, title)
+    if name not in ("branch", "district", "state") and len(columns) > 1 and columns[1] not in COLUMN_LABELS.values():
+        columns[1] = "segment"
+    # Keep the first of any duplicated canonical names
+    keep = [i for i, column in enumerate(columns) if column not in columns[:i]]
+    column_positions = [column_positions[i] for i in keep]
+    columns = [columns[i] for i in keep]
+
+    sn_position, label_position = column_positions[0], column_positions[min(1, len(column_positions) - 1)]
+    end = header_row + 1
+    # Rows run while they carry a serial number, or a label where a row was left unnumbered
+    while end < grid.shape[0] and not _is_total_row(grid[end]) and (
+        _is_integer_like(grid[end, sn_position]) or (not grid[end, sn_position].strip() and grid[end, label_position].strip())
+    ):
+        end += 1
+    block = grid[header_row + 1:end][:, column_positions]
+    table = pd.DataFrame(block, columns=columns)
+    for column in columns:
+        if column not in TEXT_COLUMNS:
+            table[column] = pd.to_numeric(table[column].replace("", np.nan), errors="coerce")
+        else:
+            table[column] = table[column].str.strip()
+    if "sn" in table:
+        table["sn"] = table["sn"].astype("Int64")
+    if month is not None:
+        table.insert(0, "month", month)
+
+    totals = {}
+    if end < grid.shape[0] and _is_total_row(grid[end]):
+        for column, position in zip(columns, column_positions):
+            if column not in TEXT_COLUMNS and column != "sn":
+                value = pd.to_numeric(grid[end, position] or np.nan, errors="coerce")
+                if pd.notna(value):
+                    totals[column] = float(value)
+    return PortfolioSection(name=name, title=title, table=table, totals=totals)
+
+def parse_portfolio_sheet(csv_path: str, month: Optional[str] = None) -> Dict[str, PortfolioSection]:
+    """
+    Split one portfolio_cuts sheet into typed section tables.
+
+    Every block whose header row starts with "SN" becomes a DataFrame with canonical
+    columns (branch_code, state, loans, principal_outstanding_cr, par_1_30_cr ... par_365_plus_cr);
+    rows run until the serial number (or, for an unnumbered row, the label) stops or a "Total"
+    row is reached, and that "Total" row is kept as ``totals``.
+    """
+    grid = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False, skip_blank_lines=False).to_numpy()
+    month = month or month_from_name(csv_path)
+    sections = {}
+    first_cells = [next((c.strip() for c in row if c.strip()), "") for row in grid]
+    for header_row, first_cell in enumerate(first_cells):
+        if first_cell.upper() != "SN":
+            continue
+        section = _parse_block(grid, header_row, month)
+        if section.table.empty:
+            continue
+        name = section.name
+        suffix = 2
+        while name in sections:
+            name = f"{section.name}_{suffix}"
+            suffix += 1
+        section.name = name
+        sections[name] = section
+    return sections
+
+def load_portfolio_sections(csv_path: str, cache_dir: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Parsed section tables for a portfolio_cuts CSV, served from a Parquet cache keyed on the
+    CSV's content hash so each sheet is parsed once. Without pyarrow the tables are parsed
+    on every call.
+    """
+    logger = logging.getLogger("PortfolioCuts")
+    content_hash = hash_file(csv_path)
+    cache_path = Path(cache_dir) if cache_dir else PORTFOLIO_CACHE_DIR
+    sheet_dir = cache_path / f"v{PARSER_VERSION}" / content_hash
+    use_parquet = parquet_available()
+
+    if use_parquet and (sheet_dir / "_complete").exists():
+        return {path.stem: pd.read_parquet(path) for path in sorted(sheet_dir.glob("*.parquet"))}
+
+    sections = parse_portfolio_sheet(csv_path)
+    tables = {name: section.table for name, section in sections.items()}
+    if use_parquet:
+        try:
+            sheet_dir.mkdir(parents=True, exist_ok=True)
+            for name, table in tables.items():
+                table.to_parquet(sheet_dir / f"{name}.parquet", index=False)
+            (sheet_dir / "_complete").touch()
+        except Exception as e:
+            logger.warning(f"Could not cache parsed sections for {csv_path}: {e}")
+    return tables
+
+def stack_portfolio_cuts(csv_paths, section: str = "branch") -> pd.DataFrame:
+    """One section stacked across the monthly sheets among ``csv_paths``, ordered by month; undated sheets are skipped"""
+    frames = []
+    for csv_path in sorted(str(path) for path in csv_paths):
+        if month_from_name(csv_path) is None:
+            continue
+        table = load_portfolio_sections(csv_path).get(section)
+        if table is not None:
+            frames.append(table)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values("month", kind="stable").reset_index(drop=True)
+
+def load_portfolio_cuts(directory: str = "extracted_sheets", section: str = "branch", pattern: str = "portfolio_cuts_*.csv") -> pd.DataFrame:
+    """One section stacked across every monthly sheet in ``directory``, ordered by month"""
+    return stack_portfolio_cuts(Path(directory).glob(pattern), section)
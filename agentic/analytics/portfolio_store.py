@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.base.file_manifest import hash_file
+from agentic.ingestion.excel_engine import parquet_available
+from agentic.analytics.portfolio_cuts import DPD_BUCKETS, PARSER_VERSION, load_portfolio_sections, month_from_name
+
+STORE_VERSION = 1
+PORTFOLIO_STORE_DIR = Path(os.getenv("PORTFOLIO_STORE_DIR", str(DEFAULT_CACHE_DIR / "portfolio_store")))
+
+STORE_KEYS = ["month", "state", "district", "branch_code", "branch_name"]
+STORE_MEASURES = ["loans", "loans_in_arrears", "principal_outstanding_cr", "standard_cr", "write_offs_cr", "par_total_cr"] + DPD_BUCKETS
+STORE_COLUMNS = STORE_KEYS + STORE_MEASURES
+
+# Trend measures: (numerator columns, denominator column or None for a plain sum)
+TREND_MEASURES = {
+    "outstanding_cr": (["principal_outstanding_cr"], None),
+    "loans": (["loans"], None),
+    "par_cr": (DPD_BUCKETS, None),
+    "par_pct": (DPD_BUCKETS, "principal_outstanding_cr"),
+    "par_30_pct": (DPD_BUCKETS[1:], "principal_outstanding_cr"),
+    "par_90_pct": (DPD_BUCKETS[3:], "principal_outstanding_cr"),
+    "arrears_loans_pct": (["loans_in_arrears"], "loans")
+}
+
+def _normalize_name(value) -> Optional[str]:
+    return " ".join(str(value).split()).title() if isinstance(value, str) and value.strip() else None
+
+def _store_frame(branch: pd.DataFrame) -> pd.DataFrame:
+    frame = branch.reindex(columns=STORE_COLUMNS)
+    for column in ("state", "district"):
+        frame[column] = frame[column].map(_normalize_name)
+    frame[STORE_KEYS] = frame[STORE_KEYS].astype("string")
+    frame[STORE_MEASURES] = frame[STORE_MEASURES].astype(np.float64)
+    return frame.reset_index(drop=True)
+
+class PortfolioStore:
+    """Columnar month × branch store of the monthly portfolio cuts.
+
+    Each month's branch section is written once as an uncompressed Arrow IPC file,
+    so reads memory-map the columns instead of parsing CSVs. ``append`` only touches
+    sheets whose size/mtime (then hash) changed since they were stored, and a new
+    month adds one file without rewriting the others. Without pyarrow the store
+    keeps the parsed months in memory for the life of the object.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else PORTFOLIO_STORE_DIR / "default"
+        self.logger = logging.getLogger("PortfolioStore")
+        self.persistent = parquet_available()
+        self._lock = threading.RLock()
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self.entries: Dict[str, Dict[str, Any]] = self._read_manifest() if self.persistent else {}
+
+    @classmethod
+    def for_directory(cls, directory: str, root: Optional[str] = None) -> "PortfolioStore":
+        """The store for one extracted-sheets directory, so different data sets never mix"""
+        key = hashlib.sha1(str(Path(directory).resolve()).encode()).hexdigest()[:16]
+        return cls(str((Path(root) if root else PORTFOLIO_STORE_DIR) / key))
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.path / "manifest.json"
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Ignoring unreadable portfolio store manifest {self.manifest_path}: {e}")
+            return {}
+        if manifest.get("version") != STORE_VERSION or manifest.get("parser_version") != PARSER_VERSION:
+            return {}
+        return {month: entry for month, entry in manifest.get("months", {}).items() if (self.path / entry["file"]).exists()}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"version": STORE_VERSION, "parser_version": PARSER_VERSION, "months": self.entries}, indent=1))
+        tmp_path.replace(self.manifest_path)
+
+    def months(self) -> List[str]:
+        return sorted(self.entries)
+
+    def _unchanged(self, csv_path: str, month: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(month)
+        if not entry:
+            return None
+        stat = Path(csv_path).stat()
+        if entry["source"] == csv_path and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry
+        if entry["sha256"] == hash_file(csv_path):
+            entry.update(source=csv_path, size=stat.st_size, mtime=stat.st_mtime)
+            return entry
+        return None
+
+    def _write_month(self, month: str, frame: pd.DataFrame) -> str:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        file_name = f"month={month}.arrow"
+        tmp_path = self.path / f"{file_name}.{os.getpid()}.tmp"
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), tmp_path, compression="uncompressed")
+        tmp_path.replace(self.path / file_name)
+        return file_name
+
+    def append(self, csv_paths) -> Dict[str, List[str]]:
+        """Store the branch section of every dated portfolio_cuts sheet in ``csv_paths`` that is new or changed"""
+        added, unchanged = [], []
+        with self._lock:
+            for csv_path in sorted(str(path) for path in csv_paths):
+                month = month_from_name(csv_path)
+                if month is None or not Path(csv_path).stem.lower().startswith("portfolio_cuts"):
+                    continue
+                if self.persistent and self._unchanged(csv_path, month):
+                    unchanged.append(month)
+                    continue
+                if not self.persistent and month in self._frames:
+                    unchanged.append(month)
+                    continue
+
+                branch = load_portfolio_sections(csv_path).get("branch")
+                if branch is None:
+                    self.logger.warning(f"No branch section in {csv_path}, not stored")
+                    continue
+                frame = _store_frame(branch)
+                if self.persistent:
+                    self.path.mkdir(parents=True, exist_ok=True)
+                    stat = Path(csv_path).stat()
+                    self.entries[month] = {
+                        "file": self._write_month(month, frame),
+                        "source": csv_path,
+                        "sha256": hash_file(csv_path),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        "rows": len(frame)
+                    }
+                else:
+                    self._frames[month] = frame
+                    self.entries[month] = {"source": csv_path, "rows": len(frame)}
+                added.append(month)
+            if added and self.persistent:
+                self._save_manifest()
+        if added:
+            self.logger.info(f"Portfolio store {self.path}: added {len(added)} months, {len(unchanged)} unchanged")
+        return {"added": added, "unchanged": unchanged}
+
+    def arrow_table(self, columns: Optional[List[str]] = None, months: Optional[List[str]] = None):
+        """The stored months as one Arrow table over memory-mapped files (zero-copy; needs pyarrow)"""
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        selected = [m for m in self.months() if months is None or m in months]
+        tables = [feather.read_table(self.path / self.entries[m]["file"], columns=columns, memory_map=True) for m in selected]
+        if not tables:
+            return pa.table({column: pa.array([], type=pa.string() if column in STORE_KEYS else pa.float64()) for column in columns or STORE_COLUMNS})
+        return pa.concat_tables(tables)
+
+    def table(self, columns: Optional[List[str]] = None, months: Optional[List[str]] = None) -> pd.DataFrame:
+        """Stored rows as a DataFrame; only the requested columns are materialised"""
+        columns = list(dict.fromkeys(["month"] + list(columns))) if columns else None
+        if self.persistent:
+            return self.arrow_table(columns, months).to_pandas()
+        selected = [self._frames[m] for m in self.months() if months is None or m in months]
+        if not selected:
+            return pd.DataFrame(columns=columns or STORE_COLUMNS)
+        frame = pd.concat(selected, ignore_index=True)
+        return frame[columns] if columns else frame
+
+    def trend(self, measure: str = "par_pct", by: Optional[str] = "state", months: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        ``measure`` per month (rows) and ``by`` level (columns: state, district or branch_code;
+        None for the whole portfolio). Ratios are summed numerator over summed denominator,
+        so they are balance-weighted at every level.
+        """
+        if measure not in TREND_MEASURES:
+            raise ValueError(f"Unknown trend measure: {measure}")
+        numerators, denominator = TREND_MEASURES[measure]
+        keys = ["month"] + ([by] if by else [])
+        frame = self.table(keys + numerators + ([denominator] if denominator else []), months)
+        frame = frame.assign(_numerator=frame[numerators].sum(axis=1, min_count=1))
+        if denominator:
+            frame["_denominator"] = frame[denominator]
+        sums = frame.groupby(keys, sort=True)[["_numerator"] + (["_denominator"] if denominator else [])].sum(min_count=1)
+        values = sums["_numerator"] / sums["_denominator"].where(sums["_denominator"] > 0) if denominator else sums["_numerator"]
+        if by:
+            return values.unstack(by)
+        return values.rename("portfolio").to_frame()
@@ -0,0 +1,144 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+PANEL_INDEX = ["entity", "fiscal_year"]
+
+PANEL_METRICS = [
+    "total_assets", "total_aum", "total_debt", "tier1_capital", "cash_and_equivalents",
+    "net_interest_income", "operating_expenses", "profit_before_tax", "interest_expense",
+    "other_operating_income", "gross_npa", "net_npa", "provisions", "stage3_assets"
+]
+
+# AssociateAgent.ratio_calculations → the panel columns each one produces
+RATIO_GROUPS = {
+    "debt_to_aum": ["debt_to_aum"],
+    "gnpa_consistency": ["gnpa_percent", "gnpa_stage3_gap"],
+    "stage3_coverage": ["stage3_coverage_ratio"],
+    "interest_coverage": ["interest_coverage"],
+    "roa_decomposition": ["nim", "opex_ratio", "credit_cost", "roa"],
+    "cost_to_income": ["cost_to_income"],
+    "liquidity_coverage": ["cash_to_borrowings"],
+    "sensitivity_analysis": ["tier1_to_assets"],
+    "accounting_red_flags": ["other_income_share"]
+}
+
+# Absolute limits: (lower, upper); a ratio outside them is flagged RED
+THRESHOLDS = {
+    "gnpa_stage3_gap": (-np.inf, 0.01),
+    "stage3_coverage_ratio": (0.5, np.inf),
+    "interest_coverage": (1.5, np.inf),
+    "other_income_share": (-np.inf, 0.2)
+}
+
+# How each peer benchmark bounds a ratio: within ±width of the median, inside the
+# interquartile range, or only on the adverse side of a quartile
+PEER_BANDS = {
+    "debt_to_aum": ("median_band", 0.15),
+    "cost_to_income": ("interquartile", None),
+    "gnpa_percent": ("below_q3", None),
+    "roa": ("above_q1", None),
+    "nim": ("above_q1", None)
+}
+# Benchmarks quoted in percent where the panel ratio is a fraction
+PEER_SCALE = {"roa": 0.01, "nim": 0.01}
+
+def financial_data_rows(financial_data: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Flatten the associate's statement → fiscal year → metrics layout into fiscal year → metrics"""
+    rows = {}
+    for statement in ("balance_sheet", "profit_loss", "cash_flow", "asset_quality"):
+        for fy, values in financial_data.get(statement, {}).items():
+            row = rows.setdefault(fy, {})
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and metric not in row:
+                    row[metric] = float(value)
+    return rows
+
+def build_panel(entities: Dict[str, Dict[str, Dict[str, float]]]) -> pd.DataFrame:
+    """entity → fiscal year → metric values as one frame indexed by (entity, fiscal_year)"""
+    records = [
+        {"entity": entity, "fiscal_year": fy, **values}
+        for entity, years in entities.items()
+        for fy, values in years.items()
+    ]
+    if not records:
+        return pd.DataFrame(columns=PANEL_INDEX + PANEL_METRICS).set_index(PANEL_INDEX)
+    panel = pd.DataFrame.from_records(records).set_index(PANEL_INDEX).sort_index()
+    return panel.reindex(columns=list(dict.fromkeys(PANEL_METRICS + list(panel.columns)))).astype(np.float64)
+
+def _div(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return numerator / denominator.where(denominator != 0)
+
+def compute_ratios(panel: pd.DataFrame) -> pd.DataFrame:
+    """Every ratio for every (entity, fiscal_year) row as column arithmetic; missing inputs give NaN"""
+    p = panel.reindex(columns=list(dict.fromkeys(PANEL_METRICS + list(panel.columns))))
+    ratios = pd.DataFrame(index=panel.index)
+    ratios["debt_to_aum"] = _div(p["total_debt"], p["total_aum"])
+    ratios["gnpa_percent"] = _div(p["gross_npa"], p["total_aum"]) * 100
+    ratios["gnpa_stage3_gap"] = _div((p["gross_npa"] - p["stage3_assets"]).abs(), p["gross_npa"])
+    ratios["stage3_coverage_ratio"] = _div(p["provisions"], p["stage3_assets"])
+    ratios["interest_coverage"] = _div(p["profit_before_tax"] + p["interest_expense"], p["interest_expense"].where(p["interest_expense"] > 0))
+    ratios["nim"] = _div(p["net_interest_income"], p["total_assets"])
+    ratios["opex_ratio"] = _div(p["operating_expenses"], p["total_assets"])
+    ratios["roa"] = _div(p["profit_before_tax"], p["total_assets"])
+    ratios["credit_cost"] = (ratios["nim"] - ratios["opex_ratio"] - ratios["roa"]).clip(lower=0)
+    ratios["cost_to_income"] = _div(p["operating_expenses"], p["net_interest_income"].where(p["net_interest_income"] > 0))
+    ratios["cash_to_borrowings"] = _div(p["cash_and_equivalents"], p["total_debt"])
+    ratios["tier1_to_assets"] = _div(p["tier1_capital"], p["total_assets"])
+    ratios["other_income_share"] = _div(p["other_operating_income"], p["net_interest_income"])
+    return ratios
+
+def ratio_bands(peer_benchmarks: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    """Lower/upper bound per ratio from the absolute thresholds and one peer group's benchmarks"""
+    bands = {ratio: {"lower": lower, "upper": upper, "source": "threshold"} for ratio, (lower, upper) in THRESHOLDS.items()}
+    for ratio, (rule, width) in PEER_BANDS.items():
+        benchmark = peer_benchmarks.get(ratio)
+        if not benchmark:
+            continue
+        scale = PEER_SCALE.get(ratio, 1.0)
+        median, q1, q3 = benchmark["median"] * scale, benchmark["q1"] * scale, benchmark["q3"] * scale
+        if rule == "median_band":
+            lower, upper = median - width, median + width
+        elif rule == "interquartile":
+            lower, upper = q1, q3
+        elif rule == "below_q3":
+            lower, upper = -np.inf, q3
+        else:
+            lower, upper = q1, np.inf
+        bands[ratio] = {"lower": lower, "upper": upper, "source": "peer", "peer_median": median}
+    return pd.DataFrame.from_dict(bands, orient="index")
+
+def flag_ratios(ratios: pd.DataFrame, bands: pd.DataFrame) -> pd.DataFrame:
+    """True where a ratio falls outside its band, in one broadcast comparison; NaN ratios are never flagged"""
+    columns = [c for c in ratios.columns if c in bands.index]
+    values = ratios[columns].to_numpy()
+    lower = bands.loc[columns, "lower"].to_numpy(dtype=np.float64)
+    upper = bands.loc[columns, "upper"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        red = (values < lower) | (values > upper)
+    flags = pd.DataFrame(False, index=ratios.index, columns=ratios.columns)
+    flags[columns] = red
+    return flags
+
+def ratio_long_table(ratios: pd.DataFrame, flags: pd.DataFrame) -> pd.DataFrame:
+    """One row per (entity, fiscal_year, ratio) with a value, tagged with its analysis and RED/GREEN flag"""
+    long = ratios.rename_axis(columns="ratio").stack().dropna().rename("value").to_frame()
+    long["red"] = flags.rename_axis(columns="ratio").stack().reindex(long.index).fillna(False).astype(bool)
+    long = long.reset_index()
+    analysis = {ratio: group for group, columns in RATIO_GROUPS.items() for ratio in columns}
+    long["analysis"] = long["ratio"].map(analysis)
+    long["flag"] = np.where(long["red"], "RED", "GREEN")
+    return long
+
+def entity_slice(frame: pd.DataFrame, entity: str) -> pd.DataFrame:
+    """One entity's rows indexed by fiscal year (empty if the entity has none)"""
+    return frame[frame.index.get_level_values("entity") == entity].droplevel("entity")
+
+def ratios_by_year(values: pd.DataFrame, red: pd.Series) -> Dict[str, Dict[str, Any]]:
+    """Per-fiscal-year dicts of one entity's ``values`` for years where the first column is known, with a RED/GREEN flag"""
+    present = values.iloc[:, 0].notna()
+    return {
+        str(fy): {**{c: float(v) for c, v in row.items() if pd.notna(v)}, "flag": "RED" if red[fy] else "GREEN"}
+        for fy, row in values[present].iterrows()
+    }
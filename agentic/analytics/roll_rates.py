@@ -0,0 +1,235 @@
+import time
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agentic.analytics.portfolio_cuts import DPD_BUCKETS, month_from_name
+from agentic.analytics.portfolio_store import PortfolioStore
+
+# Delinquency states in ageing order; "current" is the outstanding not in any DPD bucket
+DPD_STATES = ["current"] + DPD_BUCKETS
+
+# Months a balance spends in each state before it ages into the next one. The 181-365
+# bucket spans six monthly steps and nothing ages out of 365+.
+STATE_MONTHS = np.array([1, 1, 1, 1, 1, 1, 1, 6, np.inf])
+
+# 90+ DPD is Stage-3 / NPA
+DEFAULT_STATE = "par_91_120_cr"
+
+LOSS_CURVE_HORIZONS = [3, 6, 12, 24, 36]
+
+ROLL_RATE_COLUMNS = ["month", "branch_code", "branch_name", "state", "principal_outstanding_cr"] + DPD_BUCKETS
+
+@dataclass
+class BalanceCube:
+    """Outstanding by unit × calendar month × DPD state; NaN where a unit has no book that month"""
+    unit: str
+    units: List[str]
+    months: List[str]
+    values: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        index = pd.MultiIndex.from_product([self.units, self.months], names=[self.unit, "month"])
+        return pd.DataFrame(self.values.reshape(-1, len(DPD_STATES)), index=index, columns=DPD_STATES)
+
+    def total(self) -> "BalanceCube":
+        """The portfolio as a single unit; months where no unit reported stay NaN"""
+        reported = np.isfinite(self.values).any(axis=0)
+        values = np.where(reported, np.nansum(self.values, axis=0), np.nan)
+        return BalanceCube(unit="portfolio", units=["portfolio"], months=self.months, values=values[np.newaxis])
+
+def _calendar_months(months) -> List[str]:
+    periods = pd.PeriodIndex(sorted(set(months)), freq="M")
+    return [str(p) for p in pd.period_range(periods.min(), periods.max(), freq="M")]
+
+def build_balance_cube(cuts: pd.DataFrame, unit: str = "branch_code") -> BalanceCube:
+    """
+    Pivot stacked branch cuts into a dense cube. Rows are summed per (month, unit), so
+    ``unit`` can be branch_code, district or state. Months run over the full calendar range
+    so neighbouring slices are always consecutive months, and a unit-month with no
+    outstanding (a branch not yet open, a blank sheet) is NaN rather than zero.
+    """
+    if cuts.empty:
+        return BalanceCube(unit=unit, units=[], months=[], values=np.empty((0, 0, len(DPD_STATES))))
+    buckets = cuts.reindex(columns=DPD_BUCKETS).astype(np.float64).fillna(0.0)
+    frame = pd.DataFrame({"month": cuts["month"], unit: cuts[unit]})
+    frame["current"] = (cuts["principal_outstanding_cr"].astype(np.float64).fillna(0.0) - buckets.sum(axis=1)).clip(lower=0.0)
+    frame[DPD_BUCKETS] = buckets.to_numpy()
+    grouped = frame.groupby([unit, "month"], sort=True)[DPD_STATES].sum()
+
+    units = grouped.index.get_level_values(0).unique().tolist()
+    months = _calendar_months(grouped.index.get_level_values(1))
+    unit_index = pd.Index(units).get_indexer(grouped.index.get_level_values(0))
+    month_index = pd.Index(months).get_indexer(grouped.index.get_level_values(1))
+
+    values = np.full((len(units), len(months), len(DPD_STATES)), np.nan)
+    values[unit_index, month_index] = grouped.to_numpy()
+    values[values.sum(axis=2) <= 0] = np.nan
+    return BalanceCube(unit=unit, units=units, months=months, values=values)
+
+def _flows(values: np.ndarray):
+    """Balance leaving each state for the next one in month t, and balance entering it in t+1"""
+    previous, following = values[:, :-1], values[:, 1:]
+    with np.errstate(invalid="ignore"):
+        ageing = previous[..., :-1] / STATE_MONTHS[:-1]
+        staying = previous[..., 1:] * (1.0 - 1.0 / STATE_MONTHS[1:])
+        arriving = np.clip(following[..., 1:] - staying, 0.0, None)
+    return ageing, arriving
+
+def _rate(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.clip(np.where(denominator > 0, numerator / denominator, np.nan), 0.0, 1.0)
+
+def flow_rates(cube: BalanceCube) -> np.ndarray:
+    """
+    Forward flow (roll) rates between consecutive months, shape units × month pairs × 8:
+    the share of what ages out of each state that arrives in the next one a month later
+    rather than curing back to current. For the single-month buckets this is the usual
+    B(k+1, t+1) / B(k, t).
+    """
+    ageing, arriving = _flows(cube.values)
+    return _rate(arriving, ageing)
+
+def pooled_flow_rates(cube: BalanceCube, axis=(0, 1)) -> np.ndarray:
+    """Balance-weighted flow rates over units and/or month pairs (only pairs where both months reported)"""
+    ageing, arriving = _flows(cube.values)
+    observed = np.isfinite(ageing) & np.isfinite(arriving)
+    return _rate(np.where(observed, arriving, 0.0).sum(axis=axis), np.where(observed, ageing, 0.0).sum(axis=axis))
+
+def transition_matrices(rates: np.ndarray) -> np.ndarray:
+    """
+    Row-stochastic roll-rate matrices (..., 9, 9) from flow rates (..., 8). A state keeps
+    what has not aged out yet, sends the ageing share times its flow rate to the next
+    state, and cures the rest to current; 365+ is absorbing.
+    """
+    n = len(DPD_STATES)
+    leave = 1.0 / STATE_MONTHS[:-1]
+    matrices = np.zeros(rates.shape[:-1] + (n, n))
+    k = np.arange(n - 1)
+    matrices[..., k, k] = 1.0 - leave
+    matrices[..., k, k + 1] = rates * leave
+    matrices[..., k, 0] += (1.0 - rates) * leave
+    matrices[..., n - 1, n - 1] = 1.0
+    return matrices
+
+def flow_through(rates: np.ndarray) -> np.ndarray:
+    """Share of a current balance that eventually reaches each DPD bucket: the running product of flow rates"""
+    return np.cumprod(rates, axis=-1)
+
+def cumulative_default_curve(matrices: np.ndarray, horizon: int = max(LOSS_CURVE_HORIZONS), default_state: str = DEFAULT_STATE) -> np.ndarray:
+    """
+    Share of a balance that is current at month 0 and has reached ``default_state`` or worse
+    by each of months 1..horizon, iterating the (stacked) roll-rate matrices with the
+    default states made absorbing. Shape (..., horizon).
+    """
+    start = DPD_STATES.index(default_state)
+    absorbing = matrices.copy()
+    absorbing[..., start:, :] = 0.0
+    absorbing[..., np.arange(start, len(DPD_STATES)), np.arange(start, len(DPD_STATES))] = 1.0
+
+    state = np.zeros(matrices.shape[:-1])
+    state[..., 0] = 1.0
+    curve = np.empty(matrices.shape[:-2] + (horizon,))
+    for month in range(horizon):
+        state = np.einsum("...s,...st->...t", state, absorbing)
+        curve[..., month] = state[..., start:].sum(axis=-1)
+    return curve
+
+def project_dpd_mix(mix: np.ndarray, matrix: np.ndarray, months: int = 12) -> np.ndarray:
+    """The whole book's DPD mix ``months`` months on, if every state keeps rolling at the given matrix"""
+    return mix @ np.linalg.matrix_power(matrix, months)
+
+def _round(values) -> List[Optional[float]]:
+    return [None if not np.isfinite(v) else round(float(v), 4) for v in np.asarray(values, dtype=np.float64)]
+
+def _rates_dict(rates: np.ndarray) -> Dict[str, Optional[float]]:
+    return {f"{source}->{target}": value for source, target, value in zip(DPD_STATES[:-1], DPD_STATES[1:], _round(rates))}
+
+def default_share(dpd_mix: Dict[str, Optional[float]], default_state: str = DEFAULT_STATE) -> float:
+    """Share of the book in ``default_state`` or worse (90+ DPD, i.e. Stage-3) in a ``latest_dpd_mix``-style dict"""
+    return sum(dpd_mix.get(state) or 0.0 for state in DPD_STATES[DPD_STATES.index(default_state):])
+
+def find_portfolio_csvs(csv_paths) -> List[str]:
+    """The monthly portfolio_cuts sheets among the extracted CSVs"""
+    return sorted(str(path) for path in csv_paths if Path(path).stem.lower().startswith("portfolio_cuts"))
+
+def analyze_roll_rates(cuts: pd.DataFrame, top_n: int = 10, default_state: str = DEFAULT_STATE) -> Dict[str, Any]:
+    """
+    Portfolio and branch DPD migration from stacked monthly branch cuts: monthly and pooled
+    flow rates, the pooled roll-rate matrix, flow-through to each bucket, the cumulative
+    default curve it implies and the latest DPD mix rolled 12 months forward, plus the
+    branches rolling fastest into ``default_state``.
+    Everything runs on the units × months × states cube at once.
+    """
+    started = time.perf_counter()
+    cube = build_balance_cube(cuts)
+    if not cube.units:
+        return {"months": [], "portfolio": {}, "branches": {}}
+    portfolio = cube.total()
+    default_index = DPD_STATES.index(default_state) - 1
+
+    monthly = flow_rates(portfolio)[0]
+    pooled = pooled_flow_rates(portfolio)
+    matrix = transition_matrices(pooled)
+    curve = cumulative_default_curve(matrix, default_state=default_state)
+    latest_mix = portfolio.values[0, -1] / np.nansum(portfolio.values[0, -1])
+
+    branch_rates = pooled_flow_rates(cube, axis=1)
+    branch_curves = cumulative_default_curve(transition_matrices(np.nan_to_num(branch_rates)), horizon=12, default_state=default_state)
+    branch_flow = flow_through(branch_rates)[:, default_index]
+    ranked = np.argsort(np.where(np.isfinite(branch_flow), -branch_flow, np.inf))[:top_n]
+    latest = cube.values[:, -1]
+    details = cuts.drop_duplicates("branch_code", keep="last").set_index("branch_code").reindex(cube.units)
+
+    state_cube = build_balance_cube(cuts, unit="state")
+    state_flow = flow_through(pooled_flow_rates(state_cube, axis=1))[:, default_index]
+
+    return {
+        "months": cube.months,
+        "states": DPD_STATES,
+        "portfolio": {
+            "flow_rates_by_month": [
+                {"from_month": start, "to_month": end, **_rates_dict(rates)}
+                for start, end, rates in zip(cube.months[:-1], cube.months[1:], monthly)
+                if np.isfinite(rates).any()
+            ],
+            "pooled_flow_rates": _rates_dict(pooled),
+            "roll_rate_matrix": [_round(row) for row in matrix],
+            "flow_through": dict(zip(DPD_BUCKETS, _round(flow_through(pooled)))),
+            "cumulative_default_curve": {f"{h}m": _round([curve[h - 1]])[0] for h in LOSS_CURVE_HORIZONS},
+            "latest_dpd_mix": dict(zip(DPD_STATES, _round(latest_mix))),
+            "projected_dpd_mix_12m": dict(zip(DPD_STATES, _round(project_dpd_mix(latest_mix, matrix, 12))))
+        },
+        "branches": {
+            "count": len(cube.units),
+            "reporting_latest_month": int(np.isfinite(latest).all(axis=1).sum()),
+            "highest_roll_to_default": [
+                {
+                    "branch_code": cube.units[i],
+                    "branch_name": details["branch_name"].iloc[i],
+                    "state": details["state"].iloc[i],
+                    "flow_through_to_default": round(float(branch_flow[i]), 4),
+                    "cumulative_default_12m": round(float(branch_curves[i, -1]), 4),
+                    "outstanding_latest_cr": None if not np.isfinite(latest[i]).all() else round(float(latest[i].sum()), 4)
+                }
+                for i in ranked if np.isfinite(branch_flow[i])
+            ]
+        },
+        "states_flow_through_to_default": dict(zip(state_cube.units, _round(state_flow))),
+        "elapsed_seconds": round(time.perf_counter() - started, 4)
+    }
+
+def analyze_portfolio_migration(csv_paths, top_n: int = 10) -> Dict[str, Any]:
+    """Roll-rate analysis over whichever monthly portfolio_cuts sheets are among ``csv_paths``, read through the columnar store"""
+    sources = find_portfolio_csvs(csv_paths)
+    if not sources:
+        return {**analyze_roll_rates(pd.DataFrame(), top_n=top_n), "sources": []}
+    store = PortfolioStore.for_directory(str(Path(sources[0]).parent))
+    store.append(sources)
+    months = [month for month in map(month_from_name, sources) if month]
+    results = analyze_roll_rates(store.table(ROLL_RATE_COLUMNS, months), top_n=top_n)
+    results["sources"] = sources
+    return results
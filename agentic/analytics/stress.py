@@ -0,0 +1,206 @@
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+DEFAULT_SCENARIOS = int(os.getenv("STRESS_SCENARIOS", "1000000"))
+DEFAULT_SEED = int(os.getenv("STRESS_SEED", "20250331"))
+# Scenarios are generated and evaluated in chunks so memory stays flat at any scenario count
+CHUNK_SIZE = int(os.getenv("STRESS_CHUNK_SIZE", str(1 << 18)))
+
+# Risk factor order for the correlation matrix
+FACTORS = ["gold_return", "ltv", "stage3", "cost_of_funds"]
+
+# Gold falls → LTVs rise and Stage-3 migration picks up; funding costs tend to rise with stress
+DEFAULT_CORRELATION = [
+    [1.0, 0.0, -0.5, -0.2],
+    [0.0, 1.0, 0.3, 0.0],
+    [-0.5, 0.3, 1.0, 0.3],
+    [-0.2, 0.0, 0.3, 1.0]
+]
+
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+@dataclass
+class StressAssumptions:
+    gold_return_mean: float = 0.0
+    gold_return_vol: float = 0.15
+    ltv_mean: float = 0.70
+    ltv_vol: float = 0.05
+    stage3_mean: Optional[float] = None  # defaults to the current Stage-3 ratio
+    stage3_vol: float = 0.5  # in logit space
+    cof_shock_mean_bp: float = 0.0
+    cof_shock_vol_bp: float = 100.0
+    floating_share: float = 0.52
+    auction_cost: float = 0.03
+    unsecured_lgd: float = 0.65
+    earnings_retention: float = 0.0  # share of one year's pre-provision profit absorbing losses
+    risk_weight: float = 1.0
+    crar_minimum: float = 0.15
+    tier1_minimum: float = 0.10
+    headroom_buffer: float = 0.02
+    correlation: list = field(default_factory=lambda: [row[:] for row in DEFAULT_CORRELATION])
+
+@dataclass
+class CapitalPosition:
+    """The balance-sheet inputs the stress engine needs, all in the same currency unit"""
+    tier1_capital: float
+    total_assets: float
+    loan_book: float
+    total_debt: float
+    stage3_ratio: float
+    operating_profit: float = 0.0
+    interest_expense: float = 0.0
+    tier2_capital: float = 0.0
+    secured_share: float = 1.0
+    stage3_source: str = "extracted"
+
+    @classmethod
+    def from_metrics(cls, metrics: Dict[str, float], fallback_stage3_ratio: Optional[float] = None, default_stage3_ratio: float = 0.02) -> "CapitalPosition":
+        """
+        Build from one fiscal year's extracted metrics; net worth stands in for Tier-I capital
+        when it is not reported. Without a reported Stage-3 / GNPA figure the Stage-3 ratio
+        comes from ``fallback_stage3_ratio`` (the 90+ DPD share of the latest portfolio cut)
+        and only then from ``default_stage3_ratio``; ``stage3_source`` records which was used.
+        """
+        total_assets = metrics.get("total_assets") or 0.0
+        loan_book = metrics.get("total_aum") or metrics.get("loans_and_advances") or total_assets
+        stage3 = metrics.get("stage3_assets") or metrics.get("gross_npa")
+        secured_share = metrics.get("secured_share", 1.0)
+        if stage3 and loan_book:
+            stage3_ratio, stage3_source = stage3 / loan_book, "extracted"
+        elif fallback_stage3_ratio is not None:
+            stage3_ratio, stage3_source = fallback_stage3_ratio, "portfolio_cuts_90dpd"
+        else:
+            stage3_ratio, stage3_source = default_stage3_ratio, "assumed"
+        return cls(
+            tier1_capital=metrics.get("tier1_capital") or metrics.get("net_worth") or 0.0,
+            total_assets=total_assets,
+            loan_book=loan_book,
+            total_debt=metrics.get("total_debt") or 0.0,
+            stage3_ratio=stage3_ratio,
+            operating_profit=(metrics.get("profit_before_tax") or 0.0) + (metrics.get("provisions") or 0.0),
+            interest_expense=metrics.get("interest_expense") or 0.0,
+            secured_share=secured_share / 100 if secured_share > 1 else secured_share,
+            stage3_source=stage3_source
+        )
+
+def _logit(p: float) -> float:
+    return float(np.log(p / (1 - p)))
+
+def _summary(values: np.ndarray) -> Dict[str, float]:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {}
+    quantiles = np.percentile(finite, PERCENTILES)
+    return {"mean": float(finite.mean()), **{f"p{p}": float(q) for p, q in zip(PERCENTILES, quantiles)}}
+
+def _tail(losses: np.ndarray, level: float) -> Dict[str, float]:
+    k = int(np.floor(level * losses.size))
+    partitioned = np.partition(losses, k)
+    var = float(partitioned[k])
+    return {f"var_{int(level * 100)}": var, f"expected_shortfall_{int(level * 100)}": float(partitioned[k:].mean())}
+
+class StressEngine:
+    """Correlated Monte Carlo over gold price, LTV, Stage-3 migration and cost of funds.
+
+    Each scenario draws the four factors jointly (Gaussian copula via Cholesky),
+    turns them into credit losses on the loan book (gold loans lose what the
+    collateral no longer covers after the gold move and auction costs, the
+    unsecured share a fixed LGD) plus the one-year cost of
+    repricing floating-rate borrowings, and reports post-loss Tier-I, CRAR and
+    DSCR. Everything is vectorised over scenarios, so a million paths take a
+    fraction of a second on one core, and a fixed seed makes runs reproducible.
+    """
+
+    def __init__(self, assumptions: Optional[StressAssumptions] = None, seed: int = DEFAULT_SEED, chunk_size: int = CHUNK_SIZE):
+        self.assumptions = assumptions or StressAssumptions()
+        self.seed = seed
+        self.chunk_size = max(1, chunk_size)
+        self._cholesky = np.linalg.cholesky(np.asarray(self.assumptions.correlation, dtype=np.float64))
+
+    def draw(self, rng: np.random.Generator, n: int, stage3_mean: float) -> Dict[str, np.ndarray]:
+        a = self.assumptions
+        z = rng.standard_normal((n, len(FACTORS))) @ self._cholesky.T
+        return {
+            "gold_return": np.expm1(np.log1p(a.gold_return_mean) + a.gold_return_vol * z[:, 0]),
+            "ltv": np.clip(a.ltv_mean + a.ltv_vol * z[:, 1], 0.05, 0.99),
+            "stage3": 1.0 / (1.0 + np.exp(-(_logit(stage3_mean) + a.stage3_vol * z[:, 2]))),
+            "cost_of_funds": (a.cof_shock_mean_bp + a.cof_shock_vol_bp * z[:, 3]) / 10000.0
+        }
+
+    def _lgd(self, position: CapitalPosition, gold_return, ltv):
+        collateral_cover = (1.0 + gold_return) / ltv * (1.0 - self.assumptions.auction_cost)
+        secured_lgd = np.clip(1.0 - collateral_cover, 0.0, 1.0)
+        return position.secured_share * secured_lgd + (1.0 - position.secured_share) * self.assumptions.unsecured_lgd
+
+    def evaluate(self, position: CapitalPosition, gold_return, ltv, stage3, cost_of_funds) -> Dict[str, np.ndarray]:
+        """Post-stress capital ratios for arrays (or scalars) of factor values"""
+        a = self.assumptions
+        # The current Stage-3 book is taken as already provisioned at the unstressed loss rate
+        base_provisions = position.loan_book * position.stage3_ratio * self._lgd(position, 0.0, a.ltv_mean)
+        credit_loss = np.maximum(position.loan_book * stage3 * self._lgd(position, gold_return, ltv) - base_provisions, 0.0)
+        funding_cost = position.total_debt * a.floating_share * cost_of_funds
+        total_loss = credit_loss + funding_cost
+
+        capital = position.tier1_capital + a.earnings_retention * position.operating_profit - total_loss
+        rwa = np.maximum(position.total_assets * a.risk_weight - credit_loss, 1e-9)
+        debt_service = np.maximum(position.interest_expense + funding_cost, 1e-9)
+        return {
+            "tier1_ratio": capital / rwa,
+            "crar": (capital + position.tier2_capital) / rwa,
+            "dscr": (position.operating_profit + position.interest_expense - credit_loss) / debt_service,
+            "credit_loss": credit_loss,
+            "total_loss": total_loss,
+            "capital": capital
+        }
+
+    def scenario(self, position: CapitalPosition, gold_return: float, stage3: float, cost_of_funds_bp: float = 0.0, ltv: Optional[float] = None) -> Dict[str, float]:
+        """A single deterministic scenario through the same loss model"""
+        result = self.evaluate(position, np.float64(gold_return), np.float64(ltv or self.assumptions.ltv_mean), np.float64(stage3), np.float64(cost_of_funds_bp / 10000.0))
+        return {key: float(value) for key, value in result.items()}
+
+    def simulate(self, position: CapitalPosition, n_scenarios: int = DEFAULT_SCENARIOS) -> Dict[str, Any]:
+        if n_scenarios < 1:
+            raise ValueError(f"n_scenarios must be at least 1, got {n_scenarios}")
+        a = self.assumptions
+        stage3_mean = a.stage3_mean if a.stage3_mean is not None else position.stage3_ratio
+        stage3_mean = min(max(stage3_mean, 1e-4), 1 - 1e-4)
+        rng = np.random.default_rng(self.seed)
+        started = time.perf_counter()
+
+        tier1 = np.empty(n_scenarios)
+        crar = np.empty(n_scenarios)
+        dscr = np.empty(n_scenarios)
+        losses = np.empty(n_scenarios)
+        exhausted = 0
+        for start in range(0, n_scenarios, self.chunk_size):
+            stop = min(start + self.chunk_size, n_scenarios)
+            factors = self.draw(rng, stop - start, stage3_mean)
+            result = self.evaluate(position, **factors)
+            tier1[start:stop] = result["tier1_ratio"]
+            crar[start:stop] = result["crar"]
+            dscr[start:stop] = result["dscr"]
+            losses[start:stop] = result["total_loss"]
+            exhausted += int(np.count_nonzero(result["capital"] <= 0))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "scenarios": n_scenarios,
+            "seed": self.seed,
+            "elapsed_seconds": round(elapsed, 4),
+            "scenarios_per_second": round(n_scenarios / elapsed) if elapsed else None,
+            "tier1_ratio": _summary(tier1),
+            "crar": _summary(crar),
+            "dscr": _summary(dscr),
+            "breach_probability": {
+                "tier1_below_minimum": float(np.mean(tier1 < a.tier1_minimum)),
+                "crar_below_minimum": float(np.mean(crar < a.crar_minimum)),
+                "tier1_within_headroom": float(np.mean(tier1 < a.tier1_minimum + a.headroom_buffer)),
+                "capital_exhausted": exhausted / n_scenarios
+            },
+            "tail_loss": {**_tail(losses, 0.95), **_tail(losses, 0.99)},
+            "assumptions": {**asdict(a), "stage3_mean": stage3_mean}
+        }
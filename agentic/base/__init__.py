@@ -1 +1,11 @@
+from agentic.base.concurrency import *
+from agentic.base.genai_client import *
+from agentic.base.response_cache import *
+from agentic.base.cache_registry import *
+from agentic.base.file_manifest import *
+from agentic.base.rate_limiter import *
+from agentic.base.log_sink import *
+from agentic.base.stage_scheduler import *
+from agentic.base.checkpoint import *
+from agentic.base.structured_output import *
 from agentic.base.base_agent import * 
\ No newline at end of file
@@ -1,7 +1,10 @@
 import os
+import sys
 import time
 import json
+import asyncio
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -9,14 +12,41 @@ from enum import Enum
 from abc import ABC, abstractmethod
 
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from google import genai
 from google.genai import types
 from google.genai.types import Tool, GenerateContentConfig, GoogleSearch
 from dotenv import load_dotenv
 
+from agentic.base.concurrency import run_async
+from agentic.base.genai_client import get_shared_client
+from agentic.base.response_cache import get_response_cache
+from agentic.base.cache_registry import get_cache_registry
+from agentic.base.file_manifest import get_file_manifest, hash_file
+from agentic.base.rate_limiter import get_rate_limiter, estimate_tokens, is_rate_limit_error
+from agentic.base.log_sink import BLOB_KEY, JsonlLogSink, is_blob_ref, load_blob
+from agentic.base.stage_scheduler import attempt_abandoned
+from agentic.base.structured_output import (
+    MAX_REPAIR_TOKENS, STRUCTURED_OUTPUT_REPAIRS, StructuredOutputError, StructuredOutputStats,
+    describe_errors, parse_structured, repair_prompt, response_schema, schema_name
+)
+
 load_dotenv(dotenv_path="../../.env")
 
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.txt': 'text/plain',
+    '.csv': 'text/csv',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.xls': 'application/vnd.ms-excel',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif'
+}
+
 class AgentStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -24,24 +54,139 @@ class AgentStatus(Enum):
     FAILED = "failed"
     VERIFIED = "verified"
 
+SUCCESS_STATUSES = (AgentStatus.COMPLETED, AgentStatus.VERIFIED)
+LATE_WRITE_TAG = "[late write from abandoned attempt]"
+
+class LogEntry:
+    """One ProcessLog record.
+
+    Slotted, with an enum status and a float timestamp instead of a dict of
+    strings. Item access (``entry["stage"]``, ``entry.get("status")``) returns
+    the same values the old dict entries held, so existing callers keep working.
+    """
+    __slots__ = ("timestamp", "agent", "stage", "status", "data", "details", "elapsed_time")
+    
+    def __init__(self, timestamp: float, agent: str, stage: str, status: AgentStatus, data: Any, details: str, elapsed_time: float):
+        self.timestamp = timestamp
+        self.agent = sys.intern(agent)
+        self.stage = sys.intern(stage)
+        self.status = status
+        self.data = data
+        self.details = details
+        self.elapsed_time = elapsed_time
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        if key == "status":
+            return self.status.value
+        if key == "timestamp":
+            return datetime.fromtimestamp(self.timestamp).isoformat()
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "LogEntry":
+        timestamp = entry.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        return cls(
+            timestamp=timestamp or time.time(),
+            agent=entry["agent"],
+            stage=entry["stage"],
+            status=AgentStatus(entry["status"]),
+            data=entry.get("data"),
+            details=entry.get("details", ""),
+            elapsed_time=entry.get("elapsed_time", 0.0)
+        )
+
 class ProcessLog:
-    def __init__(self):
-        self.entries = []
+    """Pipeline trace with indexes by stage, agent and status.
+
+    ``entries`` stays an ordered list; the indexes hold references into it so
+    ``get_stage_data``/``get_agent_data`` are dictionary lookups rather than
+    reverse scans. Appends and index updates happen under one lock because
+    independent stages log from several threads.
+    
+    With a sink attached every entry is also streamed to an append-only JSONL
+    trace as it is logged. Any entry whose payload spilled to the blob store
+    keeps only the blob reference in memory, completed stage outputs included;
+    ``get_stage_data`` and the other readers load it back from the blob on demand.
+    """
+    
+    def __init__(self, sink: Optional[JsonlLogSink] = None):
+        self.entries: List[LogEntry] = []
         self.start_time = datetime.now()
         self.current_stage = None
+        self.sink = sink
+        # Kept after the sink closes so spilled payloads can still be read back
+        self._blob_dir = sink.blob_dir if sink is not None else None
+        self._lock = threading.Lock()
+        self._reset_indexes()
     
-    def log(self, agent_name: str, stage: str, data: Any, status: AgentStatus, details: str = ""):
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "agent": agent_name,
-            "stage": stage,
-            "status": status.value,
-            "data": data,
-            "details": details,
-            "elapsed_time": (datetime.now() - self.start_time).total_seconds()
-        }
+    def attach_sink(self, sink: JsonlLogSink):
+        """Stream entries to ``sink`` from now on, first writing everything already logged"""
+        with self._lock:
+            self.sink = sink
+            self._blob_dir = sink.blob_dir
+            for entry in self.entries:
+                self._write_to_sink(entry)
+    
+    def _write_to_sink(self, entry: LogEntry):
+        stored = self.sink.write(entry.to_dict())
+        if is_blob_ref(stored):
+            entry.data = stored
+    
+    def _data(self, entry: LogEntry) -> Any:
+        """An entry's payload, read back from the blob store if it was spilled there"""
+        data = entry.data
+        return load_blob(self._blob_dir, data[BLOB_KEY]) if is_blob_ref(data) else data
+    
+    def _reset_indexes(self):
+        self._by_stage: Dict[str, List[LogEntry]] = {}
+        self._by_agent: Dict[str, List[LogEntry]] = {}
+        self._by_status: Dict[AgentStatus, List[LogEntry]] = {status: [] for status in AgentStatus}
+        self._latest_success_by_stage: Dict[str, LogEntry] = {}
+        self._latest_success_by_agent: Dict[str, LogEntry] = {}
+    
+    def _append(self, entry: LogEntry, late: bool = False):
         self.entries.append(entry)
-        self.current_stage = stage
+        self._by_stage.setdefault(entry.stage, []).append(entry)
+        self._by_agent.setdefault(entry.agent, []).append(entry)
+        self._by_status[entry.status].append(entry)
+        if entry.status in SUCCESS_STATUSES and not late:
+            self._latest_success_by_stage[entry.stage] = entry
+            self._latest_success_by_agent[entry.agent] = entry
+        self.current_stage = entry.stage
+    
+    def log(self, agent_name: str, stage: str, data: Any, status: AgentStatus, details: str = ""):
+        # A stage attempt the scheduler timed out may still finish; its writes stay in the
+        # trace, tagged, but never become the data later stages read for that stage
+        late = attempt_abandoned()
+        if late:
+            details = f"{details} {LATE_WRITE_TAG}".lstrip()
+        now = time.time()
+        entry = LogEntry(
+            timestamp=now,
+            agent=agent_name,
+            stage=stage,
+            status=status,
+            data=data,
+            details=details,
+            elapsed_time=now - self.start_time.timestamp()
+        )
+        with self._lock:
+            self._append(entry, late)
+            if self.sink is not None:
+                self._write_to_sink(entry)
         
         log_msg = f"[{agent_name}] {stage}: {status.value}"
         if details:
@@ -49,40 +194,116 @@ class ProcessLog:
         logging.info(log_msg)
     
     def get_stage_data(self, stage: str) -> Optional[Dict]:
-        for entry in reversed(self.entries):
-            if entry["stage"] == stage and entry["status"] in ["completed", "verified"]:
-                return entry["data"]
-        return None
+        entry = self._latest_success_by_stage.get(stage)
+        return self._data(entry) if entry is not None else None
     
     def get_agent_data(self, agent_name: str) -> Optional[Dict]:
-        for entry in reversed(self.entries):
-            if entry["agent"] == agent_name and entry["status"] in ["completed", "verified"]:
-                return entry["data"]
-        return None
+        entry = self._latest_success_by_agent.get(agent_name)
+        return self._data(entry) if entry is not None else None
+    
+    def entries_for_stage(self, stage: str) -> List[LogEntry]:
+        return list(self._by_stage.get(stage, []))
+    
+    def entries_for_agent(self, agent_name: str) -> List[LogEntry]:
+        return list(self._by_agent.get(agent_name, []))
+    
+    def entries_with_status(self, *statuses: AgentStatus) -> List[LogEntry]:
+        if len(statuses) == 1:
+            return list(self._by_status[statuses[0]])
+        wanted = set(statuses)
+        with self._lock:
+            return [entry for entry in self.entries if entry.status in wanted]
+    
+    def successful_stage_data(self) -> Dict[str, Any]:
+        """Latest completed/verified data for every stage, in order of first success"""
+        with self._lock:
+            entries = dict(self._latest_success_by_stage)
+        return {stage: self._data(entry) for stage, entry in entries.items()}
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Entries as plain dicts with spilled payloads loaded back, for checkpoints and results"""
+        with self._lock:
+            entries = list(self.entries)
+        return [{**entry.to_dict(), "data": self._data(entry)} for entry in entries]
+    
+    def restore(self, entries: List[Dict[str, Any]], start_time: Optional[str] = None):
+        """Rebuild the log from checkpointed entries so a resumed run continues the same trace"""
+        with self._lock:
+            self.entries = []
+            self._reset_indexes()
+            for entry in entries:
+                restored = LogEntry.from_dict(entry)
+                self._append(restored, restored.details.endswith(LATE_WRITE_TAG))
+                if self.sink is not None:
+                    self._write_to_sink(restored)
+            if start_time:
+                self.start_time = datetime.fromisoformat(start_time)
+    
+    def flush(self):
+        if self.sink is not None:
+            self.sink.flush()
+    
+    def close(self):
+        """Flush and detach the trace sink; later entries stay in memory only"""
+        with self._lock:
+            if self.sink is not None:
+                self.sink.close()
+                self.sink = None
     
     def save_to_file(self, filepath: str = "agentic/process.log"):
+        """Write the entries as a JSON array one entry at a time, without building the whole document in memory"""
         Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            entries = list(self.entries)
         with open(filepath, 'w') as f:
-            json.dump(self.entries, f, indent=2, default=str)
+            f.write("[\n")
+            for i, entry in enumerate(entries):
+                if i:
+                    f.write(",\n")
+                f.write(json.dumps({**entry.to_dict(), "data": self._data(entry)}, default=str))
+            f.write("\n]\n")
+
+def _sum_usage(usages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if len(usages) == 1:
+        return usages[0]
+    return {field: sum(usage.get(field, 0) or 0 for usage in usages) for field in ("prompt", "candidates", "total")}
 
 class BaseAgent(ABC):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         self.model_id = model_id
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.client = get_shared_client()
+        self.response_cache = get_response_cache()
+        self.cache_registry = get_cache_registry(self.client)
+        self.file_manifest = get_file_manifest()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.token_usage = []
+        self.cached_responses = 0
+        self.max_rate_limit_retries = 5
+        self.structured_output_stats = StructuredOutputStats()
+    
+    def _cache_display_name(self, file_path: str, content_hash: str) -> str:
+        # The content hash keeps two different files that share a stem from colliding
+        return f"cache_{Path(file_path).stem}_{content_hash[:12]}"
     
-    def get_existing_cache_by_filename(self, file_path: str) -> Optional[str]:
-        """Check if a cache already exists for this file based on filename pattern"""
+    def get_existing_cache_by_filename(self, file_path: str, content_hash: Optional[str] = None) -> Optional[str]:
+        """Check if a live cache already exists for this file's content"""
         try:
-            file_name = Path(file_path).stem
-            expected_display_name = f"cache_{file_name}"
+            content_hash = content_hash or hash_file(file_path)
             
-            # List all cached contents to find existing cache
-            for cache in self.client.caches.list():
-                if cache.display_name == expected_display_name:
-                    self.logger.info(f"Found existing cache for {file_path}: {cache.name}")
-                    return cache.name
+            manifest_cache = self.file_manifest.live_cache(content_hash, self.model_id)
+            if manifest_cache:
+                self.logger.info(f"Found existing cache for {file_path} in upload manifest: {manifest_cache['name']}")
+                return manifest_cache["name"]
+            
+            # O(1) lookup against the registry instead of listing every cache per file
+            record = self.cache_registry.lookup(
+                self.model_id,
+                display_name=self._cache_display_name(file_path, content_hash),
+                content_hash=content_hash
+            )
+            if record:
+                self.logger.info(f"Found existing cache for {file_path}: {record.name}")
+                return record.name
             return None
         except Exception as e:
             self.logger.warning(f"Error checking for existing cache: {e}")
@@ -91,86 +312,91 @@ class BaseAgent(ABC):
     def upload_and_cache_file(self, file_path: str, reuse_cache: bool = True) -> Dict[str, Any]:
         """Universal method to upload file using GenAI File API and create cache"""
         try:
+            content_hash = hash_file(file_path)
+            
             # Check for existing cache first if reuse is enabled
             if reuse_cache:
-                existing_cache = self.get_existing_cache_by_filename(file_path)
+                existing_cache = self.get_existing_cache_by_filename(file_path, content_hash)
                 if existing_cache:
-                    # Get cache details
-                    cache = self.client.caches.get(name=existing_cache)
-                    self.logger.info(f"Reusing existing cache for {file_path}: {existing_cache}")
-                    return {
-                        "file_object": None,  # Not needed when reusing cache
-                        "cache_name": existing_cache,
-                        "file_id": None,  # Not available when reusing cache
-                        "reused": True
-                    }
-            
-            # Upload file using the client
-            uploaded_file = self.client.files.upload(file=file_path)
-            self.logger.info(f"Uploaded file {file_path} with file ID: {uploaded_file.name}")
+                    try:
+                        # Get cache details
+                        cache = self.client.caches.get(name=existing_cache)
+                        self.logger.info(f"Reusing existing cache for {file_path}: {existing_cache}")
+                        return {
+                            "file_object": None,  # Not needed when reusing cache
+                            "cache_name": existing_cache,
+                            "file_id": None,  # Not available when reusing cache
+                            "content_hash": content_hash,
+                            "reused": True
+                        }
+                    except Exception as e:
+                        # Deleted remotely since the registry was built; forget it and recreate
+                        self.logger.warning(f"Indexed cache {existing_cache} is no longer available: {e}")
+                        self.cache_registry.evict(existing_cache)
+                        self.file_manifest.forget_cache(existing_cache)
             
-            # Determine mime type based on file extension
-            file_extension = Path(file_path).suffix.lower()
-            mime_type_map = {
-                '.pdf': 'application/pdf',
-                '.txt': 'text/plain',
-                '.csv': 'text/csv',
-                '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                '.xls': 'application/vnd.ms-excel',
-                '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                '.doc': 'application/msword',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.gif': 'image/gif'
-            }
-            mime_type = mime_type_map.get(file_extension, 'application/octet-stream')
+            mime_type = MIME_TYPES.get(Path(file_path).suffix.lower(), 'application/octet-stream')
             
-            # Create cache for the uploaded file using correct syntax with file URI
-            file_name = Path(file_path).stem
-            cache = self.client.caches.create(
-                model=self.model_id,
-                config=types.CreateCachedContentConfig(
-                    contents=[
-                        types.Content(
-                            role='user',
-                            parts=[
-                                types.Part.from_uri(
-                                    file_uri=uploaded_file.uri,
-                                    mime_type=mime_type
-                                )
-                            ]
-                        )
-                    ],
-                    display_name=f"cache_{file_name}",
-                    ttl='3600s'
-                )
-            )
+            # Identical bytes uploaded within the Files API lifetime are never sent twice
+            uploaded_file = self.file_manifest.file_object(content_hash)
+            if uploaded_file:
+                self.logger.info(f"Reusing uploaded file {uploaded_file.name} for {file_path} (sha256 {content_hash[:12]})")
+                try:
+                    cache = self._create_file_cache(file_path, content_hash, uploaded_file, mime_type)
+                except Exception as e:
+                    # The recorded upload may be gone server-side (deleted, expired, other project); upload afresh once
+                    self.logger.warning(f"Recorded upload {uploaded_file.name} is not usable, uploading {file_path} again: {e}")
+                    self.file_manifest.forget_upload(content_hash)
+                    uploaded_file = None
+            if uploaded_file is None:
+                uploaded_file = self.client.files.upload(file=file_path, config={"mime_type": mime_type})
+                self.file_manifest.record_upload(content_hash, uploaded_file, mime_type, file_path)
+                self.logger.info(f"Uploaded file {file_path} with file ID: {uploaded_file.name}")
+                cache = self._create_file_cache(file_path, content_hash, uploaded_file, mime_type)
             cache_name = cache.name
+            self.cache_registry.register(cache, content_hash=content_hash)
+            self.file_manifest.record_cache(content_hash, cache, file_path)
             self.logger.info(f"Created cache for {file_path} with cache name: {cache_name}")
             
             return {
                 "file_object": uploaded_file,
                 "cache_name": cache_name,
                 "file_id": uploaded_file.name,
+                "content_hash": content_hash,
                 "reused": False
             }
         except Exception as e:
             self.logger.error(f"Failed to upload and cache file {file_path}: {e}")
             raise
     
-    def _generate_response(self, prompt: List[Any], temperature: float = 0.3, max_tokens: int = 800) -> tuple[str, Dict[str, Any]]:
-        config = types.GenerateContentConfig(
-            temperature=temperature,
-            max_output_tokens=max_tokens,   
-        )
-        
-        response = self.client.models.generate_content(
+    def _create_file_cache(self, file_path: str, content_hash: str, uploaded_file: types.File, mime_type: str) -> types.CachedContent:
+        return self.client.caches.create(
             model=self.model_id,
-            contents=prompt,
-            config=config
+            config=types.CreateCachedContentConfig(
+                contents=[
+                    types.Content(
+                        role='user',
+                        parts=[
+                            types.Part.from_uri(
+                                file_uri=uploaded_file.uri,
+                                mime_type=mime_type
+                            )
+                        ]
+                    )
+                ],
+                display_name=self._cache_display_name(file_path, content_hash),
+                ttl='3600s'
+            )
         )
-
+    
+    def _build_generation_config(self, temperature: float, max_tokens: int, use_cache: Optional[str] = None) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            cached_content=use_cache
+        )
+    
+    def _record_usage(self, response) -> Dict[str, Any]:
         usage_metadata = response.usage_metadata
         token_count = {
             "prompt": usage_metadata.prompt_token_count,
@@ -179,8 +405,187 @@ class BaseAgent(ABC):
         }
         self.token_usage.append(token_count)
         self.logger.info(f"Token usage: {token_count}")
+        return token_count
+    
+    def _lookup_cached_response(self, key: str) -> Optional[tuple[str, Dict[str, Any]]]:
+        cached = self.response_cache.get(key)
+        if cached is None:
+            return None
+        self.cached_responses += 1
+        self.logger.info(f"Response cache hit ({key[:12]}), skipped model call")
+        return cached["text"], {"prompt": 0, "candidates": 0, "total": 0, "cache_hit": True}
+    
+    def _store_response(self, key: str, response, token_count: Dict[str, Any], cache_ttl: Optional[int] = None):
+        # Truncated (MAX_TOKENS), blocked or empty answers would be replayed on every retry, so only complete ones are kept
+        candidates = response.candidates or []
+        if not candidates or candidates[0].finish_reason != types.FinishReason.STOP:
+            self.logger.info(f"Not caching response ({key[:12]}): finish reason {candidates[0].finish_reason if candidates else 'no candidates'}")
+            return
+        self.response_cache.put(key, response.text, token_count, model_id=self.model_id, ttl_seconds=cache_ttl)
+    
+    def _forget_cached_response(self, contents: Any, config: types.GenerateContentConfig):
+        """Drop a cached answer the caller rejected so the next run asks the model again"""
+        self.response_cache.delete(self._response_cache_key(contents, config))
+    
+    def _response_cache_key(self, contents: Any, config: types.GenerateContentConfig) -> str:
+        # Key cached-content requests on the underlying file hash so a rebuilt cache still hits
+        content_hash = self.file_manifest.content_hash_for_cache(config.cached_content) if config.cached_content else None
+        if content_hash:
+            config = config.model_copy(update={"cached_content": f"sha256:{content_hash}"})
+        return self.response_cache.make_key(self.model_id, contents, config)
+    
+    def _generate_content(self, contents: Any, config: types.GenerateContentConfig, cache_ttl: Optional[int] = None) -> tuple[str, Dict[str, Any]]:
+        """Single choke point for model calls: response cache lookup, rate-limited call, usage accounting"""
+        key = self._response_cache_key(contents, config)
+        cached = self._lookup_cached_response(key)
+        if cached is not None:
+            return cached
+        
+        rate_limiter = get_rate_limiter(self.model_id)
+        estimated = estimate_tokens(contents, config.max_output_tokens)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            rate_limiter.acquire(estimated)
+            started = time.monotonic()
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model_id,
+                    contents=contents,
+                    config=config
+                )
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                rate_limiter.release(time.monotonic() - started, throttled=throttled, error=not throttled)
+                if throttled and attempt < self.max_rate_limit_retries:
+                    continue
+                raise
+            except BaseException:
+                # Cancellation (e.g. a cancelled gather) must still return the window and global slots
+                rate_limiter.release(time.monotonic() - started, error=True)
+                raise
+            break
+
+        token_count = self._record_usage(response)
+        rate_limiter.release(time.monotonic() - started, estimated, token_count["total"])
+        self._store_response(key, response, token_count, cache_ttl)
+        return response.text, token_count
+    
+    async def _agenerate_content(self, contents: Any, config: types.GenerateContentConfig, cache_ttl: Optional[int] = None) -> tuple[str, Dict[str, Any]]:
+        key = self._response_cache_key(contents, config)
+        cached = self._lookup_cached_response(key)
+        if cached is not None:
+            return cached
         
+        rate_limiter = get_rate_limiter(self.model_id)
+        estimated = estimate_tokens(contents, config.max_output_tokens)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            await rate_limiter.aacquire(estimated)
+            started = time.monotonic()
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_id,
+                    contents=contents,
+                    config=config
+                )
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                rate_limiter.release(time.monotonic() - started, throttled=throttled, error=not throttled)
+                if throttled and attempt < self.max_rate_limit_retries:
+                    continue
+                raise
+            except BaseException:
+                # Cancellation (e.g. a cancelled gather) must still return the window and global slots
+                rate_limiter.release(time.monotonic() - started, error=True)
+                raise
+            break
+
+        token_count = self._record_usage(response)
+        rate_limiter.release(time.monotonic() - started, estimated, token_count["total"])
+        self._store_response(key, response, token_count, cache_ttl)
         return response.text, token_count
+    
+    def _generate_response(self, prompt: List[Any], temperature: float = 0.3, max_tokens: int = 800, use_cache: Optional[str] = None) -> tuple[str, Dict[str, Any]]:
+        config = self._build_generation_config(temperature, max_tokens, use_cache)
+        return self._generate_content(prompt, config)
+    
+    async def _agenerate_response(self, prompt: List[Any], temperature: float = 0.3, max_tokens: int = 800, use_cache: Optional[str] = None) -> tuple[str, Dict[str, Any]]:
+        """Async counterpart of _generate_response on the genai aio client"""
+        config = self._build_generation_config(temperature, max_tokens, use_cache)
+        return await self._agenerate_content(prompt, config)
+    
+    async def _agenerate_responses(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """Fan out independent _agenerate_response calls; failures are returned in place as exceptions"""
+        return await asyncio.gather(
+            *(self._agenerate_response(**request) for request in requests),
+            return_exceptions=True
+        )
+    
+    def _generate_responses(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """Synchronous entry point for fanning out independent prompts concurrently"""
+        return run_async(self._agenerate_responses(requests))
+
+    def _structured_config(self, schema: Any, temperature: float, max_tokens: int, use_cache: Optional[str] = None) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            response_mime_type="application/json",
+            response_schema=response_schema(schema),
+            cached_content=use_cache
+        )
+    
+    def _parse_or_repair(self, schema: Any, prompt: Any, text: Optional[str], attempt: int, config: types.GenerateContentConfig, request: tuple):
+        """(parsed, None) when ``text`` validates, else (None, repair request) while repairs remain; raises once they are spent"""
+        name = schema_name(schema)
+        # A blocked or empty response has no text; it goes through the same repair and stats as malformed JSON
+        text = text or ""
+        try:
+            parsed = parse_structured(text, schema)
+        except ValidationError as e:
+            # A rejected answer must not be replayed from the response cache on the next run
+            self._forget_cached_response(*request)
+            if attempt == 0:
+                self.structured_output_stats.record(name, parse_failures=1)
+            if attempt >= STRUCTURED_OUTPUT_REPAIRS:
+                self.structured_output_stats.record(name, failed=1)
+                raise StructuredOutputError(name, text, "; ".join(describe_errors(e))) from e
+            self.logger.warning(f"{name} response failed validation ({e.error_count()} errors), requesting a repair")
+            self.structured_output_stats.record(name, repair_calls=1)
+            repair_config = config.model_copy(update={"max_output_tokens": min(MAX_REPAIR_TOKENS, 2 * (config.max_output_tokens or 0)) or None})
+            return None, (repair_prompt(prompt, text, e), repair_config)
+        if attempt:
+            self.structured_output_stats.record(name, repaired=1)
+        return parsed, None
+    
+    def _generate_structured(self, prompt: Any, schema: Any, temperature: float = 0.2, max_tokens: int = 800, use_cache: Optional[str] = None) -> tuple[Any, Dict[str, Any]]:
+        """
+        Generate a response constrained to ``schema`` (a Pydantic model or a type such as
+        ``List[Model]``) and return it validated, as plain dicts/lists. A response that does
+        not validate is sent back once with the errors for repair; only that call is retried.
+        Raises StructuredOutputError when the repair fails too.
+        """
+        self.structured_output_stats.record(schema_name(schema), calls=1)
+        config = self._structured_config(schema, temperature, max_tokens, use_cache)
+        request, usage = (prompt, config), []
+        for attempt in range(STRUCTURED_OUTPUT_REPAIRS + 1):
+            text, token_count = self._generate_content(*request)
+            usage.append(token_count)
+            parsed, request = self._parse_or_repair(schema, prompt, text, attempt, config, request)
+            if request is None:
+                return parsed, _sum_usage(usage)
+    
+    async def _agenerate_structured(self, prompt: Any, schema: Any, temperature: float = 0.2, max_tokens: int = 800, use_cache: Optional[str] = None) -> tuple[Any, Dict[str, Any]]:
+        """Async counterpart of _generate_structured"""
+        self.structured_output_stats.record(schema_name(schema), calls=1)
+        config = self._structured_config(schema, temperature, max_tokens, use_cache)
+        request, usage = (prompt, config), []
+        for attempt in range(STRUCTURED_OUTPUT_REPAIRS + 1):
+            text, token_count = await self._agenerate_content(*request)
+            usage.append(token_count)
+            parsed, request = self._parse_or_repair(schema, prompt, text, attempt, config, request)
+            if request is None:
+                return parsed, _sum_usage(usage)
+    
+    def get_structured_output_stats(self) -> Dict[str, Any]:
+        return self.structured_output_stats.summary()
 
     def get_total_token_usage(self) -> Dict[str, int]:
         total_usage = {
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.base.file_manifest import account_fingerprint
+
+# Treat caches this close to expiry as already gone so callers never hand out a dying cache
+EXPIRY_MARGIN_SECONDS = 60
+
+@dataclass
+class CachedContentRecord:
+    name: str
+    display_name: str
+    model: str
+    expire_time: float
+    content_hash: Optional[str] = None
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return self.expire_time - EXPIRY_MARGIN_SECONDS <= (now or time.time())
+
+def _model_key(model: str) -> str:
+    # The API reports "models/<id>"; callers pass the bare id
+    return model.split("/")[-1]
+
+def _to_timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return 0.0
+
+class ContextCacheRegistry:
+    """In-memory index of Gemini context caches.
+
+    The remote listing is walked once per run (or skipped entirely when a
+    recent local manifest exists); afterwards lookups by display name or
+    content hash are dictionary hits and expired entries are dropped as they
+    are encountered. A cache only serves the model it was created for and
+    only exists for the account that created it, so both indexes are keyed by
+    model and the manifest is kept per API key.
+    """
+
+    def __init__(self, client, manifest_path: Optional[str] = None, manifest_max_age_seconds: int = 600, api_key: Optional[str] = None):
+        self.client = client
+        self.manifest_path = Path(manifest_path) if manifest_path else DEFAULT_CACHE_DIR / f"context_caches_{account_fingerprint(api_key)}.json"
+        self.manifest_max_age_seconds = manifest_max_age_seconds
+        self.logger = logging.getLogger("ContextCacheRegistry")
+        self._by_display_name: Dict[Tuple[str, str], CachedContentRecord] = {}
+        self._by_content_hash: Dict[Tuple[str, str], CachedContentRecord] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._listed_at = 0.0
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not self._load_manifest():
+                self.refresh()
+            self._loaded = True
+
+    def _load_manifest(self) -> bool:
+        if not self.manifest_path.exists():
+            return False
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Ignoring unreadable cache manifest {self.manifest_path}: {e}")
+            return False
+        if time.time() - manifest.get("listed_at", 0) > self.manifest_max_age_seconds:
+            return False
+        self._listed_at = manifest["listed_at"]
+        for entry in manifest.get("caches", []):
+            self._index(CachedContentRecord(**entry))
+        self.logger.info(f"Loaded {len(self._by_display_name)} context caches from {self.manifest_path}")
+        return True
+
+    def _save_manifest(self):
+        now = time.time()
+        records = [asdict(record) for record in self._by_display_name.values() if not record.is_expired(now)]
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"listed_at": self._listed_at, "caches": records}))
+        tmp_path.replace(self.manifest_path)
+
+    def _index(self, record: CachedContentRecord):
+        if record.is_expired():
+            return
+        model = _model_key(record.model)
+        self._by_display_name[(model, record.display_name)] = record
+        if record.content_hash:
+            self._by_content_hash[(model, record.content_hash)] = record
+
+    def refresh(self):
+        """List remote caches once and rebuild the index"""
+        with self._lock:
+            self._by_display_name.clear()
+            self._by_content_hash.clear()
+            try:
+                for cache in self.client.caches.list():
+                    if not cache.display_name:
+                        continue
+                    self._index(CachedContentRecord(
+                        name=cache.name,
+                        display_name=cache.display_name,
+                        model=cache.model or "",
+                        expire_time=_to_timestamp(cache.expire_time)
+                    ))
+            except Exception as e:
+                self.logger.warning(f"Error listing context caches: {e}")
+            self._listed_at = time.time()
+            self._loaded = True
+            self._save_manifest()
+            self.logger.info(f"Indexed {len(self._by_display_name)} live context caches")
+
+    def lookup(self, model_id: str, display_name: Optional[str] = None, content_hash: Optional[str] = None) -> Optional[CachedContentRecord]:
+        self._ensure_loaded()
+        model = _model_key(model_id)
+        with self._lock:
+            record = None
+            if content_hash:
+                record = self._by_content_hash.get((model, content_hash))
+            if record is None and display_name:
+                record = self._by_display_name.get((model, display_name))
+            if record is not None and record.is_expired():
+                self._evict_record(record)
+                return None
+            return record
+
+    def register(self, cache, content_hash: Optional[str] = None) -> CachedContentRecord:
+        self._ensure_loaded()
+        record = CachedContentRecord(
+            name=cache.name,
+            display_name=cache.display_name or "",
+            model=cache.model or "",
+            expire_time=_to_timestamp(cache.expire_time),
+            content_hash=content_hash
+        )
+        with self._lock:
+            self._index(record)
+            self._save_manifest()
+        return record
+
+    def evict(self, cache_name: str):
+        with self._lock:
+            for record in list(self._by_display_name.values()):
+                if record.name == cache_name:
+                    self._evict_record(record)
+            self._save_manifest()
+
+    def _evict_record(self, record: CachedContentRecord):
+        model = _model_key(record.model)
+        if self._by_display_name.get((model, record.display_name)) is record:
+            del self._by_display_name[(model, record.display_name)]
+        if record.content_hash and self._by_content_hash.get((model, record.content_hash)) is record:
+            del self._by_content_hash[(model, record.content_hash)]
+
+_registries: Dict[Tuple[int, str], ContextCacheRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_cache_registry(client, api_key: Optional[str] = None) -> ContextCacheRegistry:
+    """One registry per genai client and API key, shared by every agent using that client"""
+    key = (id(client), account_fingerprint(api_key))
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ContextCacheRegistry(client, api_key=api_key)
+            _registries[key] = registry
+        return registry
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CHECKPOINT_VERSION = 1
+
+def _atomic_write_json(path: Path, payload: Any):
+    """Write to a sibling temp file, fsync it and rename over the target so a crash never leaves a torn file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class CheckpointStore:
+    """Durable per-run checkpoint of completed stage outputs and the ProcessLog.
+
+    Layout under ``root``::
+
+        manifest.json          data directory, stage order and completed stages
+        process_log.json       ProcessLog entries at the last checkpoint
+        stages/<stage>.json    output of each completed stage
+
+    Every file is replaced atomically, and the manifest is written last, so
+    the checkpoint always describes a consistent set of stages even if the
+    process dies mid-write.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.stages_dir = self.root / "stages"
+        self.manifest_path = self.root / "manifest.json"
+        self.process_log_path = self.root / "process_log.json"
+        self.logger = logging.getLogger("CheckpointStore")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_data_directory(cls, data_directory: str) -> "CheckpointStore":
+        return cls(str(Path(data_directory) / "analysis_output" / "checkpoint"))
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return None
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Ignoring unreadable checkpoint manifest {self.manifest_path}: {e}")
+            return None
+
+    def start(self, data_directory: str, stage_names: List[str], started_at: datetime):
+        """Begin a fresh checkpoint, discarding any previous run's stage outputs"""
+        with self._lock:
+            if self.stages_dir.exists():
+                for stale in self.stages_dir.glob("*.json"):
+                    stale.unlink()
+            _atomic_write_json(self.manifest_path, {
+                "version": CHECKPOINT_VERSION,
+                "data_directory": str(Path(data_directory).resolve()),
+                "stage_order": stage_names,
+                "completed_stages": [],
+                "started_at": started_at.isoformat(),
+                "updated_at": time.time()
+            })
+
+    def save_stage(self, stage_name: str, result: Any, log_entries: List[Dict[str, Any]]):
+        with self._lock:
+            manifest = self._read_manifest() or {"version": CHECKPOINT_VERSION, "completed_stages": []}
+            _atomic_write_json(self.stages_dir / f"{stage_name}.json", {
+                "stage": stage_name,
+                "completed_at": datetime.now().isoformat(),
+                "result": result
+            })
+            _atomic_write_json(self.process_log_path, log_entries)
+            if stage_name not in manifest["completed_stages"]:
+                manifest["completed_stages"].append(stage_name)
+            manifest["updated_at"] = time.time()
+            _atomic_write_json(self.manifest_path, manifest)
+        self.logger.info(f"Checkpointed stage {stage_name} to {self.root}")
+
+    def load(self, data_directory: str, stage_names: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the completed stage outputs and ProcessLog entries, or None if there is no usable checkpoint"""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        if manifest.get("version") != CHECKPOINT_VERSION:
+            self.logger.warning(f"Checkpoint version {manifest.get('version')} is not supported; starting fresh")
+            return None
+        if manifest.get("data_directory") != str(Path(data_directory).resolve()):
+            self.logger.warning(f"Checkpoint at {self.root} belongs to {manifest.get('data_directory')}; starting fresh")
+            return None
+        if manifest.get("stage_order") != stage_names:
+            self.logger.warning("Pipeline stages changed since the checkpoint was written; starting fresh")
+            return None
+
+        stage_results = {}
+        for stage_name in manifest.get("completed_stages", []):
+            try:
+                stage_results[stage_name] = json.loads((self.stages_dir / f"{stage_name}.json").read_text())["result"]
+            except (OSError, json.JSONDecodeError, KeyError) as e:
+                # A missing stage file only invalidates that stage; it and its dependents are re-run
+                self.logger.warning(f"Checkpoint for stage {stage_name} is unreadable, re-running it: {e}")
+
+        try:
+            log_entries = json.loads(self.process_log_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Checkpointed process log is unreadable; starting fresh: {e}")
+            return None
+
+        return {
+            "started_at": manifest.get("started_at"),
+            "stage_results": stage_results,
+            "process_log_entries": log_entries
+        }
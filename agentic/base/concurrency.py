@@ -0,0 +1,128 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+class ConcurrencyLimiter:
+    """Process-wide cap on in-flight LLM requests.
+
+    Works for both the sync client (threads block on a condition) and the aio
+    client (coroutines poll a non-blocking acquire), so a single budget covers
+    every event loop and worker thread in the process.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, poll_interval: float = 0.02):
+        self._limit = max(1, max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.poll_interval = poll_interval
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def set_limit(self, max_concurrency: int):
+        with self._condition:
+            self._limit = max(1, max_concurrency)
+            self._condition.notify_all()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._in_flight < self._limit:
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= self._limit:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            return True
+
+    async def aacquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self):
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+_llm_limiter = ConcurrencyLimiter()
+
+def get_llm_limiter() -> ConcurrencyLimiter:
+    return _llm_limiter
+
+class BackgroundLoop:
+    """One long-lived event loop on a daemon thread for all async LLM work in a process.
+
+    The shared aio client keeps keep-alive connections bound to the loop that
+    opened them, so every coroutine must run on the same loop for the life of
+    the process; a fresh ``asyncio.run`` per fan-out would leave the pool
+    holding sockets of a closed loop. Stages running in parallel threads all
+    submit here and block on their own futures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pid = None
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # Forked children inherit the object but not the thread, so they start their own loop
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-event-loop", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coro):
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("run_async called from a coroutine on the shared event loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop()).result()
+
+_background_loop = BackgroundLoop()
+
+def run_async(coro):
+    """Run a coroutine to completion from synchronous agent code.
+
+    Agents are driven synchronously by MetaAgent, so fan-out helpers hand their
+    coroutines to the process-wide background loop and wait for the result.
+    This also works from a thread that already runs its own loop.
+    """
+    return _background_loop.run(coro)
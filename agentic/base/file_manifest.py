@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from google.genai import types
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+
+# Files API objects are deleted server-side 48 hours after upload
+FILES_API_TTL_SECONDS = 48 * 3600
+# Do not hand out uploads or caches that will expire before a stage can use them
+EXPIRY_MARGIN_SECONDS = 300
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def account_fingerprint(api_key: Optional[str] = None) -> str:
+    """Short non-reversible id of the API key: uploads and caches only exist for the key/project that created them"""
+    api_key = api_key or os.getenv("GOOGLE_API_KEY") or ""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+def _to_timestamp(value: Any, default: float) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return default
+
+class FileManifest:
+    """Persistent record of Files API uploads keyed by SHA-256 of the file bytes.
+
+    Each entry holds the uploaded file name/URI, mime type, expiry and the
+    context caches built on it, so identical content is uploaded at most once
+    per Files API lifetime regardless of its path, stem or data directory.
+    Writes merge with the on-disk copy so concurrent processes do not drop
+    each other's entries.
+    """
+
+    def __init__(self, path: Optional[str] = None, api_key: Optional[str] = None):
+        self.path = Path(path) if path else DEFAULT_CACHE_DIR / f"uploaded_files_{account_fingerprint(api_key)}.json"
+        self.logger = logging.getLogger("FileManifest")
+        self._lock = threading.RLock()
+        self._forgotten_caches = set()
+        self._forgotten_uploads = set()
+        self._entries: Dict[str, Dict[str, Any]] = self._read()
+        self._cache_to_hash = self._build_cache_index()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text()).get("files", {})
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Ignoring unreadable upload manifest {self.path}: {e}")
+            return {}
+
+    def _build_cache_index(self) -> Dict[str, str]:
+        return {
+            cache["name"]: content_hash
+            for content_hash, entry in self._entries.items()
+            for cache in entry.get("caches", [])
+        }
+
+    def _merge(self, on_disk: Dict[str, Dict[str, Any]]):
+        for content_hash, disk_entry in on_disk.items():
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                self._entries[content_hash] = disk_entry
+                continue
+            forgotten = content_hash in self._forgotten_uploads and disk_entry.get("file_name") == entry.get("file_name")
+            if disk_entry.get("expires_at", 0) > entry.get("expires_at", 0) and not forgotten:
+                for field in ("file_name", "uri", "expires_at"):
+                    entry[field] = disk_entry.get(field)
+            known_caches = {cache["name"] for cache in entry.get("caches", [])} | self._forgotten_caches
+            entry.setdefault("caches", []).extend(
+                cache for cache in disk_entry.get("caches", []) if cache["name"] not in known_caches
+            )
+            entry["paths"] = sorted(set(entry.get("paths", [])) | set(disk_entry.get("paths", [])))
+
+    def _prune(self, now: float):
+        for content_hash in list(self._entries):
+            entry = self._entries[content_hash]
+            entry["caches"] = [cache for cache in entry.get("caches", []) if cache["expire_time"] > now]
+            if entry.get("expires_at", 0) <= now and not entry["caches"]:
+                del self._entries[content_hash]
+
+    def _save(self):
+        now = time.time()
+        self._merge(self._read())
+        self._prune(now)
+        self._cache_to_hash = self._build_cache_index()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"updated_at": now, "files": self._entries}))
+        tmp_path.replace(self.path)
+
+    def live_upload(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry and entry.get("expires_at", 0) - EXPIRY_MARGIN_SECONDS > time.time():
+                return entry
+            return None
+
+    def live_cache(self, content_hash: str, model_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if not entry:
+                return None
+            now = time.time()
+            for cache in reversed(entry.get("caches", [])):
+                if cache["model"].split("/")[-1] == model_id.split("/")[-1] and cache["expire_time"] - EXPIRY_MARGIN_SECONDS > now:
+                    return cache
+            return None
+
+    def content_hash_for_cache(self, cache_name: str) -> Optional[str]:
+        return self._cache_to_hash.get(cache_name)
+
+    def file_object(self, content_hash: str) -> Optional[types.File]:
+        entry = self.live_upload(content_hash)
+        if entry is None:
+            return None
+        return types.File(name=entry["file_name"], uri=entry["uri"], mime_type=entry["mime_type"])
+
+    def record_upload(self, content_hash: str, uploaded_file: types.File, mime_type: str, file_path: str):
+        with self._lock:
+            entry = self._entries.setdefault(content_hash, {"caches": [], "paths": []})
+            entry.update({
+                "file_name": uploaded_file.name,
+                "uri": uploaded_file.uri,
+                "mime_type": mime_type,
+                "size": Path(file_path).stat().st_size,
+                "expires_at": _to_timestamp(uploaded_file.expiration_time, time.time() + FILES_API_TTL_SECONDS)
+            })
+            entry["paths"] = sorted(set(entry.get("paths", [])) | {str(Path(file_path).resolve())})
+            self._save()
+
+    def record_cache(self, content_hash: str, cache: types.CachedContent, file_path: str):
+        with self._lock:
+            entry = self._entries.setdefault(content_hash, {"caches": [], "paths": []})
+            entry.setdefault("caches", []).append({
+                "name": cache.name,
+                "model": cache.model or "",
+                "display_name": cache.display_name or "",
+                "expire_time": _to_timestamp(cache.expire_time, time.time() + 3600)
+            })
+            entry["paths"] = sorted(set(entry.get("paths", [])) | {str(Path(file_path).resolve())})
+            self._save()
+
+    def forget_upload(self, content_hash: str):
+        """Stop handing out an upload the server no longer knows (deleted, expired early or from another project)"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                return
+            entry["expires_at"] = 0
+            self._forgotten_uploads.add(content_hash)
+            self._save()
+    
+    def forget_cache(self, cache_name: str):
+        with self._lock:
+            self._forgotten_caches.add(cache_name)
+            for entry in self._entries.values():
+                entry["caches"] = [cache for cache in entry.get("caches", []) if cache["name"] != cache_name]
+            self._save()
+
+_file_manifests: Dict[str, FileManifest] = {}
+_file_manifest_lock = threading.Lock()
+
+def get_file_manifest(api_key: Optional[str] = None) -> FileManifest:
+    """The upload manifest of one API key; agents on different keys never see each other's uploads"""
+    account = account_fingerprint(api_key)
+    with _file_manifest_lock:
+        if account not in _file_manifests:
+            _file_manifests[account] = FileManifest(api_key=api_key)
+        return _file_manifests[account]
@@ -0,0 +1,77 @@
+import os
+import threading
+import importlib.util
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_POOL_LIMITS = {
+    "max_connections": int(os.getenv("GENAI_MAX_CONNECTIONS", "32")),
+    "max_keepalive_connections": int(os.getenv("GENAI_MAX_KEEPALIVE_CONNECTIONS", "16")),
+    "keepalive_expiry": float(os.getenv("GENAI_KEEPALIVE_EXPIRY", "120")),
+}
+
+def http2_available() -> bool:
+    """HTTP/2 multiplexing needs the optional h2 package (``httpx[http2]``)"""
+    return importlib.util.find_spec("h2") is not None
+
+def build_http_options(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+    http2: Optional[bool] = None,
+    timeout_ms: Optional[int] = None
+) -> types.HttpOptions:
+    limits = httpx.Limits(
+        max_connections=max_connections or DEFAULT_POOL_LIMITS["max_connections"],
+        max_keepalive_connections=max_keepalive_connections or DEFAULT_POOL_LIMITS["max_keepalive_connections"],
+        keepalive_expiry=keepalive_expiry or DEFAULT_POOL_LIMITS["keepalive_expiry"],
+    )
+    if http2 is None:
+        http2 = os.getenv("GENAI_HTTP2", "1") != "0" and http2_available()
+    elif http2 and not http2_available():
+        http2 = False
+
+    # Explicit transports pin both the sync and aio clients to httpx so the pool limits always apply.
+    # The async pool is bound to one event loop, so aio calls must go through concurrency.run_async.
+    return types.HttpOptions(
+        timeout=timeout_ms,
+        client_args={"transport": httpx.HTTPTransport(http2=http2, limits=limits)},
+        async_client_args={"transport": httpx.AsyncHTTPTransport(http2=http2, limits=limits)}
+    )
+
+class GenAIClientRegistry:
+    """Hands out one genai.Client per (process, api key, pool settings).
+
+    Every agent in a process shares the same connection pool, TLS sessions and
+    auth state. The pid is part of the key so forked workers never reuse a
+    parent's sockets.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple, genai.Client] = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key: Optional[str] = None, **pool_options: Any) -> genai.Client:
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        key = (os.getpid(), api_key, tuple(sorted(pool_options.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = genai.Client(api_key=api_key, http_options=build_http_options(**pool_options))
+                self._clients[key] = client
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+_client_registry = GenAIClientRegistry()
+
+def get_shared_client(api_key: Optional[str] = None, **pool_options: Any) -> genai.Client:
+    return _client_registry.get(api_key, **pool_options)
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+DEFAULT_FLUSH_EVERY = int(os.getenv("PROCESS_LOG_FLUSH_EVERY", "32"))
+DEFAULT_FLUSH_INTERVAL_SECONDS = float(os.getenv("PROCESS_LOG_FLUSH_INTERVAL", "2.0"))
+DEFAULT_BLOB_THRESHOLD_BYTES = int(os.getenv("PROCESS_LOG_BLOB_THRESHOLD", str(16 * 1024)))
+
+BLOB_KEY = "$blob"
+
+def is_blob_ref(data: Any) -> bool:
+    return isinstance(data, dict) and BLOB_KEY in data
+
+def load_blob(blob_dir: str, digest: str) -> Any:
+    return json.loads((Path(blob_dir) / digest[:2] / f"{digest}.json").read_text())
+
+class JsonlLogSink:
+    """Append-only JSONL trace for ProcessLog entries.
+
+    Each entry becomes one line as soon as it is logged. Lines are buffered
+    and flushed every ``flush_every`` entries or ``flush_interval_seconds``,
+    whichever comes first (a background thread enforces the interval even
+    when no more entries arrive), so a crashed run loses at most one small batch.
+    ``data`` payloads larger than ``blob_threshold_bytes`` are written once to
+    ``blob_dir/<sha[:2]>/<sha>.json`` and the line holds ``{"$blob": sha}``
+    instead, which keeps lines short and deduplicates repeated payloads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        blob_dir: Optional[str] = None,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        blob_threshold_bytes: int = DEFAULT_BLOB_THRESHOLD_BYTES
+    ):
+        self.path = Path(path)
+        self.blob_dir = Path(blob_dir) if blob_dir else self.path.parent / "blobs"
+        self.flush_every = max(1, flush_every)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.blob_threshold_bytes = blob_threshold_bytes
+        self.logger = logging.getLogger("JsonlLogSink")
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.entries_written = 0
+        self.blobs_written = 0
+        # Entries from a stage that stalls would otherwise sit in the buffer until the next write
+        self._closed = threading.Event()
+        self._flusher = None
+        if self.flush_interval_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="log-sink-flush", daemon=True)
+            self._flusher.start()
+    
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval_seconds):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval_seconds:
+                    self._flush_locked()
+
+    def _write_blob(self, encoded: bytes) -> str:
+        digest = hashlib.sha256(encoded).hexdigest()
+        blob_path = self.blob_dir / digest[:2] / f"{digest}.json"
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(encoded)
+            os.replace(tmp_path, blob_path)
+            self.blobs_written += 1
+        return digest
+
+    def write(self, entry: Dict[str, Any]) -> Any:
+        """Queue one entry; returns what was stored for ``data`` (the payload itself or a blob reference)"""
+        data = entry.get("data")
+        stored = data
+        if data is not None and not isinstance(data, (int, float, bool)):
+            encoded = json.dumps(data, default=str).encode("utf-8")
+            if len(encoded) > self.blob_threshold_bytes:
+                stored = {BLOB_KEY: self._write_blob(encoded), "bytes": len(encoded)}
+        line = json.dumps({**entry, "data": stored}, default=str)
+
+        with self._lock:
+            self._buffer.append(line)
+            self.entries_written += 1
+            if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval_seconds:
+                self._flush_locked()
+        return stored
+
+    def _flush_locked(self):
+        if self._buffer and not self._file.closed:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            if not self._file.closed:
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def load_blob(self, digest: str) -> Any:
+        return load_blob(self.blob_dir, digest)
+
+    def resolve(self, data: Any) -> Any:
+        return self.load_blob(data[BLOB_KEY]) if is_blob_ref(data) else data
+
+def read_trace(path: str, blob_dir: Optional[str] = None, resolve_blobs: bool = True) -> Iterator[Dict[str, Any]]:
+    """Stream entries back from a JSONL trace, loading spilled payloads on demand"""
+    path = Path(path)
+    blob_dir = Path(blob_dir) if blob_dir else path.parent / "blobs"
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line of a crashed run can be torn; everything before it is intact
+                continue
+            if resolve_blobs and is_blob_ref(entry.get("data")):
+                entry["data"] = load_blob(blob_dir, entry["data"][BLOB_KEY])
+            yield entry
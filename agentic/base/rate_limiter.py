@@ -0,0 +1,213 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from google.genai import errors
+
+from agentic.base.concurrency import ConcurrencyLimiter, get_llm_limiter
+
+# Published per-model quotas (requests and tokens per minute); LLM_RPM / LLM_TPM override all models
+# and LLM_RATE_SHARE scales them for processes that split one account's budget
+MODEL_QUOTAS = {
+    "gemini-2.5-flash-lite-preview-06-17": {"rpm": 4000, "tpm": 4_000_000},
+    "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+    "gemini-2.5-pro": {"rpm": 150, "tpm": 2_000_000},
+    "gemini-2.0-flash": {"rpm": 2000, "tpm": 4_000_000},
+}
+DEFAULT_QUOTA = {"rpm": 1000, "tpm": 1_000_000}
+
+MAX_BACKOFF_SECONDS = 60.0
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """429 RESOURCE_EXHAUSTED and 503 UNAVAILABLE both mean 'slow down'"""
+    return isinstance(error, errors.APIError) and error.code in (429, 503)
+
+def estimate_tokens(contents: Any, max_output_tokens: Optional[int] = None) -> int:
+    """Cheap pre-call token estimate (~4 chars/token); reconciled against actual usage afterwards"""
+    def _chars(obj: Any) -> int:
+        if isinstance(obj, str):
+            return len(obj)
+        if isinstance(obj, (list, tuple)):
+            return sum(_chars(item) for item in obj)
+        # Files and cached parts: assume a mid-sized document until usage says otherwise
+        return 4000
+    return _chars(contents) // 4 + (max_output_tokens or 0)
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # Requests larger than the bucket are admitted once it is full rather than starving forever
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+class AdaptiveRateLimiter:
+    """Per-model requests/tokens-per-minute budget with an AIMD concurrency window.
+
+    Every call reserves one request and its estimated tokens from two token
+    buckets, then takes a slot in a concurrency window. Successful calls under
+    the latency target widen the window additively; a 429/503 halves it,
+    drains the buckets and imposes an exponential cooldown, so the pipeline
+    settles at the quota ceiling instead of guessed sleep intervals.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        rpm: int,
+        tpm: int,
+        max_concurrency: Optional[int] = None,
+        min_concurrency: int = 1,
+        latency_target_seconds: float = 30.0
+    ):
+        self.model_id = model_id
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.max_concurrency = max_concurrency or get_llm_limiter().limit
+        self.min_concurrency = min_concurrency
+        self.latency_target_seconds = latency_target_seconds
+        self.window = ConcurrencyLimiter(max(min_concurrency, self.max_concurrency // 2))
+        self.logger = logging.getLogger("AdaptiveRateLimiter")
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._consecutive_throttles = 0
+        self._successes_since_increase = 0
+        self.stats = {"calls": 0, "throttled": 0, "errors": 0, "waited_seconds": 0.0}
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        """Take a request and its tokens and return 0, or return (and count) how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._cooldown_until:
+                wait = self._cooldown_until - now
+            else:
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                if wait == 0:
+                    self.requests.take(1)
+                    self.tokens.take(min(estimated_tokens, self.tokens.capacity))
+            if wait > 0:
+                self.stats["waited_seconds"] += wait
+            return wait
+
+    def acquire(self, estimated_tokens: int = 0):
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self.window.acquire()
+        get_llm_limiter().acquire()
+
+    async def aacquire(self, estimated_tokens: int = 0):
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        await self.window.aacquire()
+        try:
+            await get_llm_limiter().aacquire()
+        except BaseException:
+            # Cancelled while queued for the global slot: give back the window slot already held
+            self.window.release()
+            raise
+
+    def release(self, latency_seconds: float, estimated_tokens: int = 0, actual_tokens: Optional[int] = None, throttled: bool = False, error: bool = False):
+        """
+        Return the slots taken by ``acquire``. ``throttled`` shrinks the window; ``error`` (any
+        other failure or a cancellation) says nothing about capacity, so it neither grows nor
+        shrinks it.
+        """
+        get_llm_limiter().release()
+        self.window.release()
+        with self._lock:
+            self.stats["calls"] += 1
+            if throttled:
+                self._on_throttle()
+                return
+            if error:
+                self.stats["errors"] += 1
+                return
+            self._consecutive_throttles = 0
+            if actual_tokens is not None:
+                # Settle the difference between the estimate and what the call really cost
+                self.tokens.take(actual_tokens - min(estimated_tokens, self.tokens.capacity))
+            self._on_success(latency_seconds)
+
+    def _on_success(self, latency_seconds: float):
+        limit = self.window.limit
+        if latency_seconds > 2 * self.latency_target_seconds and limit > self.min_concurrency:
+            self.window.set_limit(max(self.min_concurrency, int(limit * 0.75)))
+            self._successes_since_increase = 0
+            return
+        self._successes_since_increase += 1
+        if self._successes_since_increase >= limit and limit < self.max_concurrency and latency_seconds <= self.latency_target_seconds:
+            self.window.set_limit(limit + 1)
+            self._successes_since_increase = 0
+
+    def _on_throttle(self):
+        self.stats["throttled"] += 1
+        self._consecutive_throttles += 1
+        self._successes_since_increase = 0
+        self.window.set_limit(max(self.min_concurrency, self.window.limit // 2))
+        self.requests.drain()
+        self.tokens.drain()
+        backoff = min(MAX_BACKOFF_SECONDS, 2 ** (self._consecutive_throttles - 1))
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + backoff)
+        self.logger.warning(f"{self.model_id} throttled; concurrency window -> {self.window.limit}, cooling down {backoff:.0f}s")
+
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self._cooldown_until - time.monotonic())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            "model": self.model_id,
+            "concurrency_window": self.window.limit,
+            "cooldown_seconds": round(self.cooldown_remaining(), 2),
+            **stats
+        }
+
+_rate_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model_id: str) -> AdaptiveRateLimiter:
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(model_id)
+        if limiter is None:
+            quota = dict(MODEL_QUOTAS.get(model_id, DEFAULT_QUOTA))
+            # LLM_RATE_SHARE lets N cooperating processes each take 1/N of the account quota
+            share = float(os.getenv("LLM_RATE_SHARE", "1"))
+            quota["rpm"] = max(1, int(int(os.getenv("LLM_RPM", quota["rpm"])) * share))
+            quota["tpm"] = max(1, int(int(os.getenv("LLM_TPM", quota["tpm"])) * share))
+            limiter = AdaptiveRateLimiter(model_id, quota["rpm"], quota["tpm"])
+            _rate_limiters[model_id] = limiter
+        return limiter
+
+def wait_for_rate_limit_cooldown():
+    """Block until no model is in a post-429 cooldown; returns immediately otherwise"""
+    with _rate_limiters_lock:
+        remaining = max((limiter.cooldown_remaining() for limiter in _rate_limiters.values()), default=0.0)
+    if remaining > 0:
+        time.sleep(remaining)
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from types import GenericAlias
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+from google.genai import types
+
+from agentic.base.structured_output import json_schema
+
+DEFAULT_CACHE_DIR = Path(os.getenv("AGENTIC_CACHE_DIR", "agentic/cache"))
+DEFAULT_TTL_SECONDS = int(os.getenv("LLM_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+def _normalize_for_key(obj: Any) -> Any:
+    """Reduce prompt contents and configs to a stable JSON-able form for hashing"""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [_normalize_for_key(item) for item in obj]
+    if isinstance(obj, dict):
+        return {str(k): _normalize_for_key(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, types.File):
+        # Identify uploaded files by content hash so a re-upload of the same bytes still hits
+        return {"file": obj.sha256_hash or obj.uri or obj.name, "mime_type": obj.mime_type}
+    if isinstance(obj, types.GenerateContentConfig) and isinstance(obj.response_schema, (type, GenericAlias)):
+        # A Pydantic type does not serialize; its JSON schema does, and changes whenever the model does
+        config = obj.model_copy(update={"response_schema": None}).model_dump(mode="json", exclude_none=True)
+        return _normalize_for_key({**config, "response_schema": json_schema(obj.response_schema)})
+    if isinstance(obj, BaseModel):
+        return _normalize_for_key(obj.model_dump(mode="json", exclude_none=True))
+    return repr(obj)
+
+class ResponseCache:
+    """Content-addressed on-disk cache of model responses.
+
+    Entries are keyed on model id, prompt contents, cached-content/file identity
+    and generation config. They expire after a TTL and the least recently used
+    entries are evicted once the store grows past ``max_bytes``. SQLite in WAL
+    mode lets several processes share one cache file.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = os.getenv("LLM_RESPONSE_CACHE", "1") != "0"
+    ):
+        self.path = Path(path) if path else DEFAULT_CACHE_DIR / "responses.sqlite"
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.logger = logging.getLogger("ResponseCache")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(model_id: str, contents: Any, config: Any = None, extra: Any = None) -> str:
+        material = {
+            "model": model_id,
+            "contents": _normalize_for_key(contents),
+            "config": _normalize_for_key(config),
+            "extra": _normalize_for_key(extra)
+        }
+        encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT payload, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                payload, expires_at = row
+                if expires_at < now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+            return json.loads(payload)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def put(self, key: str, text: str, usage: Dict[str, Any], model_id: str = "", ttl_seconds: Optional[int] = None):
+        if not self.enabled or text is None:
+            return
+        now = time.time()
+        payload = json.dumps({"text": text, "usage": usage}, default=str)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model_id, payload, size, created_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model_id, payload, len(payload), now, now + ttl, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Response cache write failed: {e}")
+
+    def delete(self, key: str):
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.logger.warning(f"Response cache delete failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            stale_keys.append((key,))
+            freed += size
+            if total_size - freed <= target:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self.logger.info(f"Evicted {len(stale_keys)} cached responses ({freed} bytes)")
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
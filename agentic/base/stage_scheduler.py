@@ -0,0 +1,256 @@
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional
+
+from agentic.base.rate_limiter import wait_for_rate_limit_cooldown
+
+DEFAULT_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+
+# The abandon flag of the stage attempt running on this worker thread, if any
+_attempt = threading.local()
+
+class StageTimeoutError(Exception):
+    pass
+
+def attempt_abandoned() -> bool:
+    """True on a worker thread whose stage the scheduler has already timed out and stopped waiting on"""
+    abandoned = getattr(_attempt, "abandoned", None)
+    return abandoned is not None and abandoned.is_set()
+
+@dataclass
+class StageOutcome:
+    name: str
+    status: str = "pending"  # pending | running | completed | failed | timed_out | skipped
+    result: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    blocked_by: List[str] = field(default_factory=list)
+    resumed: bool = False
+
+    @property
+    def duration_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class StageScheduler:
+    """Runs pipeline stages as a dependency graph on a thread pool.
+
+    Stages are the ``pipeline_stages`` dicts used by MetaAgent: ``name``,
+    optional ``dependencies``, ``timeout_minutes`` and ``retry_count``. A stage
+    is submitted as soon as every dependency has completed. ``timeout_minutes``
+    bounds the stage including its retries; a stage that overruns is reported
+    as timed out and its worker thread is abandoned (Python threads cannot be
+    killed). Abandoned workers do not count against ``max_workers``: the pool
+    has a spare thread per stage for them, and ``attempt_abandoned()`` lets
+    the ProcessLog tag anything they still write. A failed, timed-out or
+    invalid stage only skips the stages that depend on it, directly or
+    transitively; independent branches keep running.
+    """
+
+    def __init__(
+        self,
+        stages: List[Dict[str, Any]],
+        execute: Callable[[Dict[str, Any]], Any],
+        validate: Optional[Callable[[Dict[str, Any], Any], bool]] = None,
+        can_start: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        on_complete: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+        completed: Optional[Dict[str, Any]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS
+    ):
+        self.stages = {stage["name"]: stage for stage in stages}
+        self.order = [stage["name"] for stage in stages]
+        self.execute = execute
+        self.validate = validate
+        self.can_start = can_start
+        self.on_complete = on_complete
+        self.max_workers = max(1, max_workers)
+        self.logger = logging.getLogger("StageScheduler")
+        self.outcomes: Dict[str, StageOutcome] = {name: StageOutcome(name) for name in self.order}
+        self._lock = threading.Lock()
+        self._check_graph()
+        self._restore(completed or {})
+
+    def _restore(self, completed: Dict[str, Any]):
+        """Mark stages finished by an earlier run as completed, provided everything upstream of them was too"""
+        for name in self._topological_order():
+            dependencies = self.stages[name].get("dependencies", [])
+            if name in completed and all(self.outcomes[d].status == "completed" for d in dependencies):
+                outcome = self.outcomes[name]
+                outcome.status = "completed"
+                outcome.result = completed[name]
+                outcome.resumed = True
+                self.logger.info(f"Stage {name} restored from checkpoint")
+
+    def _topological_order(self) -> List[str]:
+        ordered = []
+        remaining = list(self.order)
+        while remaining:
+            for name in remaining:
+                if all(d in ordered for d in self.stages[name].get("dependencies", [])):
+                    ordered.append(name)
+                    remaining.remove(name)
+                    break
+        return ordered
+
+    def _check_graph(self):
+        for name, stage in self.stages.items():
+            for dependency in stage.get("dependencies", []):
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        # Kahn's algorithm: anything left over sits on a cycle
+        indegree = {name: len(self.stages[name].get("dependencies", [])) for name in self.order}
+        ready = [name for name, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for name in self.order:
+                if current in self.stages[name].get("dependencies", []):
+                    indegree[name] -= 1
+                    if indegree[name] == 0:
+                        ready.append(name)
+        if visited != len(self.order):
+            cyclic = [name for name, degree in indegree.items() if degree > 0]
+            raise ValueError(f"Pipeline stages contain a dependency cycle: {cyclic}")
+
+    def _run_with_retry(self, stage: Dict[str, Any], deadline: Optional[float]) -> Any:
+        stage_name = stage["name"]
+        max_retries = stage.get("retry_count", 1)
+        outcome = self.outcomes[stage_name]
+
+        for attempt in range(max_retries + 1):
+            outcome.attempts = attempt + 1
+            try:
+                self.logger.info(f"Executing stage {stage_name} (attempt {attempt + 1}/{max_retries + 1})")
+                return self.execute(stage)
+            except Exception as e:
+                self.logger.error(f"Stage {stage_name} attempt {attempt + 1} failed: {str(e)}")
+                if attempt == max_retries:
+                    raise Exception(f"Stage {stage_name} failed after {attempt + 1} attempts: {str(e)}")
+                if deadline is not None and time.time() >= deadline:
+                    raise StageTimeoutError(f"Stage {stage_name} ran out of time after {attempt + 1} attempts: {str(e)}")
+                # Only wait if the failure left a model in a rate-limit cooldown
+                wait_for_rate_limit_cooldown()
+
+    def _run_attempt(self, stage: Dict[str, Any], deadline: Optional[float], abandoned: threading.Event) -> Any:
+        _attempt.abandoned = abandoned
+        try:
+            return self._run_with_retry(stage, deadline)
+        finally:
+            _attempt.abandoned = None
+
+    def _deadline(self, stage: Dict[str, Any], started_at: float) -> Optional[float]:
+        timeout_minutes = stage.get("timeout_minutes")
+        return started_at + timeout_minutes * 60 if timeout_minutes else None
+
+    def _finish(self, name: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            outcome = self.outcomes[name]
+            outcome.status = status
+            outcome.result = result
+            outcome.error = error
+            outcome.finished_at = time.time()
+
+    def _skip_downstream(self):
+        # Loop to a fixpoint so skips cascade through every level of dependents
+        changed = True
+        while changed:
+            changed = False
+            for name in self.order:
+                outcome = self.outcomes[name]
+                if outcome.status != "pending":
+                    continue
+                dependencies = self.stages[name].get("dependencies", [])
+                blockers = [d for d in dependencies if self.outcomes[d].status in ("failed", "timed_out", "skipped")]
+                if blockers:
+                    outcome.status = "skipped"
+                    outcome.blocked_by = blockers
+                    outcome.error = f"Skipped because upstream stage(s) {', '.join(blockers)} did not complete"
+                    self.logger.warning(f"Stage {name}: {outcome.error}")
+                    changed = True
+
+    def _ready_stages(self) -> List[str]:
+        return [
+            name for name in self.order
+            if self.outcomes[name].status == "pending"
+            and all(self.outcomes[d].status == "completed" for d in self.stages[name].get("dependencies", []))
+        ]
+
+    def run(self) -> Dict[str, StageOutcome]:
+        # Each stage can be abandoned at most once, so one spare thread per stage keeps
+        # ``max_workers`` live stages running however many workers are stuck
+        executor = ThreadPoolExecutor(max_workers=self.max_workers + len(self.order), thread_name_prefix="stage")
+        running: Dict[Future, str] = {}
+        abandon_flags: Dict[Future, threading.Event] = {}
+        deadlines: Dict[str, Optional[float]] = {}
+        try:
+            while True:
+                for name in self._ready_stages():
+                    if len(running) >= self.max_workers:
+                        break
+                    stage = self.stages[name]
+                    if self.can_start is not None and not self.can_start(stage):
+                        self._finish(name, "failed", error=f"Dependencies not satisfied for stage {name}")
+                        self._skip_downstream()
+                        continue
+                    outcome = self.outcomes[name]
+                    outcome.status = "running"
+                    outcome.started_at = time.time()
+                    deadlines[name] = self._deadline(stage, outcome.started_at)
+                    self.logger.info(f"Starting stage: {name} - {stage.get('description', '')}")
+                    abandoned = threading.Event()
+                    future = executor.submit(self._run_attempt, stage, deadlines[name], abandoned)
+                    running[future] = name
+                    abandon_flags[future] = abandoned
+
+                if not running:
+                    break
+
+                pending_deadlines = [deadlines[name] for name in running.values() if deadlines[name] is not None]
+                wait_timeout = max(0.0, min(pending_deadlines) - time.time()) if pending_deadlines else None
+                done, _ = wait(list(running), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    abandon_flags.pop(future)
+                    try:
+                        result = future.result()
+                    except StageTimeoutError as e:
+                        self._finish(name, "timed_out", error=str(e))
+                        self._skip_downstream()
+                        continue
+                    except Exception as e:
+                        self._finish(name, "failed", error=str(e))
+                        self._skip_downstream()
+                        continue
+                    if deadlines[name] is not None and time.time() > deadlines[name]:
+                        self._finish(name, "timed_out", result=result, error=f"Stage {name} exceeded {self.stages[name]['timeout_minutes']} minute timeout")
+                        self._skip_downstream()
+                    elif self.validate is not None and not self.validate(self.stages[name], result):
+                        self._finish(name, "failed", result=result, error=f"Stage {name} output validation failed")
+                        self._skip_downstream()
+                    else:
+                        self._finish(name, "completed", result=result)
+                        self.logger.info(f"Stage {name} completed successfully")
+                        if self.on_complete is not None:
+                            self.on_complete(self.stages[name], result)
+
+                now = time.time()
+                for future, name in list(running.items()):
+                    if deadlines[name] is not None and now >= deadlines[name]:
+                        # The worker cannot be interrupted; stop waiting on it and release its dependents
+                        running.pop(future)
+                        abandon_flags.pop(future).set()
+                        self._finish(name, "timed_out", error=f"Stage {name} exceeded {self.stages[name]['timeout_minutes']} minute timeout")
+                        self._skip_downstream()
+                        self.logger.error(self.outcomes[name].error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self.outcomes
@@ -0,0 +1,101 @@
+import os
+import re
+import typing
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+# Repair calls allowed per structured request after its first response fails validation
+STRUCTURED_OUTPUT_REPAIRS = int(os.getenv("LLM_STRUCTURED_REPAIRS", "1"))
+# Output budget ceiling for repair calls, which get twice the original budget in case the first answer was cut off
+MAX_REPAIR_TOKENS = 8192
+
+FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+class StructuredOutputError(ValueError):
+    """A model response that still did not match its schema after the allowed repairs"""
+
+    def __init__(self, schema_name: str, text: str, error: str):
+        super().__init__(f"{schema_name} response did not match its schema: {error}")
+        self.schema_name = schema_name
+        self.text = text
+        self.error = error
+
+@lru_cache(maxsize=None)
+def schema_adapter(schema: Any) -> TypeAdapter:
+    """One TypeAdapter per schema type (a Pydantic model or e.g. ``List[Model]``); building them is not free"""
+    return TypeAdapter(schema)
+
+def schema_name(schema: Any) -> str:
+    return getattr(schema, "__name__", None) or str(schema).replace("typing.", "")
+
+def json_schema(schema: Any) -> Dict[str, Any]:
+    """JSON Schema of ``schema``; structured requests are cached under it, so editing a model invalidates its answers"""
+    return schema_adapter(schema).json_schema()
+
+def response_schema(schema: Any) -> Any:
+    """
+    ``schema`` as google-genai's ``response_schema`` takes it, so the model decodes against the
+    same type we validate with. The SDK accepts Pydantic models and builtin generics such as
+    ``list[Model]`` but not ``typing.List[Model]``.
+    """
+    if typing.get_origin(schema) is list:
+        return list[response_schema(typing.get_args(schema)[0])]
+    return schema
+
+def parse_structured(text: Optional[str], schema: Any) -> Any:
+    """
+    Validate a response against ``schema`` with pydantic-core's JSON parser (no intermediate
+    ``json.loads``) and return it as plain dicts/lists. Raises ValidationError, also for a
+    response with no text at all (blocked, filtered or empty).
+    """
+    adapter = schema_adapter(schema)
+    value = adapter.validate_json(FENCE.sub("", (text or "").strip()))
+    return adapter.dump_python(value, mode="json")
+
+def describe_errors(error: ValidationError, limit: int = 10) -> List[str]:
+    return [f"{'.'.join(map(str, e['loc'])) or 'response'}: {e['msg']}" for e in error.errors(include_url=False)[:limit]]
+
+def repair_prompt(prompt: Any, text: str, error: ValidationError) -> Any:
+    """Follow-up asking the model to correct its own response; the original prompt is kept so a cut-off answer can be completed"""
+    problems = "\n        ".join(f"- {problem}" for problem in describe_errors(error))
+    instruction = f"""
+        Your previous response to the request above could not be used:
+        {problems}
+
+        Previous response:
+        {text[:4000]}
+
+        Return the complete corrected response as JSON matching the schema, with no other text.
+        """
+    if isinstance(prompt, list):
+        return prompt + [instruction]
+    return f"{prompt}\n{instruction}"
+
+class StructuredOutputStats:
+    """Per-schema counts of structured calls, first-pass parse failures, repairs and unrecovered failures"""
+
+    FIELDS = ("calls", "parse_failures", "repair_calls", "repaired", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_schema: Dict[str, Dict[str, int]] = {}
+
+    def record(self, schema: str, **counts: int):
+        with self._lock:
+            entry = self.by_schema.setdefault(schema, dict.fromkeys(self.FIELDS, 0))
+            for field, count in counts.items():
+                entry[field] += count
+
+    def summary(self, by_schema: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+        by_schema = self.by_schema if by_schema is None else by_schema
+        totals = {field: sum(entry[field] for entry in by_schema.values()) for field in self.FIELDS}
+        calls = totals["calls"]
+        return {
+            **totals,
+            "parse_failure_rate": round(totals["parse_failures"] / calls, 4) if calls else 0.0,
+            "unrecovered_rate": round(totals["failed"] / calls, 4) if calls else 0.0,
+            "by_schema": {name: dict(entry) for name, entry in by_schema.items()}
+        }
@@ -0,0 +1,187 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import time
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+# Nothing from agentic is imported at module level: worker processes must set their share of the
+# rate budget in the environment before the limiters read it on first import/use
+DEFAULT_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "2"))
+# Each company's metadata log and extracted sheets live under their own directory here
+BATCH_WORKSPACE_DIR = os.getenv("BATCH_WORKSPACE_DIR", "agentic/logs/batch")
+
+SUMMARY_COLUMNS = [
+    "company",
+    "data_directory",
+    "status",
+    "failed_stage",
+    "error",
+    "pipeline_minutes",
+    "wall_seconds",
+    "prompt_tokens",
+    "candidates_tokens",
+    "total_tokens",
+    "cached_responses",
+    "parse_failure_rate",
+    "financial_health_score",
+    "results_file"
+]
+
+def load_manifest(manifest_path: str) -> List[Dict[str, str]]:
+    """
+    Read the companies to screen from a manifest.
+
+    Accepts a JSON list of data directories or of {"company", "data_directory"} objects,
+    or a text file with one data directory per line (blank lines and # comments ignored).
+    """
+    path = Path(manifest_path)
+    if path.suffix == ".json":
+        entries = json.loads(path.read_text())
+    else:
+        entries = [line.strip() for line in path.read_text().splitlines() if line.strip() and not line.strip().startswith("#")]
+
+    companies = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"data_directory": entry}
+        data_directory = str(Path(entry["data_directory"]).expanduser())
+        companies.append({"company": entry.get("company") or Path(data_directory).name, "data_directory": data_directory})
+    return companies
+
+def _init_worker(worker_count: int):
+    """Give each worker an equal slice of the account's request/token budget and LLM concurrency"""
+    os.environ["LLM_RATE_SHARE"] = str(1.0 / worker_count)
+    total_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    os.environ["LLM_MAX_CONCURRENCY"] = str(max(1, total_concurrency // worker_count))
+
+def _summary_row(company: Dict[str, str], result: Dict[str, Any], wall_seconds: float) -> Dict[str, Any]:
+    summary = result.get("pipeline_summary", {})
+    token_usage = summary.get("token_usage", {})
+    final_results = result.get("final_results") or result.get("partial_results") or {}
+    return {
+        "company": company["company"],
+        "data_directory": company["data_directory"],
+        "status": result.get("status", "unknown"),
+        "failed_stage": result.get("stage"),
+        "error": result.get("error"),
+        "pipeline_minutes": summary.get("total_duration_minutes"),
+        "wall_seconds": round(wall_seconds, 1),
+        "prompt_tokens": token_usage.get("prompt"),
+        "candidates_tokens": token_usage.get("candidates"),
+        "total_tokens": token_usage.get("total"),
+        "cached_responses": token_usage.get("cached_responses"),
+        "parse_failure_rate": summary.get("structured_output", {}).get("parse_failure_rate"),
+        "financial_health_score": final_results.get("financial_ratio_analysis", {}).get("financial_health_score"),
+        "results_file": result.get("results_saved_to")
+    }
+
+def company_workspace(company: Dict[str, str]) -> Path:
+    """Per-company output directory; the data directory hash keeps two companies with the same name apart"""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", company["company"]).strip("_") or "company"
+    digest = hashlib.sha1(str(Path(company["data_directory"]).resolve()).encode()).hexdigest()[:8]
+    return Path(BATCH_WORKSPACE_DIR) / f"{slug}_{digest}"
+
+def _run_company(company: Dict[str, str], config_path: str, resume: bool) -> Dict[str, Any]:
+    """Worker entry point: run one pipeline and return only its summary row, never the full results"""
+    started = time.time()
+    # Workers run one company at a time, so the harvest output paths can be set process-wide
+    workspace = company_workspace(company)
+    os.environ["HARVEST_LOG_DIR"] = str(workspace)
+    os.environ["HARVEST_SHEETS_DIR"] = str(workspace / "extracted_sheets")
+    try:
+        from meta_agent import MetaAgent
+        meta_agent = MetaAgent(config_path)
+        result = meta_agent.execute_pipeline(company["data_directory"], resume=resume)
+    except Exception as e:
+        # One bad data room must not take down the rest of the batch
+        result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    return _summary_row(company, result, time.time() - started)
+
+def run_batch(
+    companies: List[Dict[str, str]],
+    max_workers: int = DEFAULT_WORKERS,
+    config_path: str = "agentic/config.yaml",
+    resume: bool = False,
+    output_path: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Run the gold loan NBFC pipeline for many companies with bounded process-level parallelism.
+
+    Workers split the API rate budget evenly and share the on-disk upload manifest,
+    context cache index and response cache, so documents common to several data
+    rooms are uploaded and summarized once. Each company writes its metadata log and
+    extracted sheets under its own ``BATCH_WORKSPACE_DIR`` subdirectory.
+
+    Args:
+        companies: Dicts with "company" and "data_directory"
+        max_workers: Maximum number of pipelines running at once
+        config_path: Path to configuration file passed to each MetaAgent
+        resume: Resume each company from its last checkpoint
+        output_path: Where to write the consolidated summary CSV
+
+    Returns:
+        Summary table with one row per company, in input order
+    """
+    logger = logging.getLogger("BatchRunner")
+    worker_count = max(1, min(max_workers, len(companies)))
+    rows = {}
+
+    # spawn rather than fork: the parent may hold HTTP pools and threads that must not be copied
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=worker_count, mp_context=context, initializer=_init_worker, initargs=(worker_count,)) as executor:
+        futures = {
+            executor.submit(_run_company, company, config_path, resume): index
+            for index, company in enumerate(companies)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            company = companies[index]
+            try:
+                rows[index] = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed or out of memory)
+                rows[index] = _summary_row(company, {"status": "failed", "error": f"Worker crashed: {e}"}, 0.0)
+            logger.info(f"{company['company']}: {rows[index]['status']}")
+
+    summary = pd.DataFrame([rows[index] for index in range(len(companies))], columns=SUMMARY_COLUMNS)
+
+    if output_path is None:
+        output_path = f"agentic/logs/batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(output_path, index=False)
+    logger.info(f"Batch summary saved to {output_path}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen several gold loan NBFC data rooms in parallel")
+    parser.add_argument("data_directories", nargs="*", help="Data directories to analyze")
+    parser.add_argument("--manifest", help="JSON or text file listing data directories")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Maximum concurrent pipelines")
+    parser.add_argument("--config", default="agentic/config.yaml", help="Path to configuration file")
+    parser.add_argument("--resume", action="store_true", help="Resume each company from its last checkpoint")
+    parser.add_argument("--output", help="Path of the summary CSV")
+    args = parser.parse_args()
+
+    companies = [{"company": Path(d).name, "data_directory": d} for d in args.data_directories]
+    if args.manifest:
+        companies.extend(load_manifest(args.manifest))
+    if not companies:
+        parser.print_usage()
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    summary = run_batch(companies, args.workers, args.config, args.resume, args.output)
+    print("\n" + "="*50)
+    print("GOLD LOAN NBFC BATCH SCREENING RESULTS")
+    print("="*50)
+    print(summary[["company", "status", "wall_seconds", "total_tokens", "financial_health_score"]].to_string(index=False))
@@ -1,8 +1,21 @@
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
+from pydantic import BaseModel
 from typing import Dict, Any, List
 from dotenv import load_dotenv
 load_dotenv()
 
+class FindingsValidation(BaseModel):
+    scores: List[int]
+    overall: float
+    comments: str
+    valid: bool
+
+class ThesisReadiness(BaseModel):
+    proceed: bool
+    confidence: int
+    critical_gaps: List[str]
+    action_items: List[str]
+
 class AnalystCheckerAgent(BaseAgent):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         super().__init__(model_id)
@@ -83,19 +96,19 @@ class AnalystCheckerAgent(BaseAgent):
         4. Do findings demonstrate deep understanding of gold loan business?
         5. Are findings consistent with each other?
         
-        Rate each criterion (1-5) and provide overall score.
-        Format: {{"scores": [X,X,X,X,X], "overall": X, "comments": "...", "valid": true/false}}
+        Rate each criterion (1-5) in order, give an overall score (1-5), brief comments,
+        and whether the findings are valid for an investment decision.
         """
         
         try:
-            response = self._generate_response(validation_prompt, temperature=0.2, max_tokens=300)
-            validation = eval(response.strip())
+            validation, _ = self._generate_structured(validation_prompt, FindingsValidation, temperature=0.2, max_tokens=300)
             
             validation["finding_count"] = len(key_findings)
             validation["categories_covered"] = len(set(f["category"] for f in key_findings))
             
             return validation
-        except:
+        except Exception as e:
+            self.logger.warning(f"Could not validate key findings: {str(e)}")
             return {
                 "valid": False,
                 "issues": ["Could not validate findings quality"],
@@ -176,17 +189,15 @@ class AnalystCheckerAgent(BaseAgent):
         2. Are there critical gaps that block investment decision?
         3. Confidence level in proceeding (1-5)
         4. Key action items before proceeding
-        
-        Respond as JSON: {{"proceed": true/false, "confidence": X, "critical_gaps": [], "action_items": []}}
         """
         
         try:
-            readiness_assessment = self._generate_response(investment_thesis_prompt, temperature=0.2, max_tokens=400)
-            thesis_readiness = eval(readiness_assessment.strip())
+            thesis_readiness, _ = self._generate_structured(investment_thesis_prompt, ThesisReadiness, temperature=0.2, max_tokens=400)
             thesis_readiness["readiness_score"] = readiness_score
             thesis_readiness["readiness_factors"] = readiness_factors
             return thesis_readiness
-        except:
+        except Exception as e:
+            self.logger.warning(f"Could not assess investment thesis readiness: {str(e)}")
             return {
                 "proceed": readiness_score >= 4,
                 "confidence": min(readiness_score, 5),
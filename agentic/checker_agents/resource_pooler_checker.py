@@ -5,6 +5,7 @@ from pathlib import Path
 from collections import defaultdict
 from pydantic import BaseModel, Field
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
+from agentic.ingestion.harvest_manifest import harvest_log_path
 from typing import Dict, Any, List
 from dotenv import load_dotenv
 load_dotenv()
@@ -26,7 +27,7 @@ class ResourcePoolerCheckerAgent(BaseAgent):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         super().__init__(model_id)
         self.logger = logging.getLogger("ResourcePoolerCheckerAgent")
-        self.log_file = Path("agentic/logs/resource_pooler.log")
+        self.log_file = harvest_log_path()
         self.required_document_types = [
             "annual_report", "financial_statements", "debenture_trust_deed", 
             "portfolio_data", "operations_data", "alm_data", "regulatory_circular"
@@ -0,0 +1,2 @@
+from agentic.ingestion.excel_engine import *
+from agentic.ingestion.harvest_manifest import *
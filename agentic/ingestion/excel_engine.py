@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import threading
+import importlib.util
+import multiprocessing
+from dataclasses import dataclass, field
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+DEFAULT_INGEST_WORKERS = int(os.getenv("EXCEL_INGEST_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Below this many sheets the cost of starting worker processes outweighs parsing them in parallel
+MIN_SHEETS_FOR_POOL = int(os.getenv("EXCEL_INGEST_MIN_SHEETS_FOR_POOL", "4"))
+# Small workbooks parse in well under a second, so they are read in-process whatever their sheet count
+MIN_BYTES_FOR_POOL = int(os.getenv("EXCEL_INGEST_MIN_BYTES_FOR_POOL", str(2 * 1024 * 1024)))
+
+def calamine_available() -> bool:
+    """The Rust calamine reader parses xlsx several times faster than openpyxl when installed"""
+    return importlib.util.find_spec("python_calamine") is not None
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+def safe_sheet_name(sheet_name: str) -> str:
+    return "".join(c for c in sheet_name if c.isalnum() or c in [" ", "_"]).rstrip()
+
+def _reader_engine(excel_file_path: str) -> str:
+    if Path(excel_file_path).suffix.lower() == ".xls":
+        return "calamine" if calamine_available() else "xlrd"
+    return "calamine" if calamine_available() else "openpyxl"
+
+def _to_parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Report-style sheets mix text and numbers in one column; Arrow needs one type per column
+    mixed = [c for c in df.columns if df[c].dtype == object]
+    frame = df.astype({c: "string" for c in mixed}) if mixed else df
+    frame.columns = [str(c) for c in frame.columns]
+    return frame
+
+def _extract_sheet_group(excel_file_path: str, sheet_names: List[str], output_dir: str, write_parquet: bool) -> List[Dict[str, Any]]:
+    """Worker: open the workbook once and write every sheet in ``sheet_names``"""
+    engine = _reader_engine(excel_file_path)
+    excel_file_name = Path(excel_file_path).stem
+    frames = pd.read_excel(excel_file_path, sheet_name=sheet_names, engine=engine)
+
+    results = []
+    for sheet_name in sheet_names:
+        df = frames[sheet_name]
+        result = {"sheet_name": sheet_name, "rows": int(df.shape[0]), "columns": int(df.shape[1]), "csv_path": None, "parquet_path": None}
+        if df.shape[0] >= 1 and df.shape[1] >= 1:
+            csv_path = Path(output_dir) / f"{excel_file_name}_{safe_sheet_name(sheet_name)}.csv"
+            df.to_csv(csv_path, index=False)
+            result["csv_path"] = str(csv_path)
+            if write_parquet:
+                parquet_path = csv_path.with_suffix(".parquet")
+                try:
+                    _to_parquet_frame(df).to_parquet(parquet_path, index=False)
+                    result["parquet_path"] = str(parquet_path)
+                except Exception as e:
+                    result["parquet_error"] = str(e)
+        results.append(result)
+    return results
+
+@dataclass
+class ExcelIngestionResult:
+    source_path: str
+    csv_files: Dict[str, str] = field(default_factory=dict)
+    parquet_files: Dict[str, str] = field(default_factory=dict)
+    skipped_sheets: Dict[str, tuple] = field(default_factory=dict)
+    rows: int = 0
+    source_bytes: int = 0
+    elapsed_seconds: float = 0.0
+    engine: str = ""
+    workers: int = 1
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.source_bytes / (1024 * 1024) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sheets": len(self.csv_files),
+            "skipped_sheets": len(self.skipped_sheets),
+            "rows": self.rows,
+            "source_mb": round(self.source_bytes / (1024 * 1024), 3),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "mb_per_second": round(self.mb_per_second, 3),
+            "engine": self.engine,
+            "workers": self.workers
+        }
+
+class ExcelIngestionEngine:
+    """Extracts every sheet of a workbook to CSV, plus Parquet when pyarrow is installed.
+
+    Sheets are split into one group per worker process and each worker opens
+    the workbook once, so large multi-month workbooks parse on all cores. The
+    process pool is started on the first large workbook and reused for every
+    later one until ``close``; small workbooks are parsed in-process.
+    Reading goes through pandas with the calamine engine when available and
+    openpyxl (read-only, values only) otherwise, so the CSVs are identical to
+    what ``pd.read_excel`` produced before.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_INGEST_WORKERS, write_parquet: Optional[bool] = None):
+        self.max_workers = max(1, max_workers)
+        self.write_parquet = parquet_available() if write_parquet is None else write_parquet
+        self.logger = logging.getLogger("ExcelIngestionEngine")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn keeps the parent's HTTP client threads out of the workers
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._executor
+
+    def close(self):
+        """Shut down the worker processes; the next large workbook starts a new pool"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _sheet_names(self, excel_file_path: str) -> List[str]:
+        with pd.ExcelFile(excel_file_path, engine=_reader_engine(excel_file_path)) as excel_file:
+            return list(excel_file.sheet_names)
+
+    def extract(self, excel_file_path: str, output_dir: str = "extracted_sheets", sheet_names: Optional[List[str]] = None) -> ExcelIngestionResult:
+        started = time.perf_counter()
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        if sheet_names is None:
+            sheet_names = self._sheet_names(excel_file_path)
+
+        source_bytes = Path(excel_file_path).stat().st_size
+        use_pool = len(sheet_names) >= MIN_SHEETS_FOR_POOL and source_bytes >= MIN_BYTES_FOR_POOL
+        workers = min(self.max_workers, len(sheet_names)) if use_pool else 1
+        groups = [sheet_names[i::workers] for i in range(workers)] if sheet_names else []
+
+        if workers > 1:
+            executor = self._pool()
+            futures = [executor.submit(_extract_sheet_group, excel_file_path, group, output_dir, self.write_parquet) for group in groups]
+            sheet_results = [result for future in futures for result in future.result()]
+        else:
+            sheet_results = [result for group in groups for result in _extract_sheet_group(excel_file_path, group, output_dir, self.write_parquet)]
+
+        result = ExcelIngestionResult(
+            source_path=str(excel_file_path),
+            source_bytes=source_bytes,
+            engine=_reader_engine(excel_file_path),
+            workers=workers
+        )
+        by_sheet = {sheet_result["sheet_name"]: sheet_result for sheet_result in sheet_results}
+        # Report sheets in workbook order regardless of which worker handled them
+        for sheet_name in sheet_names:
+            sheet_result = by_sheet[sheet_name]
+            if sheet_result["csv_path"] is None:
+                result.skipped_sheets[sheet_name] = (sheet_result["rows"], sheet_result["columns"])
+                self.logger.warning(f"Sheet '{sheet_name}' skipped due to insufficient data: shape={result.skipped_sheets[sheet_name]}")
+                continue
+            result.csv_files[sheet_name] = sheet_result["csv_path"]
+            result.rows += sheet_result["rows"]
+            if sheet_result.get("parquet_path"):
+                result.parquet_files[sheet_name] = sheet_result["parquet_path"]
+            elif "parquet_error" in sheet_result:
+                self.logger.warning(f"Parquet output failed for sheet '{sheet_name}': {sheet_result['parquet_error']}")
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
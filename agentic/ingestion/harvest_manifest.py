@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves still merge, just without the cross-process lock
+    fcntl = None
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.base.file_manifest import hash_file
+
+MANIFEST_VERSION = 2
+
+# Where a harvest writes its metadata log and extracted sheets; HARVEST_LOG_DIR / HARVEST_SHEETS_DIR override per process
+DEFAULT_HARVEST_LOG_DIR = "agentic/logs"
+DEFAULT_HARVEST_SHEETS_DIR = "extracted_sheets"
+
+def harvest_log_path() -> Path:
+    return Path(os.getenv("HARVEST_LOG_DIR", DEFAULT_HARVEST_LOG_DIR)) / "resource_pooler.log"
+
+def _stat(path: Path) -> Tuple[int, float]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime
+
+class HarvestManifest:
+    """File-state record of the last document harvest.
+
+    For every source file it keeps size, mtime and SHA-256, plus the metadata
+    line written to ``resource_pooler.log``; workbooks also keep one record per
+    extracted sheet (CSV path, size, mtime, hash and metadata). A file whose
+    size and mtime are unchanged is trusted without re-hashing; otherwise its
+    hash decides. It also remembers which entries each metadata log currently
+    holds, so a log can be appended to rather than rewritten when possible.
+
+    Several processes (batch workers) may share one manifest: ``save`` merges
+    with the on-disk copy under a file lock and only overwrites the entries this
+    process recorded or pruned, so concurrent harvests keep each other's files.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else DEFAULT_CACHE_DIR / "harvest_manifest.json"
+        self.logger = logging.getLogger("HarvestManifest")
+        self._lock = threading.RLock()
+        manifest = self._read()
+        self.files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+        self.logs: Dict[str, Dict[str, Any]] = manifest.get("logs", {})
+        self._touched = set()
+        self._removed = set()
+        self._touched_logs = set()
+
+    def _read(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            manifest = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Ignoring unreadable harvest manifest {self.path}: {e}")
+            return {}
+        if manifest.get("version") == 1:
+            # Version 1 kept a single log state; it is the state of that one log path
+            log = manifest.get("log") or {}
+            manifest["logs"] = {log["path"]: log} if log.get("path") else {}
+        elif manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest
+
+    @contextmanager
+    def _file_lock(self):
+        lock_path = self.path.with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                on_disk = self._read()
+                files = {key: entry for key, entry in on_disk.get("files", {}).items() if key not in self._removed}
+                files.update({key: self.files[key] for key in self._touched if key in self.files})
+                logs = dict(on_disk.get("logs", {}))
+                logs.update({path: self.logs[path] for path in self._touched_logs})
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps({
+                    "version": MANIFEST_VERSION,
+                    "updated_at": time.time(),
+                    "files": files,
+                    "logs": logs
+                }, default=str))
+                tmp_path.replace(self.path)
+            self.files, self.logs = files, logs
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return str(Path(file_path).resolve())
+
+    def check_file(self, file_path: str) -> Tuple[bool, str]:
+        """Return (changed, sha256) for a source file, hashing only when size or mtime moved"""
+        path = Path(file_path)
+        size, mtime = _stat(path)
+        with self._lock:
+            entry = self.files.get(self.key(file_path))
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return False, entry["sha256"]
+        content_hash = hash_file(str(path))
+        if entry and entry["sha256"] == content_hash:
+            # Touched but identical: refresh the stat so the next run takes the fast path
+            with self._lock:
+                entry["size"], entry["mtime"] = size, mtime
+                self._touched.add(self.key(file_path))
+            return False, content_hash
+        return True, content_hash
+
+    def metadata(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.files.get(self.key(file_path))
+            return entry.get("metadata") if entry else None
+
+    def intact_sheets(self, file_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Previously extracted sheets of a workbook, if every CSV is still on disk unmodified"""
+        with self._lock:
+            entry = self.files.get(self.key(file_path))
+            sheets = entry.get("sheets") if entry else None
+        if not sheets:
+            return None
+        for sheet in sheets.values():
+            csv_path = Path(sheet["csv_path"])
+            if not csv_path.exists() or _stat(csv_path) != (sheet["size"], sheet["mtime"]):
+                return None
+        return sheets
+
+    def sheet(self, file_path: str, sheet_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.files.get(self.key(file_path))
+            return (entry.get("sheets") or {}).get(sheet_name) if entry else None
+
+    def sheet_record(self, csv_path: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        size, mtime = _stat(Path(csv_path))
+        return {"csv_path": str(csv_path), "size": size, "mtime": mtime, "sha256": hash_file(csv_path), "metadata": metadata}
+
+    def record_file(self, file_path: str, content_hash: str, metadata: Optional[Dict[str, Any]] = None, sheets: Optional[Dict[str, Dict[str, Any]]] = None):
+        size, mtime = _stat(Path(file_path))
+        entry = {"path": str(file_path), "size": size, "mtime": mtime, "sha256": content_hash, "metadata": metadata}
+        if sheets is not None:
+            entry["sheets"] = sheets
+        with self._lock:
+            self.files[self.key(file_path)] = entry
+            self._touched.add(self.key(file_path))
+            self._removed.discard(self.key(file_path))
+
+    def prune(self, root: str, seen_keys: List[str]):
+        """Forget files under ``root`` that no longer exist; entries for other data directories are kept"""
+        root_prefix = str(Path(root).resolve()) + os.sep
+        seen = set(seen_keys)
+        with self._lock:
+            for key in list(self.files):
+                if key.startswith(root_prefix) and key not in seen:
+                    del self.files[key]
+                    self._removed.add(key)
+                    self._touched.discard(key)
+
+    def log_keys(self, log_path: Path) -> List[str]:
+        """Entry keys last written to ``log_path``, in order"""
+        with self._lock:
+            return list(self.logs.get(str(log_path.resolve()), {}).get("keys", []))
+
+    def log_matches(self, log_path: Path, line_keys: List[str]) -> bool:
+        """True if ``log_path`` still holds exactly the lines recorded for ``line_keys``, in that order"""
+        with self._lock:
+            state = self.logs.get(str(log_path.resolve()))
+        if not log_path.exists() or not state:
+            return False
+        size, mtime = _stat(log_path)
+        return state.get("keys") == line_keys and state.get("size") == size and state.get("mtime") == mtime
+
+    def record_log(self, log_path: Path, line_keys: List[str]):
+        size, mtime = _stat(log_path)
+        path = str(log_path.resolve())
+        with self._lock:
+            self.logs[path] = {"path": path, "keys": list(line_keys), "size": size, "mtime": mtime}
+            self._touched_logs.add(path)
@@ -1,11 +1,34 @@
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
-from typing import Dict, Any, List
+from agentic.base.concurrency import run_async
+from agentic.analytics.alm import analyze_alm
+from agentic.analytics.roll_rates import analyze_portfolio_migration
+from agentic.retrieval.routing import CATEGORY_TERMS, DocumentRouter, harvested_documents
+from agentic.retrieval.chunks import INLINE_CONTEXT_CHARS, ChunkIndex, render_chunks
+from pydantic import BaseModel, Field
+import asyncio
+from typing import Dict, Any, List, Tuple
 from dotenv import load_dotenv
 load_dotenv()
 
+class DocumentAnswer(BaseModel):
+    answer: str = Field(description="Direct answer with specific figures where available")
+    confidence: int = Field(description="Confidence 1-5 based on data quality")
+    key_metrics: List[str]
+    investment_impact: str
+    data_gaps: List[str]
+
+class BatchAnswer(DocumentAnswer):
+    question_index: int = Field(description="Index of the question as numbered in the prompt")
+
 class AnalystAgent(BaseAgent):
-    def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
+    def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17", batch_mode: str = "category"):
         super().__init__(model_id)
+        # "question": one request per question per cache plus a synthesis call (original behaviour)
+        # "category": one structured request per cache per category plus one synthesis per category
+        # "cache": one structured request per cache covering every question routed to it
+        if batch_mode not in ("question", "category", "cache"):
+            raise ValueError(f"Unknown batch_mode: {batch_mode}")
+        self.batch_mode = batch_mode
         self.analysis_questions = {
             "business_strategy": [
                 "How has the share of non-gold collateral products evolved (% of AUM) FY21-FY25?",
@@ -35,8 +58,16 @@ class AnalystAgent(BaseAgent):
                 "Has Tier-I CRAR ever fallen within 200 bp of regulatory minimum; what remedial actions?"
             ]
         }
+        # Questions answered exactly from the ALM/IRS returns instead of by reading documents
+        self.computed_questions = {
+            ("liquidity_alm", self.analysis_questions["liquidity_alm"][0]): "one_year_alm_gap",
+            ("liquidity_alm", self.analysis_questions["liquidity_alm"][1]): "nii_rate_shock"
+        }
     
     def _query_documents_for_question(self, question: str, cache_ids: List[str], category: str) -> Dict[str, Any]:
+        return run_async(self._aquery_documents_for_question(question, cache_ids, category))
+    
+    async def _aquery_documents_for_question(self, question: str, cache_ids: List[str], category: str) -> Dict[str, Any]:
         if not cache_ids:
             return {"answer": "No cached documents available", "confidence": 0, "sources": []}
         
@@ -57,21 +88,22 @@ class AnalystAgent(BaseAgent):
         Focus on quantitative data and specific metrics where possible.
         """
         
+        # Limit to top 3 most relevant documents, queried concurrently
+        target_caches = cache_ids[:3]
+        responses = await asyncio.gather(
+            *(self._agenerate_response(context_prompt, temperature=0.2, max_tokens=500, use_cache=cache_id) for cache_id in target_caches),
+            return_exceptions=True
+        )
+        
         answers = []
-        for cache_id in cache_ids[:3]:  # Limit to top 3 most relevant documents
-            try:
-                response = self._generate_response(
-                    context_prompt, 
-                    temperature=0.2, 
-                    max_tokens=500,
-                    use_cache=cache_id
-                )
-                answers.append({
-                    "cache_id": cache_id,
-                    "response": response
-                })
-            except Exception as e:
-                self.logger.error(f"Error querying cache {cache_id}: {str(e)}")
+        for cache_id, response in zip(target_caches, responses):
+            if isinstance(response, Exception):
+                self.logger.error(f"Error querying cache {cache_id}: {str(response)}")
+                continue
+            answers.append({
+                "cache_id": cache_id,
+                "response": response[0]
+            })
         
         if not answers:
             return {"answer": "Unable to query documents", "confidence": 0, "sources": []}
@@ -87,17 +119,15 @@ class AnalystAgent(BaseAgent):
         2. Confidence level (1-5)
         3. Key supporting data points
         4. Investment implications
-        
-        Format as structured JSON:
-        {{"answer": "...", "confidence": X, "key_metrics": [], "investment_impact": "...", "data_gaps": []}}
+        5. Remaining data gaps
         """
         
         try:
-            synthesis = self._generate_response(synthesis_prompt, temperature=0.3, max_tokens=400)
-            result = eval(synthesis.strip())
+            result, _ = await self._agenerate_structured(synthesis_prompt, DocumentAnswer, temperature=0.3, max_tokens=400)
             result["sources"] = [ans["cache_id"] for ans in answers]
             return result
-        except:
+        except Exception as e:
+            self.logger.warning(f"Synthesis failed for question '{question[:50]}', using the first source answer: {str(e)}")
             return {
                 "answer": answers[0]["response"] if answers else "No response available",
                 "confidence": 2,
@@ -107,33 +137,292 @@ class AnalystAgent(BaseAgent):
                 "data_gaps": ["Unable to synthesize responses"]
             }
     
-    def _prioritize_documents_by_relevance(self, pdf_analyses: Dict, category: str) -> List[str]:
-        relevance_scores = []
+    async def _aquery_category(self, questions: List[str], question_cache_ids: List[List[str]], category: str) -> List[Dict[str, Any]]:
+        return await asyncio.gather(
+            *(self._aquery_documents_for_question(question, cache_ids, category) for question, cache_ids in zip(questions, question_cache_ids))
+        )
+    
+    def _batch_max_tokens(self, question_count: int) -> int:
+        return min(8192, 350 * question_count)
+    
+    def _index_batch_answers(self, answers: List[Dict[str, Any]], question_count: int) -> Dict[int, Dict[str, Any]]:
+        return {answer["question_index"]: answer for answer in answers if 0 <= answer["question_index"] < question_count}
+    
+    async def _aquery_cache_batch(self, cache_id: str, specs: List[Tuple[str, str]]) -> Dict[int, Dict[str, Any]]:
+        numbered_questions = "\n".join(f"{i}. [{category}] {question}" for i, (category, question) in enumerate(specs))
+        batch_prompt = f"""
+        You are analyzing documents for a gold loan NBFC investment decision.
+        
+        Answer each of the following questions from the cached document:
+        {numbered_questions}
+        
+        For every question return one array element with its question_index and:
+        1. Direct answer with specific figures/data where available
+        2. Confidence level (1-5) based on data quality
+        3. Key metrics supporting the answer
+        4. Risk implications for the investment decision
+        5. Any missing information needed (data_gaps)
+        
+        If the information is not available in the document, clearly state this with confidence 1.
+        """
+        
+        answers, _ = await self._agenerate_structured(batch_prompt, List[BatchAnswer], temperature=0.2, max_tokens=self._batch_max_tokens(len(specs)), use_cache=cache_id)
+        return self._index_batch_answers(answers, len(specs))
+    
+    async def _aquery_batched(self, specs: List[Tuple[str, str]], spec_caches: List[List[str]]) -> List[Dict[str, Any]]:
+        """Answer many questions with one structured request per cache and a single synthesis request"""
+        cache_questions = {}
+        for spec_index, cache_ids in enumerate(spec_caches):
+            for cache_id in cache_ids[:3]:  # Limit to top 3 most relevant documents per question
+                cache_questions.setdefault(cache_id, []).append(spec_index)
         
-        for file_path, analysis in pdf_analyses.items():
-            if "error" in analysis or "cache_id" not in analysis:
+        cache_ids = list(cache_questions)
+        responses = await asyncio.gather(
+            *(self._aquery_cache_batch(cache_id, [specs[i] for i in cache_questions[cache_id]]) for cache_id in cache_ids),
+            return_exceptions=True
+        )
+        
+        source_answers = [[] for _ in specs]
+        for cache_id, response in zip(cache_ids, responses):
+            if isinstance(response, Exception):
+                self.logger.error(f"Error querying cache {cache_id}: {str(response)}")
                 continue
-            
-            content = analysis.get("content_summary", "").lower()
-            classification = analysis.get("classification", {})
-            usefulness = classification.get("indicative_usefulness", 0)
-            
-            category_keywords = {
-                "business_strategy": ["business", "strategy", "branch", "digital", "products"],
-                "asset_quality": ["npa", "stage", "provision", "asset quality", "restructured"],
-                "underwriting_risk": ["ltv", "underwriting", "fraud", "risk", "policy"],
-                "financial_performance": ["nim", "profit", "performance", "auction", "yield"],
-                "liquidity_alm": ["alm", "liquidity", "maturity", "gap", "securitisation"],
-                "capital_governance": ["capital", "crar", "tier", "regulatory", "governance"]
-            }
-            
-            keyword_score = sum(1 for keyword in category_keywords.get(category, []) if keyword in content)
-            total_score = usefulness * 2 + keyword_score
-            
-            relevance_scores.append((analysis["cache_id"], total_score, file_path))
+            for local_index, answer in response.items():
+                source_answers[cache_questions[cache_id][local_index]].append({"cache_id": cache_id, **answer})
+        
+        results = [None] * len(specs)
+        to_synthesize = []
+        for spec_index, answers in enumerate(source_answers):
+            if not spec_caches[spec_index]:
+                results[spec_index] = {"answer": "No cached documents available", "confidence": 0, "sources": []}
+            elif not answers:
+                results[spec_index] = {"answer": "Unable to query documents", "confidence": 0, "sources": []}
+            elif len(answers) == 1:
+                results[spec_index] = self._answer_from_sources(answers)
+            else:
+                to_synthesize.append(spec_index)
+        
+        if to_synthesize:
+            synthesized = await self._asynthesize_batch([specs[i] for i in to_synthesize], [source_answers[i] for i in to_synthesize])
+            for local_index, spec_index in enumerate(to_synthesize):
+                result = synthesized.get(local_index)
+                if result is None:
+                    results[spec_index] = self._answer_from_sources(source_answers[spec_index])
+                else:
+                    result.pop("question_index", None)
+                    result["sources"] = [answer["cache_id"] for answer in source_answers[spec_index]]
+                    results[spec_index] = result
+        return results
+    
+    async def _asynthesize_batch(self, specs: List[Tuple[str, str]], source_answers: List[List[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+        blocks = []
+        for i, ((category, question), answers) in enumerate(zip(specs, source_answers)):
+            sources = chr(10).join(f"  Source {j+1} (confidence {a.get('confidence')}): {a.get('answer')}" for j, a in enumerate(answers))
+            blocks.append(f"{i}. [{category}] {question}\n{sources}")
         
-        relevance_scores.sort(key=lambda x: x[1], reverse=True)
-        return [cache_id for cache_id, score, path in relevance_scores[:5]]
+        synthesis_prompt = f"""
+        Synthesize these document analyses into one consolidated answer per question:
+        
+        {chr(10).join(blocks)}
+        
+        For every question return one array element with its question_index and:
+        1. Consolidated answer with specific metrics
+        2. Confidence level (1-5)
+        3. Key supporting data points
+        4. Investment implications
+        5. Remaining data gaps
+        """
+        
+        try:
+            answers, _ = await self._agenerate_structured(synthesis_prompt, List[BatchAnswer], temperature=0.3, max_tokens=self._batch_max_tokens(len(specs)))
+            return self._index_batch_answers(answers, len(specs))
+        except Exception as e:
+            self.logger.warning(f"Batch synthesis failed, falling back to best source answers: {e}")
+            return {}
+    
+    def _answer_from_sources(self, answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        best = max(answers, key=lambda answer: answer.get("confidence", 0))
+        return {
+            "answer": best.get("answer", "No response available"),
+            "confidence": best.get("confidence", 2),
+            "key_metrics": best.get("key_metrics", []),
+            "investment_impact": best.get("investment_impact", "Requires further analysis"),
+            "data_gaps": best.get("data_gaps", []),
+            "sources": [answer["cache_id"] for answer in answers]
+        }
+    
+    def _answer_questions_batched(self, question_cache_ids: Dict[Tuple[str, str], List[str]], skip: Dict[Tuple[str, str], Any] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        if self.batch_mode == "cache":
+            groups = [list(self.analysis_questions)]
+        else:
+            groups = [[category] for category in self.analysis_questions]
+        
+        async def _run_groups():
+            group_specs = [
+                [(category, question) for category in group for question in self.analysis_questions[category] if (category, question) not in (skip or {})]
+                for group in groups
+            ]
+            group_results = await asyncio.gather(*(
+                self._aquery_batched(specs, [question_cache_ids[spec] for spec in specs])
+                for specs in group_specs
+            ))
+            return {spec: result for specs, results in zip(group_specs, group_results) for spec, result in zip(specs, results)}
+        
+        return run_async(_run_groups())
+    
+    def _computed_answers(self, resource_data: Dict) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        try:
+            alm = analyze_alm(resource_data.get("csv_analyses", {}).keys())
+        except Exception as e:
+            self.logger.warning(f"Could not compute ALM gaps, leaving ALM questions to document review: {str(e)}")
+            return {}
+        
+        liquidity = alm.get("structural_liquidity")
+        repricing = alm.get("interest_rate_sensitivity")
+        answers = {}
+        for spec, kind in self.computed_questions.items():
+            if kind == "one_year_alm_gap" and liquidity:
+                breaches = liquidity["short_bucket_mismatch_breaches"]
+                answers[spec] = {
+                    "answer": (
+                        f"One-year cumulative ALM gap (inflows less outflows up to 1 year, including off-balance sheet items as reported in the return) "
+                        f"is {liquidity['one_year_cumulative_gap']:,.2f}"
+                        + (f", i.e. {liquidity['one_year_cumulative_gap_to_outflow']:.1%} of cumulative outflows." if liquidity["one_year_cumulative_gap_to_outflow"] is not None else ".")
+                    ),
+                    "confidence": 5,
+                    "key_metrics": [f"{bucket}: cumulative gap {gap:,.2f}" for bucket, gap in zip(liquidity["buckets"], liquidity["cumulative_gap"])],
+                    "investment_impact": "Short-bucket mismatch limits breached: " + ", ".join(breaches) if breaches else "Within RBI short-bucket mismatch limits",
+                    "data_gaps": [],
+                    "sources": [alm["sources"]["alm"]]
+                }
+            elif kind == "nii_rate_shock" and repricing:
+                answers[spec] = {
+                    "answer": (
+                        f"A {repricing['rate_shock_bp']:.0f} bp rise in cost of funds reduces one-year NII by {-repricing['liability_nii_impact']:,.2f} "
+                        f"on liabilities repricing within the year; a parallel shock to assets and liabilities changes NII by {repricing['nii_impact']:,.2f}."
+                    ),
+                    "confidence": 5,
+                    "key_metrics": [f"{bucket}: repricing gap {gap:,.2f}" for bucket, gap in zip(repricing["buckets"], repricing["repricing_gap"])],
+                    "investment_impact": "Positive one-year repricing gap: NII benefits from rising rates" if repricing["nii_impact"] >= 0 else "Negative one-year repricing gap: NII falls as rates rise",
+                    "data_gaps": ["Floating-rate share of borrowings is taken from the IRS repricing buckets, not from the 52% stated in the question"],
+                    "sources": [alm["sources"]["irs"]]
+                }
+        return answers
+    
+    def _portfolio_migration(self, resource_data: Dict) -> Dict[str, Any]:
+        try:
+            migration = analyze_portfolio_migration(resource_data.get("csv_analyses", {}).keys())
+        except Exception as e:
+            self.logger.warning(f"Could not compute DPD roll rates: {str(e)}")
+            return {}
+        portfolio = migration["portfolio"]
+        if not portfolio or portfolio["cumulative_default_curve"]["36m"] is None:
+            return {}
+        
+        curve = portfolio["cumulative_default_curve"]
+        flow = portfolio["flow_through"]
+        finding = (
+            f"Monthly DPD cuts {migration['months'][0]} to {migration['months'][-1]}: {flow['par_1_30_cr']:.2%} of the current book rolls into 1-30 DPD each month "
+            f"and {flow['par_91_120_cr']:.2%} flows through to 90+; pooled roll rates imply {curve['12m']:.1%} of today's current book reaching 90+ within 12 months "
+            f"({curve['24m']:.1%} at 24M, {curve['36m']:.1%} at 36M)."
+        )
+        worst = migration["branches"]["highest_roll_to_default"]
+        return {
+            "finding": finding,
+            "worst_branches": [f"{b['branch_name']} ({b['state']}): {b['flow_through_to_default']:.2%} monthly flow to 90+" for b in worst],
+            "details": migration
+        }
+    
+    def _retrieve_context(self, documents: Dict, question_cache_ids: Dict[Tuple[str, str], List[str]], skip: Dict[Tuple[str, str], Any]) -> Dict[Tuple[str, str], List[Any]]:
+        """Top local chunks per question from its routed documents (PDF pages and sheet row blocks), for questions whose retrieved set is small enough to send inline"""
+        cache_paths = {(analysis.get("cache_id") or analysis.get("cache_name")): path for path, analysis in documents.items()}
+        index = ChunkIndex.for_sources(documents.keys())
+        inline = {}
+        for (category, question), cache_ids in question_cache_ids.items():
+            if (category, question) in skip:
+                continue
+            sources = [cache_paths[cache_id] for cache_id in cache_ids if cache_id in cache_paths]
+            chunks = index.retrieve(f"{question} {CATEGORY_TERMS.get(category, '')}", sources=sources)
+            if chunks and sum(len(chunk.text) for chunk in chunks) <= INLINE_CONTEXT_CHARS:
+                inline[(category, question)] = chunks
+        return inline
+    
+    async def _aquery_inline(self, specs: List[Tuple[str, str]], spec_chunks: List[List[Any]]) -> Dict[int, Dict[str, Any]]:
+        blocks = [
+            f"{i}. [{category}] {question}\nExcerpts:\n{render_chunks(chunks)}"
+            for i, ((category, question), chunks) in enumerate(zip(specs, spec_chunks))
+        ]
+        inline_prompt = f"""
+        You are analyzing documents for a gold loan NBFC investment decision.
+        
+        Answer each question below using only the document excerpts listed under it
+        (each excerpt is headed by its file and page or rows):
+        
+        {chr(10).join(blocks)}
+        
+        For every question return one array element with its question_index and:
+        1. Direct answer with specific figures/data where available
+        2. Confidence level (1-5) based on data quality
+        3. Key metrics supporting the answer
+        4. Risk implications for the investment decision
+        5. Any missing information needed (data_gaps)
+        
+        If the excerpts do not contain the answer, say so with confidence 1.
+        """
+        answers, _ = await self._agenerate_structured(inline_prompt, List[BatchAnswer], temperature=0.2, max_tokens=self._batch_max_tokens(len(specs)))
+        return self._index_batch_answers(answers, len(specs))
+    
+    def _retrieved_answers(self, documents: Dict, question_cache_ids: Dict[Tuple[str, str], List[str]], skip: Dict[Tuple[str, str], Any] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Answer questions from retrieved pages and sheet blocks sent inline instead of whole cached
+        documents. Questions whose excerpts were not enough (confidence below 2) or whose
+        retrieved set is too large are left to the context caches.
+        """
+        try:
+            inline = self._retrieve_context(documents, question_cache_ids, skip or {})
+        except Exception as e:
+            self.logger.warning(f"Local retrieval failed, querying document caches: {str(e)}")
+            return {}
+        if not inline:
+            return {}
+        
+        groups = {}
+        for spec in inline:
+            groups.setdefault(spec if self.batch_mode == "question" else spec[0], []).append(spec)
+        
+        async def _run_groups():
+            return await asyncio.gather(
+                *(self._aquery_inline(specs, [inline[spec] for spec in specs]) for specs in groups.values()),
+                return_exceptions=True
+            )
+        
+        answers = {}
+        for specs, response in zip(groups.values(), run_async(_run_groups())):
+            if isinstance(response, Exception):
+                self.logger.error(f"Error answering from retrieved context: {str(response)}")
+                continue
+            for local_index, result in response.items():
+                if result.get("confidence", 0) < 2:
+                    continue
+                result.pop("question_index", None)
+                result["sources"] = [chunk.chunk_id for chunk in inline[specs[local_index]]]
+                answers[specs[local_index]] = result
+        
+        context_chars = sum(len(chunk.text) for chunks in inline.values() for chunk in chunks)
+        self.logger.info(f"Answered {len(answers)}/{len(inline)} questions from {context_chars} chars of retrieved context in {len(groups)} requests")
+        return answers
+    
+    def _route_questions(self, documents: Dict) -> Dict[Tuple[str, str], List[str]]:
+        """Top documents per question from the BM25 index over the harvested documents"""
+        router = DocumentRouter.from_documents(documents)
+        routes = {
+            (category, question): router.route(question, category)
+            for category, questions in self.analysis_questions.items()
+            for question in questions
+        }
+        queried = sum(len(cache_ids) for cache_ids in routes.values())
+        self.logger.info(f"Routed {len(routes)} questions over {len(router.cache_ids)} documents: {queried} document queries")
+        return routes
     
     def execute(self, process_log: ProcessLog) -> Dict[str, Any]:
         process_log.log(self.__class__.__name__, "qualitative_quantitative_inquiry", "Starting analyst investigation", AgentStatus.RUNNING)
@@ -145,7 +434,9 @@ class AnalystAgent(BaseAgent):
             process_log.log(self.__class__.__name__, "qualitative_quantitative_inquiry", "Verification failed", AgentStatus.FAILED)
             return {"error": "Cannot proceed without verified and complete resources"}
         
-        pdf_analyses = resource_data.get("pdf_analyses", {})
+        # The same documents and sheets the harvest indexed, so the router loads its index by fingerprint
+        # and retrieval can draw on sheet rows as well as PDF pages
+        documents = harvested_documents(resource_data)
         analysis_results = {
             "investigation_summary": {},
             "key_findings": [],
@@ -157,9 +448,15 @@ class AnalystAgent(BaseAgent):
         total_questions = sum(len(questions) for questions in self.analysis_questions.values())
         processed_questions = 0
         
+        question_cache_ids = self._route_questions(documents)
+        computed_answers = self._computed_answers(resource_data)
+        computed_answers.update(self._retrieved_answers(documents, question_cache_ids, skip=computed_answers))
+        batched_answers = None
+        if self.batch_mode != "question":
+            batched_answers = self._answer_questions_batched(question_cache_ids, skip=computed_answers)
+        
         for category, questions in self.analysis_questions.items():
             category_results = {}
-            relevant_cache_ids = self._prioritize_documents_by_relevance(pdf_analyses, category)
             
             process_log.log(
                 self.__class__.__name__, 
@@ -168,8 +465,16 @@ class AnalystAgent(BaseAgent):
                 AgentStatus.RUNNING
             )
             
-            for question in questions:
-                result = self._query_documents_for_question(question, relevant_cache_ids, category)
+            if batched_answers is not None:
+                category_answers = [computed_answers.get((category, question)) or batched_answers[(category, question)] for question in questions]
+            else:
+                # Questions within a category are independent, so fan them out together
+                pending = [question for question in questions if (category, question) not in computed_answers]
+                pending_caches = [question_cache_ids[(category, question)] for question in pending]
+                pending_answers = dict(zip(pending, run_async(self._aquery_category(pending, pending_caches, category))))
+                category_answers = [computed_answers.get((category, question)) or pending_answers[question] for question in questions]
+            
+            for question, result in zip(questions, category_answers):
                 category_results[question] = result
                 
                 if result["confidence"] >= 4:
@@ -202,6 +507,22 @@ class AnalystAgent(BaseAgent):
             
             analysis_results["investigation_summary"][category] = category_results
         
+        migration = self._portfolio_migration(resource_data)
+        if migration:
+            analysis_results["portfolio_migration"] = migration
+            analysis_results["key_findings"].append({
+                "category": "asset_quality",
+                "question": "DPD roll rates across monthly portfolio cuts",
+                "finding": migration["finding"],
+                "confidence": 5
+            })
+            for branch in migration["worst_branches"][:3]:
+                analysis_results["risk_flags"].append({
+                    "category": "asset_quality",
+                    "issue": "High roll rate into 90+ DPD",
+                    "question": branch
+                })
+        
         summary_prompt = f"""
         Summarize the key investment insights from this gold loan NBFC analysis:
         
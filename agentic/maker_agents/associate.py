@@ -1,10 +1,20 @@
 import pandas as pd
 import numpy as np
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
-from typing import Dict, Any
+from agentic.analytics.alm import analyze_alm
+from agentic.analytics.metrics import extract_financial_metrics
+from agentic.analytics.stress import CapitalPosition, StressEngine
+from agentic.analytics.roll_rates import analyze_portfolio_migration, default_share
+from agentic.analytics.ratio_panel import build_panel, compute_ratios, entity_slice, financial_data_rows, flag_ratios, ratio_bands, ratio_long_table, ratios_by_year
+from pydantic import BaseModel
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 load_dotenv()
 
+class LabelMatch(BaseModel):
+    label: str
+    metric: str
+
 class AssociateAgent(BaseAgent):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         super().__init__(model_id)
@@ -30,299 +40,258 @@ class AssociateAgent(BaseAgent):
             "accounting_red_flags",
             "peer_comparison"
         ]
+        
+        self.required_metrics = [
+            "total_assets",
+            "total_aum",
+            "total_debt",
+            "tier1_capital",
+            "net_interest_income",
+            "operating_expenses",
+            "profit_before_tax",
+            "interest_expense",
+            "gross_npa",
+            "net_npa",
+            "provisions",
+            "stage3_assets",
+            "cash_and_equivalents"
+        ]
+    
+    def _resolve_labels_with_llm(self, unresolved: List, missing_metrics: List[str]) -> Dict[str, str]:
+        labels = list(dict.fromkeys(row.label for row in unresolved))
+        resolve_prompt = f"""
+        Map row labels from a gold loan NBFC's financial sheets to standard metric names.
+        
+        Metric names: {missing_metrics}
+        
+        Row labels:
+        {chr(10).join(labels)}
+        
+        Return one entry for each row label that clearly denotes one of the metric names,
+        with the label exactly as given and the metric name. Leave out labels that match none of them.
+        """
+        
+        try:
+            matches, _ = self._generate_structured(resolve_prompt, List[LabelMatch], temperature=0.1, max_tokens=400)
+            return {match["label"]: match["metric"] for match in matches if match["metric"] in missing_metrics}
+        except Exception as e:
+            self.logger.warning(f"Could not resolve sheet labels with the LLM: {str(e)}")
+            return {}
     
     def _extract_financial_data_from_csvs(self, csv_analyses: Dict) -> Dict[str, Any]:
-        financial_data = {
-            "balance_sheet": {},
-            "profit_loss": {},
-            "cash_flow": {},
-            "asset_quality": {},
-            "alm_data": {}
-        }
+        extraction = extract_financial_metrics(csv_analyses.keys())
         
-        for csv_path, analysis in csv_analyses.items():
-            try:
-                df = pd.read_csv(csv_path)
-                data_type = analysis.get("data_type", "").lower()
-                
-                extract_prompt = f"""
-                Extract key financial metrics from this {data_type} data for gold loan NBFC ratio analysis:
-                
-                Data shape: {df.shape}
-                Columns: {df.columns.tolist()}
-                Sample data:
-                {df.head(3).to_string()}
-                
-                Extract and format as JSON (use null for missing values):
-                {{
-                    "total_assets": value,
-                    "total_aum": value,
-                    "total_debt": value,
-                    "tier1_capital": value,
-                    "net_interest_income": value,
-                    "operating_expenses": value,
-                    "profit_before_tax": value,
-                    "interest_expense": value,
-                    "gross_npa": value,
-                    "net_npa": value,
-                    "provisions": value,
-                    "stage3_assets": value,
-                    "cash_and_equivalents": value,
-                    "fiscal_year": "FYXXXX"
-                }}
-                
-                Only extract values that are clearly identifiable in the data.
-                """
-                
-                response = self._generate_response(extract_prompt, temperature=0.1, max_tokens=400)
-                try:
-                    extracted_data = eval(response.strip())
-                    fy = extracted_data.get("fiscal_year", "unknown")
-                    
-                    if "balance" in data_type or "bs" in data_type:
-                        financial_data["balance_sheet"][fy] = extracted_data
-                    elif "profit" in data_type or "p&l" in data_type:
-                        financial_data["profit_loss"][fy] = extracted_data
-                    elif "cash" in data_type:
-                        financial_data["cash_flow"][fy] = extracted_data
-                    elif "asset quality" in data_type or "npa" in data_type:
-                        financial_data["asset_quality"][fy] = extracted_data
-                    elif "alm" in data_type:
-                        financial_data["alm_data"][fy] = extracted_data
-                        
-                except:
-                    self.logger.warning(f"Could not parse financial data from {csv_path}")
-                    
-            except Exception as e:
-                self.logger.error(f"Error processing {csv_path}: {str(e)}")
+        # The LLM only sees row labels the dictionary could not place, and only when a metric is still missing
+        missing = extraction.missing(self.required_metrics)
+        llm_filled = 0
+        if missing and extraction.unresolved:
+            llm_filled = extraction.apply_label_mapping(self._resolve_labels_with_llm(extraction.unresolved, missing))
+            extraction.derive()
         
+        financial_data = extraction.to_financial_data()
+        financial_data["extraction_summary"] = {
+            "fiscal_years": sorted(extraction.values),
+            "missing_metrics": extraction.missing(self.required_metrics),
+            "unresolved_labels": len(extraction.unresolved),
+            "llm_filled_values": llm_filled
+        }
         return financial_data
     
-    def _calculate_debt_to_aum_ratio(self, financial_data: Dict) -> Dict[str, Any]:
-        ratios = {}
-        
-        for fy in financial_data.get("balance_sheet", {}):
-            bs_data = financial_data["balance_sheet"][fy]
-            total_debt = bs_data.get("total_debt")
-            total_aum = bs_data.get("total_aum")
-            
-            if total_debt and total_aum:
-                ratio = total_debt / total_aum
-                peer_median = self.peer_benchmarks["muthoot_manappuram"]["debt_to_aum"]["median"]
-                
-                ratios[fy] = {
-                    "debt_to_aum": ratio,
-                    "peer_median": peer_median,
-                    "delta_vs_peer": ratio - peer_median,
-                    "flag": "RED" if abs(ratio - peer_median) > 0.15 else "GREEN"
-                }
+    def _calculate_debt_to_aum_ratio(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        peer_median = self.peer_benchmarks["muthoot_manappuram"]["debt_to_aum"]["median"]
+        values = ratios[["debt_to_aum"]].assign(peer_median=peer_median, delta_vs_peer=ratios["debt_to_aum"] - peer_median)
+        series = ratios["debt_to_aum"].dropna()
         
         return {
             "calculation": "Debt/AUM Ratio Analysis",
-            "ratios_by_year": ratios,
-            "trend": "IMPROVING" if len(ratios) > 1 and list(ratios.values())[-1]["debt_to_aum"] < list(ratios.values())[0]["debt_to_aum"] else "STABLE"
+            "ratios_by_year": ratios_by_year(values, flags["debt_to_aum"]),
+            "trend": "IMPROVING" if len(series) > 1 and series.iloc[-1] < series.iloc[0] else "STABLE"
         }
     
-    def _verify_gnpa_consistency(self, financial_data: Dict) -> Dict[str, Any]:
-        consistency_check = {}
-        
-        for fy in set(financial_data.get("profit_loss", {}).keys()) & set(financial_data.get("asset_quality", {}).keys()):
-            pl_data = financial_data["profit_loss"][fy]
-            aq_data = financial_data["asset_quality"][fy]
-            
-            pl_gnpa = pl_data.get("gross_npa")
-            aq_gnpa = aq_data.get("gross_npa")
-            
-            if pl_gnpa and aq_gnpa:
-                difference = abs(pl_gnpa - aq_gnpa)
-                consistency_check[fy] = {
-                    "pl_gnpa": pl_gnpa,
-                    "aq_gnpa": aq_gnpa,
-                    "difference": difference,
-                    "consistent": difference < 0.01,
-                    "flag": "GREEN" if difference < 0.01 else "RED"
-                }
+    def _verify_gnpa_consistency(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        checks = ratios[["gnpa_stage3_gap", "gnpa_percent"]]
         
         return {
-            "calculation": "GNPA Consistency Check",
-            "checks_by_year": consistency_check,
-            "overall_consistent": all(check["consistent"] for check in consistency_check.values())
+            "calculation": "GNPA Consistency Check (GNPA vs Stage-3)",
+            "checks_by_year": ratios_by_year(checks, flags["gnpa_stage3_gap"] | flags["gnpa_percent"]),
+            "overall_consistent": not flags["gnpa_stage3_gap"].any()
         }
     
-    def _calculate_stage3_coverage(self, financial_data: Dict) -> Dict[str, Any]:
-        coverage_ratios = {}
-        
-        for fy in financial_data.get("asset_quality", {}):
-            aq_data = financial_data["asset_quality"][fy]
-            stage3_assets = aq_data.get("stage3_assets")
-            provisions = aq_data.get("provisions")
-            
-            if stage3_assets and provisions:
-                coverage_ratio = provisions / stage3_assets
-                coverage_ratios[fy] = {
-                    "stage3_assets": stage3_assets,
-                    "provisions": provisions,
-                    "coverage_ratio": coverage_ratio,
-                    "flag": "RED" if coverage_ratio < 0.5 else "GREEN"
-                }
+    def _calculate_stage3_coverage(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        values = ratios[["stage3_coverage_ratio"]].rename(columns={"stage3_coverage_ratio": "coverage_ratio"})
         
         return {
             "calculation": "Stage-3 Coverage Ratio",
-            "ratios_by_year": coverage_ratios,
-            "adequate_coverage": all(ratio["coverage_ratio"] >= 0.5 for ratio in coverage_ratios.values())
+            "ratios_by_year": ratios_by_year(values, flags["stage3_coverage_ratio"]),
+            "adequate_coverage": not flags["stage3_coverage_ratio"].any()
         }
     
-    def _calculate_interest_coverage(self, financial_data: Dict) -> Dict[str, Any]:
-        coverage_ratios = {}
-        
-        for fy in financial_data.get("profit_loss", {}):
-            pl_data = financial_data["profit_loss"][fy]
-            pbt = pl_data.get("profit_before_tax")
-            interest_expense = pl_data.get("interest_expense")
-            
-            if pbt and interest_expense and interest_expense > 0:
-                coverage = (pbt + interest_expense) / interest_expense
-                coverage_ratios[fy] = {
-                    "pbt": pbt,
-                    "interest_expense": interest_expense,
-                    "coverage_ratio": coverage,
-                    "flag": "RED" if coverage < 1.5 else "GREEN"
-                }
+    def _calculate_interest_coverage(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        values = ratios[["interest_coverage"]].rename(columns={"interest_coverage": "coverage_ratio"})
+        series = ratios["interest_coverage"].dropna()
         
         trend = "STABLE"
-        if len(coverage_ratios) >= 2:
-            values = [ratio["coverage_ratio"] for ratio in coverage_ratios.values()]
-            trend = "IMPROVING" if values[-1] > values[0] else "DECLINING"
+        if len(series) >= 2:
+            trend = "IMPROVING" if series.iloc[-1] > series.iloc[0] else "DECLINING"
         
         return {
             "calculation": "Interest Coverage (PBT + Interest) / Interest",
-            "ratios_by_year": coverage_ratios,
+            "ratios_by_year": ratios_by_year(values, flags["interest_coverage"]),
             "trend_fy21_fy25": trend
         }
     
-    def _decompose_roa(self, financial_data: Dict) -> Dict[str, Any]:
-        roa_components = {}
-        
-        for fy in financial_data.get("profit_loss", {}):
-            if fy in financial_data.get("balance_sheet", {}):
-                pl_data = financial_data["profit_loss"][fy]
-                bs_data = financial_data["balance_sheet"][fy]
-                
-                nii = pl_data.get("net_interest_income", 0)
-                opex = pl_data.get("operating_expenses", 0)
-                pbt = pl_data.get("profit_before_tax", 0)
-                total_assets = bs_data.get("total_assets", 1)
-                
-                if total_assets:
-                    nim = nii / total_assets
-                    opex_ratio = opex / total_assets
-                    roa = pbt / total_assets
-                    
-                    roa_components[fy] = {
-                        "nim": nim,
-                        "opex_ratio": opex_ratio,
-                        "credit_cost": max(0, nim - opex_ratio - roa),
-                        "roa": roa,
-                        "largest_driver": max([("NIM", nim), ("OpEx", -opex_ratio), ("Credit", -(nim - opex_ratio - roa))], key=lambda x: abs(x[1]))[0]
-                    }
+    def _decompose_roa(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        columns = ["roa", "nim", "opex_ratio", "credit_cost"]
+        components = ratios_by_year(ratios[columns], flags[columns].any(axis=1))
+        
+        # Largest absolute contributor per year: NIM adds to ROA, OpEx and credit cost subtract from it
+        contributions = np.abs(np.column_stack([ratios["nim"], -ratios["opex_ratio"], -(ratios["nim"] - ratios["opex_ratio"] - ratios["roa"])]))
+        drivers = np.array(["NIM", "OpEx", "Credit"])[np.argmax(np.nan_to_num(contributions, nan=-1), axis=1)]
+        for fy, driver in zip(ratios.index, drivers):
+            if str(fy) in components:
+                components[str(fy)]["largest_driver"] = str(driver)
         
         return {
             "calculation": "ROA Decomposition (NIM - OpEx - Credit Cost)",
-            "components_by_year": roa_components,
-            "fy24_fy25_driver": roa_components.get("FY2025", {}).get("largest_driver", "Unknown")
+            "ratios_by_year": components,
+            "fy24_fy25_driver": components.get("FY2025", {}).get("largest_driver", "Unknown")
         }
     
-    def _calculate_cost_to_income(self, financial_data: Dict) -> Dict[str, Any]:
-        cost_ratios = {}
-        
-        for fy in financial_data.get("profit_loss", {}):
-            pl_data = financial_data["profit_loss"][fy]
-            opex = pl_data.get("operating_expenses")
-            nii = pl_data.get("net_interest_income", 0)
-            
-            net_revenue = nii
-            if opex and net_revenue and net_revenue > 0:
-                cost_ratio = opex / net_revenue
-                peer_q1 = self.peer_benchmarks["muthoot_manappuram"]["cost_to_income"]["q1"]
-                peer_q3 = self.peer_benchmarks["muthoot_manappuram"]["cost_to_income"]["q3"]
-                
-                flag = "GREEN"
-                if cost_ratio < peer_q1 or cost_ratio > peer_q3:
-                    flag = "RED"
-                
-                cost_ratios[fy] = {
-                    "opex": opex,
-                    "net_revenue": net_revenue,
-                    "cost_to_income": cost_ratio,
-                    "peer_25th": peer_q1,
-                    "peer_75th": peer_q3,
-                    "flag": flag
-                }
+    def _calculate_cost_to_income(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        peer = self.peer_benchmarks["muthoot_manappuram"]["cost_to_income"]
+        values = ratios[["cost_to_income"]].assign(peer_25th=peer["q1"], peer_75th=peer["q3"])
         
         return {
             "calculation": "Cost-to-Income (OpEx / Net Revenue)",
-            "ratios_by_year": cost_ratios,
-            "peer_comparison": "Within peer band" if all(r["flag"] == "GREEN" for r in cost_ratios.values()) else "Outlier"
+            "ratios_by_year": ratios_by_year(values, flags["cost_to_income"]),
+            "peer_comparison": "Outlier" if flags["cost_to_income"].any() else "Within peer band"
         }
     
-    def _perform_sensitivity_analysis(self, financial_data: Dict) -> Dict[str, Any]:
-        base_case = {}
-        stress_case = {}
-        
-        latest_fy = max(financial_data.get("balance_sheet", {}).keys(), default="FY2025")
-        if latest_fy in financial_data.get("balance_sheet", {}):
-            bs_data = financial_data["balance_sheet"][latest_fy]
-            
-            tier1_capital = bs_data.get("tier1_capital", 0)
-            total_assets = bs_data.get("total_assets", 1)
-            stage3_current = bs_data.get("stage3_assets", 0)
-            
-            base_cet1 = tier1_capital / total_assets if total_assets else 0
-            
-            gold_price_impact = total_assets * 0.15 * 0.3
-            stage3_stress = total_assets * 0.04
-            additional_provisions = (stage3_stress - stage3_current) * 0.5
-            
-            stress_capital = tier1_capital - gold_price_impact - additional_provisions
-            stress_cet1 = stress_capital / total_assets if total_assets else 0
-            
-            base_case = {
-                "tier1_capital": tier1_capital,
-                "cet1_ratio": base_cet1,
-                "stage3_percent": stage3_current / total_assets if total_assets else 0
+    def _calculate_liquidity_coverage(self, csv_analyses: Dict, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        try:
+            alm = analyze_alm(csv_analyses.keys())
+        except Exception as e:
+            self.logger.warning(f"Could not compute ALM gaps: {str(e)}")
+            alm = {"sources": {}}
+        liquidity = alm.get("structural_liquidity")
+        repricing = alm.get("interest_rate_sensitivity")
+        by_year = ratios_by_year(ratios[["cash_to_borrowings"]], flags["cash_to_borrowings"])
+        
+        if liquidity:
+            by_year["latest_return"] = {
+                "one_year_cumulative_gap": liquidity["one_year_cumulative_gap"],
+                "one_year_cumulative_gap_to_outflow": liquidity["one_year_cumulative_gap_to_outflow"],
+                "flag": "RED" if liquidity["short_bucket_mismatch_breaches"] or liquidity["one_year_cumulative_gap"] < 0 else "GREEN"
             }
-            
-            stress_case = {
-                "assumptions": "Gold price -15%, Stage-3 to 4%",
-                "tier1_capital": stress_capital,
-                "cet1_ratio": stress_cet1,
-                "capital_impact": gold_price_impact + additional_provisions,
-                "sufficient_headroom": stress_cet1 > 0.12
+            if repricing:
+                by_year["latest_return"]["nii_impact_100bp"] = repricing["nii_impact"]
+                by_year["latest_return"]["cof_nii_impact_100bp"] = repricing["liability_nii_impact"]
+        
+        return {
+            "calculation": "Liquidity Coverage (cash / borrowings, ALM / IRS gap analysis)",
+            "ratios_by_year": by_year,
+            "structural_liquidity": liquidity,
+            "interest_rate_sensitivity": repricing,
+            "sources": alm["sources"]
+        }
+    
+    def _analyze_dpd_migration(self, csv_analyses: Dict) -> Dict[str, Any]:
+        try:
+            migration = analyze_portfolio_migration(csv_analyses.keys())
+        except Exception as e:
+            self.logger.warning(f"Could not compute DPD roll rates: {str(e)}")
+            migration = {"months": [], "portfolio": {}, "branches": {}, "sources": []}
+        portfolio = migration["portfolio"]
+        
+        latest_month = {}
+        if portfolio:
+            # Like for like: the 90+ share of the whole book a year from now, rolling today's mix forward
+            # at the pooled roll rates, against the 90+ share today. A higher share means Stage-3 is still building
+            current_default_share = default_share(portfolio["latest_dpd_mix"])
+            projected_default_share = default_share(portfolio["projected_dpd_mix_12m"])
+            projection_known = all(share is not None for share in portfolio["projected_dpd_mix_12m"].values())
+            latest_month = {
+                "month": migration["months"][-1],
+                "default_share": current_default_share,
+                "projected_default_share_12m": projected_default_share if projection_known else None,
+                "cumulative_default_12m": portfolio["cumulative_default_curve"]["12m"],
+                "flag": "RED" if projection_known and projected_default_share > current_default_share else "GREEN"
             }
         
+        return {
+            "calculation": "DPD Roll Rates (portfolio and branch bucket migration)",
+            "latest_month": latest_month,
+            "pooled_flow_rates": portfolio.get("pooled_flow_rates", {}),
+            "cumulative_default_curve": portfolio.get("cumulative_default_curve", {}),
+            "migration": migration
+        }
+    
+    def _perform_sensitivity_analysis(self, financial_data: Dict, dpd_migration: Dict[str, Any]) -> Dict[str, Any]:
+        rows = financial_data_rows(financial_data)
+        if not rows:
+            return {
+                "calculation": "Sensitivity Analysis",
+                "base_case": {},
+                "stress_case": {},
+                "headroom_adequate": False
+            }
+
+        latest_fy = max(rows)
+        metrics = rows[latest_fy]
+        # Without a reported Stage-3 figure, the 90+ DPD share of the latest portfolio cut is the next best estimate
+        dpd_month = dpd_migration.get("latest_month") or {}
+        position = CapitalPosition.from_metrics(metrics, fallback_stage3_ratio=dpd_month.get("default_share"))
+        engine = StressEngine()
+        assumptions = engine.assumptions
+        required_tier1 = assumptions.tier1_minimum + assumptions.headroom_buffer
+
+        base = engine.scenario(position, 0.0, position.stage3_ratio)
+        stress = engine.scenario(position, -0.15, 0.04)
+        monte_carlo = engine.simulate(position)
+        self.logger.info(
+            f"Stress simulation: {monte_carlo['scenarios']} scenarios in {monte_carlo['elapsed_seconds']}s, "
+            f"P(Tier-I < {assumptions.tier1_minimum:.0%}) = {monte_carlo['breach_probability']['tier1_below_minimum']:.4f}"
+        )
+
+        base_case = {
+            "fiscal_year": latest_fy,
+            "capital_basis": "tier1_capital" if metrics.get("tier1_capital") else "net_worth",
+            "tier1_capital": position.tier1_capital,
+            "cet1_ratio": base["tier1_ratio"],
+            "crar": base["crar"],
+            "dscr": base["dscr"],
+            "stage3_percent": position.stage3_ratio,
+            "stage3_source": position.stage3_source
+        }
+        stress_case = {
+            "assumptions": "Gold price -15%, Stage-3 to 4%",
+            "tier1_capital": stress["capital"],
+            "cet1_ratio": stress["tier1_ratio"],
+            "crar": stress["crar"],
+            "dscr": stress["dscr"],
+            "capital_impact": stress["total_loss"],
+            "sufficient_headroom": stress["tier1_ratio"] > required_tier1
+        }
+
         return {
             "calculation": "Sensitivity Analysis",
             "base_case": base_case,
             "stress_case": stress_case,
-            "headroom_adequate": stress_case.get("sufficient_headroom", False)
+            "monte_carlo": monte_carlo,
+            "headroom_adequate": stress_case["sufficient_headroom"] and monte_carlo["breach_probability"]["tier1_below_minimum"] < 0.05
         }
     
-    def _identify_accounting_red_flags(self, financial_data: Dict) -> Dict[str, Any]:
-        red_flags = []
-        
-        for fy in financial_data.get("profit_loss", {}):
-            pl_data = financial_data["profit_loss"][fy]
-            
-            other_income = pl_data.get("other_operating_income", 0)
-            nii = pl_data.get("net_interest_income", 1)
-            
-            if other_income and nii and (other_income / nii) > 0.2:
-                red_flags.append({
-                    "year": fy,
-                    "flag": "High Other Operating Income",
-                    "ratio": other_income / nii,
-                    "concern": "Unusually high non-core income"
-                })
+    def _identify_accounting_red_flags(self, ratios: pd.DataFrame, flags: pd.DataFrame) -> Dict[str, Any]:
+        flagged = ratios.loc[flags["other_income_share"], "other_income_share"]
+        red_flags = [
+            {
+                "year": str(fy),
+                "flag": "High Other Operating Income",
+                "ratio": float(ratio),
+                "concern": "Unusually high non-core income"
+            }
+            for fy, ratio in flagged.items()
+        ]
         
         return {
             "calculation": "Accounting Red Flags Analysis",
@@ -330,6 +299,18 @@ class AssociateAgent(BaseAgent):
             "clean_accounts": len(red_flags) == 0
         }
     
+    def _compare_to_peers(self, ratios: pd.DataFrame, flags: pd.DataFrame, bands: pd.DataFrame) -> Dict[str, Any]:
+        peer_bands = bands[bands["source"] == "peer"]
+        columns = [ratio for ratio in peer_bands.index if ratio in ratios.columns]
+        outliers = flags[columns]
+        
+        return {
+            "calculation": "Peer Band Comparison (Muthoot / Manappuram)",
+            "bands": {ratio: {"lower": float(band["lower"]), "upper": float(band["upper"])} for ratio, band in peer_bands.iterrows()},
+            "outliers_by_year": {str(fy): [ratio for ratio in columns if row[ratio]] for fy, row in outliers.iterrows() if row.any()},
+            "within_peer_band": not outliers.to_numpy().any()
+        }
+    
     def execute(self, process_log: ProcessLog) -> Dict[str, Any]:
         process_log.log(self.__class__.__name__, "financial_ratio_analysis", "Starting financial ratio deep-dive", AgentStatus.RUNNING)
         
@@ -343,40 +324,50 @@ class AssociateAgent(BaseAgent):
         csv_analyses = resource_data.get("csv_analyses", {})
         financial_data = self._extract_financial_data_from_csvs(csv_analyses)
         
+        # Every ratio is a column expression over the (entity, fiscal year) panel; flags come from one
+        # broadcast comparison against the bands, so the same path serves a cross-section of companies
+        panel = build_panel({"target": financial_data_rows(financial_data)})
+        bands = ratio_bands(self.peer_benchmarks["muthoot_manappuram"])
+        all_ratios = compute_ratios(panel)
+        all_flags = flag_ratios(all_ratios, bands)
+        ratios, flags = entity_slice(all_ratios, "target"), entity_slice(all_flags, "target")
+        
         ratio_analyses = {}
         
-        ratio_analyses["debt_to_aum"] = self._calculate_debt_to_aum_ratio(financial_data)
-        ratio_analyses["gnpa_consistency"] = self._verify_gnpa_consistency(financial_data)
-        ratio_analyses["stage3_coverage"] = self._calculate_stage3_coverage(financial_data)
-        ratio_analyses["interest_coverage"] = self._calculate_interest_coverage(financial_data)
-        ratio_analyses["roa_decomposition"] = self._decompose_roa(financial_data)
-        ratio_analyses["cost_to_income"] = self._calculate_cost_to_income(financial_data)
-        ratio_analyses["sensitivity_analysis"] = self._perform_sensitivity_analysis(financial_data)
-        ratio_analyses["accounting_red_flags"] = self._identify_accounting_red_flags(financial_data)
-        
-        ratio_table = []
-        red_flags = []
-        
-        for analysis_name, analysis_data in ratio_analyses.items():
-            if "ratios_by_year" in analysis_data:
-                for fy, ratio_data in analysis_data["ratios_by_year"].items():
-                    for metric, value in ratio_data.items():
-                        if isinstance(value, (int, float)):
-                            flag = ratio_data.get("flag", "GREEN")
-                            ratio_table.append({
-                                "metric": f"{analysis_name}_{metric}",
-                                "fiscal_year": fy,
-                                "value": value,
-                                "flag": flag
-                            })
-                            
-                            if flag == "RED":
-                                red_flags.append({
-                                    "metric": f"{analysis_name}_{metric}",
-                                    "year": fy,
-                                    "value": value,
-                                    "concern": "Outside peer band or threshold"
-                                })
+        ratio_analyses["debt_to_aum"] = self._calculate_debt_to_aum_ratio(ratios, flags)
+        ratio_analyses["gnpa_consistency"] = self._verify_gnpa_consistency(ratios, flags)
+        ratio_analyses["stage3_coverage"] = self._calculate_stage3_coverage(ratios, flags)
+        ratio_analyses["interest_coverage"] = self._calculate_interest_coverage(ratios, flags)
+        ratio_analyses["roa_decomposition"] = self._decompose_roa(ratios, flags)
+        ratio_analyses["cost_to_income"] = self._calculate_cost_to_income(ratios, flags)
+        ratio_analyses["liquidity_coverage"] = self._calculate_liquidity_coverage(csv_analyses, ratios, flags)
+        dpd_migration = self._analyze_dpd_migration(csv_analyses)
+        ratio_analyses["sensitivity_analysis"] = self._perform_sensitivity_analysis(financial_data, dpd_migration)
+        ratio_analyses["dpd_migration"] = dpd_migration
+        ratio_analyses["accounting_red_flags"] = self._identify_accounting_red_flags(ratios, flags)
+        ratio_analyses["peer_comparison"] = self._compare_to_peers(ratios, flags, bands)
+        
+        long_table = ratio_long_table(all_ratios, all_flags)
+        long_table["metric"] = long_table["analysis"] + "_" + long_table["ratio"]
+        ratio_table = long_table[["metric", "fiscal_year", "value", "flag"]].to_dict("records")
+        red_flags = (
+            long_table[long_table["red"]]
+            .rename(columns={"fiscal_year": "year"})
+            .assign(concern="Outside peer band or threshold")[["metric", "year", "value", "concern"]]
+            .to_dict("records")
+        )
+        
+        alm_return = ratio_analyses["liquidity_coverage"]["ratios_by_year"].get("latest_return")
+        if alm_return:
+            ratio_table.append({"metric": "liquidity_coverage_one_year_cumulative_gap", "fiscal_year": "latest_return", "value": alm_return["one_year_cumulative_gap"], "flag": alm_return["flag"]})
+            if alm_return["flag"] == "RED":
+                red_flags.append({"metric": "liquidity_coverage_one_year_cumulative_gap", "year": "latest_return", "value": alm_return["one_year_cumulative_gap"], "concern": "ALM mismatch outside regulatory limits"})
+        
+        dpd_month = ratio_analyses["dpd_migration"]["latest_month"]
+        if dpd_month:
+            ratio_table.append({"metric": "dpd_migration_projected_default_share_12m", "fiscal_year": dpd_month["month"], "value": dpd_month["projected_default_share_12m"], "flag": dpd_month["flag"]})
+            if dpd_month["flag"] == "RED":
+                red_flags.append({"metric": "dpd_migration_projected_default_share_12m", "year": dpd_month["month"], "value": dpd_month["projected_default_share_12m"], "concern": "Roll rates imply Stage-3 above its current share"})
         
         results = {
             "ratio_analyses": ratio_analyses,
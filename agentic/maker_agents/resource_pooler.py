@@ -1,14 +1,19 @@
 import os
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional
 from pydantic import BaseModel, Field
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
+from agentic.ingestion.excel_engine import ExcelIngestionEngine
+from agentic.ingestion.harvest_manifest import DEFAULT_HARVEST_SHEETS_DIR, HarvestManifest, harvest_log_path
+from agentic.analytics.portfolio_store import PortfolioStore
+from agentic.retrieval.routing import DocumentRouter, harvested_documents
 from google.genai import types
 from dotenv import load_dotenv
 load_dotenv()
 import logging
-import pandas as pd
 
 class DocumentMetadata(BaseModel):
     """Pydantic model for structured document metadata output"""
@@ -22,32 +27,39 @@ class ResourcePoolerAgent(BaseAgent):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         super().__init__(model_id)
         self.logger = logging.getLogger("ResourcePoolerAgent")
-        self.log_dir = Path("agentic/logs")
+        # Batch workers point these at a per-company directory so parallel harvests never share outputs
+        self.log_file = harvest_log_path()
+        self.log_dir = self.log_file.parent
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        self.log_file = self.log_dir / "resource_pooler.log"
+        self.sheets_dir = os.getenv("HARVEST_SHEETS_DIR", DEFAULT_HARVEST_SHEETS_DIR)
+        self.excel_engine = ExcelIngestionEngine()
+        self.harvest_manifest = HarvestManifest()
+        self.upload_workers = int(os.getenv("HARVEST_UPLOAD_WORKERS", "4"))
+        self.metadata_workers = int(os.getenv("HARVEST_METADATA_WORKERS", "8"))
+        self.max_units_in_flight = self.upload_workers + self.metadata_workers * 2
+        self.ingestion_stats = []
 
-    def _extract_sheets_to_csv(self, excel_file_path: str, output_dir: str = "extracted_sheets") -> Dict[str, str]:
+    def _extract_sheets_to_csv(self, excel_file_path: str, output_dir: Optional[str] = None) -> Dict[str, str]:
         self.logger.info(f"Extracting sheets from Excel file: {excel_file_path}")
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-        excel_file = pd.ExcelFile(excel_file_path, engine="openpyxl")
-        excel_file_name = Path(excel_file_path).stem
-        csv_files = {}
+        result = self.excel_engine.extract(excel_file_path, output_dir or self.sheets_dir)
+        stats = result.stats()
+        self.logger.info(
+            f"Completed extraction for {excel_file_path}, {stats['sheets']} sheets extracted "
+            f"({stats['rows']} rows in {stats['elapsed_seconds']}s: {stats['rows_per_second']} rows/s, "
+            f"{stats['mb_per_second']} MB/s, engine={stats['engine']}, workers={stats['workers']})"
+        )
+        self.ingestion_stats.append({"file": str(excel_file_path), **stats})
+        return result.csv_files
 
-        for sheet_name in excel_file.sheet_names:
-            self.logger.debug(f"Processing sheet: {sheet_name}")
-            df = pd.read_excel(excel_file, sheet_name=sheet_name, engine="openpyxl")
-            if df.shape[0] >= 1 and df.shape[1] >= 1:
-                safe_sheet_name = "".join(c for c in sheet_name if c.isalnum() or c in [" ", "_"]).rstrip()
-                csv_filename = f"{excel_file_name}_{safe_sheet_name}.csv"
-                csv_path = Path(output_dir) / csv_filename
-                df.to_csv(csv_path, index=False)
-                csv_files[sheet_name] = str(csv_path)
-                self.logger.info(f"Extracted sheet '{sheet_name}' to {csv_path}")
-            else:
-                self.logger.warning(f"Sheet '{sheet_name}' skipped due to insufficient data: shape={df.shape}")
-        excel_file.close()
-        self.logger.info(f"Completed extraction for {excel_file_path}, {len(csv_files)} sheets extracted.")
-        return csv_files
+    def _update_portfolio_store(self, csv_paths: List[str]):
+        """Append newly harvested monthly portfolio cuts to the columnar store of their directory"""
+        csv_paths = [path for path in csv_paths if path]
+        if not csv_paths:
+            return
+        try:
+            PortfolioStore.for_directory(str(Path(csv_paths[0]).parent)).append(csv_paths)
+        except Exception as e:
+            self.logger.warning(f"Could not update portfolio store: {e}")
 
     def _generate_metadata(self, file_path: str, file_info: Dict[str, Any]) -> dict:
         file_name = Path(file_path).name
@@ -103,36 +115,20 @@ Please analyze the document and provide structured information about it.""",
             
             if reused_cache:
                 # Use cached content for generation
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.1,
-                        max_output_tokens=600,
-                        response_mime_type='application/json',
-                        response_schema=response_schema,
-                        cached_content=cache_name
-                    )
-                )
-            else:
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=prompt,
-                    config=config
+                config = types.GenerateContentConfig(
+                    temperature=0.1,
+                    max_output_tokens=600,
+                    response_mime_type='application/json',
+                    response_schema=response_schema,
+                    cached_content=cache_name
                 )
-
-            usage_metadata = response.usage_metadata
-            token_count = {
-                "prompt": usage_metadata.prompt_token_count,
-                "candidates": usage_metadata.candidates_token_count,
-                "total": usage_metadata.total_token_count
-            }
-            self.token_usage.append(token_count)
-            self.logger.info(f"Token usage: {token_count}")
+            
+            # Goes through the shared response cache, so unchanged documents cost no tokens on re-runs
+            response_text, token_count = self._generate_content(prompt, config)
             
             # Parse the structured response
             try:
-                metadata_dict = json.loads(response.text)
+                metadata_dict = json.loads(response_text)
                 # Validate with Pydantic model (only core fields)
                 metadata_model = DocumentMetadata(**metadata_dict)
                 
@@ -153,7 +149,7 @@ Please analyze the document and provide structured information about it.""",
             except (json.JSONDecodeError, ValueError) as e:
                 self.logger.warning(f"Structured output parsing failed for {file_path}: {e}")
                 # Fallback to manual parsing if structured output fails
-                return self._fallback_metadata_generation(file_path, file_info, response.text)
+                return self._fallback_metadata_generation(file_path, file_info, response_text)
             
         except Exception as e:
             self.logger.error(f"Failed to generate metadata for {file_path}: {e}")
@@ -203,75 +199,260 @@ Please analyze the document and provide structured information about it.""",
             "fallback_used": True
         }
 
-    def execute(self, process_log: ProcessLog, data_directory: str) -> None:
+    def _plan_harvest(self, data_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Walk the data directory and decide, per file and per extracted sheet, whether its
+        previous metadata line can be reused or it needs uploading and summarising again.
+        Yields work units in stable (sorted path, workbook sheet) order as soon as each
+        file is examined, so uploads start while later workbooks are still being extracted.
+        """
+        seen_keys = []
+        for file_path in sorted(data_path.rglob("*")):
+            if not file_path.is_file():
+                continue
+            self.logger.info(f"Processing file: {file_path}")
+            file_key = self.harvest_manifest.key(str(file_path))
+            seen_keys.append(file_key)
+            try:
+                changed, content_hash = self.harvest_manifest.check_file(str(file_path))
+                if file_path.suffix.lower() in [".xlsx", ".xls"]:
+                    previous_sheets = None if changed else self.harvest_manifest.intact_sheets(str(file_path))
+                    if previous_sheets is not None:
+                        self.logger.info(f"Workbook unchanged, reusing {len(previous_sheets)} extracted sheets: {file_path}")
+                        sheets = previous_sheets
+                    else:
+                        # Extract sheets to CSV; sheets whose CSV bytes did not change keep their metadata
+                        sheets = {}
+                        for sheet_name, csv_path in self._extract_sheets_to_csv(str(file_path)).items():
+                            previous = self.harvest_manifest.sheet(str(file_path), sheet_name)
+                            record = self.harvest_manifest.sheet_record(csv_path)
+                            if previous and previous["sha256"] == record["sha256"]:
+                                record["metadata"] = previous.get("metadata")
+                            sheets[sheet_name] = record
+                    self.harvest_manifest.record_file(str(file_path), content_hash, sheets=sheets)
+                    self._update_portfolio_store([record["csv_path"] for record in sheets.values()])
+                    for sheet_name, record in sheets.items():
+                        yield {
+                            "key": f"{file_key}::{sheet_name}",
+                            "source": str(file_path),
+                            "sheet_name": sheet_name,
+                            "path": record["csv_path"],
+                            "content_hash": record["sha256"],
+                            "metadata": record.get("metadata")
+                        }
+                else:
+                    metadata = None if changed else self.harvest_manifest.metadata(str(file_path))
+                    self.harvest_manifest.record_file(str(file_path), content_hash, metadata=metadata)
+                    yield {
+                        "key": file_key,
+                        "source": str(file_path),
+                        "sheet_name": None,
+                        "path": str(file_path),
+                        "content_hash": content_hash,
+                        "metadata": metadata
+                    }
+            except Exception as e:
+                self.logger.error(f"Error processing {file_path}: {e}")
+        self.harvest_manifest.prune(str(data_path), seen_keys)
+    
+    def _refresh_reused_metadata(self, unit: Dict[str, Any]) -> tuple:
+        """
+        Reuse a previous metadata line as-is while its context cache is alive; otherwise
+        re-point it at a fresh cache without summarising the document again.
+        Returns (metadata, cache_reused).
+        """
+        metadata = unit["metadata"]
+        live_cache = self.file_manifest.live_cache(unit["content_hash"], self.model_id)
+        if live_cache and live_cache["name"] == metadata.get("cache_name"):
+            return metadata, True
+        file_info = self.upload_and_cache_file(unit["path"], reuse_cache=True)
+        return {
+            **metadata,
+            "cache_name": file_info["cache_name"],
+            "file_id": file_info.get("file_id", ""),
+            "reused_cache": file_info.get("reused", False)
+        }, file_info.get("reused", False)
+    
+    def _upload_unit(self, unit: Dict[str, Any]) -> Dict[str, Any]:
+        """Upload stage: make sure the unit has a live context cache"""
+        path = unit["path"]
+        if unit["metadata"] is not None:
+            metadata, cache_reused = self._refresh_reused_metadata(unit)
+            self.logger.info(f"Unchanged since last harvest, reused metadata for {path}")
+            return {"metadata": metadata, "cache_reused": cache_reused}
+        
+        # Upload and cache file using universal method with cache reuse
+        file_info = self.upload_and_cache_file(path, reuse_cache=True)
+        if file_info.get("reused", False):
+            self.logger.info(f"Reused existing cache for {path}")
+        else:
+            self.logger.info(f"Created new cache for {path}")
+        return {"file_info": file_info, "cache_reused": file_info.get("reused", False)}
+    
+    def _describe_unit(self, unit: Dict[str, Any], uploaded: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata stage: summarise newly uploaded units; reused ones pass straight through"""
+        if "metadata" in uploaded:
+            return uploaded
+        # Generate metadata using the file object or cached content
+        metadata = self._generate_metadata(unit["path"], uploaded["file_info"])
+        return {"metadata": metadata, "cache_reused": uploaded["cache_reused"]}
+    
+    def _run_harvest_pipeline(self, units: Iterator[Dict[str, Any]]) -> List[tuple]:
+        """
+        Producer/consumer harvest: the directory walk feeds a bounded upload/cache pool,
+        whose finished units feed a metadata-generation pool. At most
+        ``max_units_in_flight`` units are between the walk and a finished metadata line, so
+        extraction cannot run arbitrarily far ahead. A failure only affects its own unit.
+        Returns (unit, outcome) pairs in walk order; failed outcomes carry an ``error``.
+        """
+        in_flight = threading.BoundedSemaphore(self.max_units_in_flight)
+        results = []
+        
+        def _on_uploaded(unit: Dict[str, Any], upload_future: Future, done: Future):
+            try:
+                uploaded = upload_future.result()
+            except Exception as e:
+                done.set_result({"error": str(e)})
+                in_flight.release()
+                return
+            metadata_future = metadata_pool.submit(self._describe_unit, unit, uploaded)
+            metadata_future.add_done_callback(lambda f: _on_described(f, done))
+        
+        def _on_described(metadata_future: Future, done: Future):
+            try:
+                done.set_result(metadata_future.result())
+            except Exception as e:
+                done.set_result({"error": str(e)})
+            in_flight.release()
+        
+        with ThreadPoolExecutor(self.upload_workers, thread_name_prefix="harvest-upload") as upload_pool, \
+                ThreadPoolExecutor(self.metadata_workers, thread_name_prefix="harvest-metadata") as metadata_pool:
+            for unit in units:
+                in_flight.acquire()
+                done = Future()
+                upload_future = upload_pool.submit(self._upload_unit, unit)
+                upload_future.add_done_callback(lambda f, unit=unit, done=done: _on_uploaded(unit, f, done))
+                results.append((unit, done))
+            return [(unit, done.result()) for unit, done in results]
+    
+    def _record_unit_metadata(self, unit: Dict[str, Any], metadata: Dict[str, Any]):
+        if unit["sheet_name"] is None:
+            self.harvest_manifest.record_file(unit["source"], unit["content_hash"], metadata=metadata)
+        else:
+            self.harvest_manifest.sheet(unit["source"], unit["sheet_name"])["metadata"] = metadata
+    
+    def _write_metadata_log(self, lines: List[tuple]):
+        """
+        Append only the new lines when the log still holds exactly the previously written
+        prefix; otherwise (files changed, removed or another directory was harvested) compact
+        by rewriting the whole log.
+        """
+        keys = [key for key, _ in lines]
+        previous_keys = self.harvest_manifest.log_keys(self.log_file)
+        appendable = (
+            len(previous_keys) <= len(keys)
+            and keys[:len(previous_keys)] == previous_keys
+            and self.harvest_manifest.log_matches(self.log_file, previous_keys)
+            and all(unchanged for _, (_, unchanged) in lines[:len(previous_keys)])
+        )
+        if appendable:
+            new_lines = lines[len(previous_keys):]
+            with open(self.log_file, "a") as log_f:
+                for _, (line, _) in new_lines:
+                    log_f.write(line + "\n")
+            self.logger.info(f"Appended {len(new_lines)} metadata lines to {self.log_file}")
+        else:
+            tmp_path = self.log_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as log_f:
+                for _, (line, _) in lines:
+                    log_f.write(line + "\n")
+            tmp_path.replace(self.log_file)
+            self.logger.info(f"Rewrote {self.log_file} with {len(lines)} metadata lines")
+        self.harvest_manifest.record_log(self.log_file, keys)
+    
+    def execute(self, process_log: ProcessLog, data_directory: str) -> Dict[str, Any]:
         self.logger.info(f"Starting execute() for data_directory: {data_directory}")
         process_log.log(self.__class__.__name__, "document_harvest", "Starting metadata generation", AgentStatus.RUNNING)
         data_path = Path(data_directory)
+        self.ingestion_stats = []
         processed_files = 0
+        unchanged_files = 0
         cache_names = []
         reused_caches = 0
         new_caches = 0
+        failed_files = 0
+        log_lines = []
+        pdf_analyses = {}
+        csv_analyses = {}
         
-        with open(self.log_file, "w") as log_f:
-            for file_path in data_path.rglob("*"):
-                if file_path.is_file():
-                    self.logger.info(f"Processing file: {file_path}")
-                    try:
-                        if file_path.suffix.lower() in [".xlsx", ".xls"]:
-                            # Extract sheets to CSV and process each
-                            csv_files = self._extract_sheets_to_csv(str(file_path))
-                            for sheet_name, csv_path in csv_files.items():
-                                # Upload and cache CSV file using universal method with cache reuse
-                                file_info = self.upload_and_cache_file(csv_path, reuse_cache=True)
-                                cache_names.append(file_info["cache_name"])
-                                
-                                if file_info.get("reused", False):
-                                    reused_caches += 1
-                                    self.logger.info(f"Reused existing cache for {csv_path}")
-                                else:
-                                    new_caches += 1
-                                    self.logger.info(f"Created new cache for {csv_path}")
-                                
-                                # Generate metadata using the file object or cached content
-                                metadata = self._generate_metadata(csv_path, file_info)
-                                log_f.write(json.dumps(metadata) + "\n")
-                                processed_files += 1
-                        else:
-                            # Upload and cache file directly using universal method with cache reuse
-                            file_info = self.upload_and_cache_file(str(file_path), reuse_cache=True)
-                            cache_names.append(file_info["cache_name"])
-                            
-                            if file_info.get("reused", False):
-                                reused_caches += 1
-                                self.logger.info(f"Reused existing cache for {file_path}")
-                            else:
-                                new_caches += 1
-                                self.logger.info(f"Created new cache for {file_path}")
-                            
-                            # Generate metadata using the file object or cached content
-                            metadata = self._generate_metadata(str(file_path), file_info)
-                            log_f.write(json.dumps(metadata) + "\n")
-                            processed_files += 1
-                    except Exception as e:
-                        self.logger.error(f"Error processing {file_path}: {e}")
+        try:
+            harvested = self._run_harvest_pipeline(self._plan_harvest(data_path))
+        finally:
+            # One Excel worker pool serves the whole harvest
+            self.excel_engine.close()
+        for unit, outcome in harvested:
+            if "error" in outcome:
+                self.logger.error(f"Error processing {unit['path']}: {outcome['error']}")
+                failed_files += 1
+                continue
+            metadata = outcome["metadata"]
+            if unit["metadata"] is not None:
+                unchanged_files += 1
+            cache_names.append(metadata["cache_name"])
+            if outcome["cache_reused"]:
+                reused_caches += 1
+            else:
+                new_caches += 1
+            self._record_unit_metadata(unit, metadata)
+            # Extracted sheets (and any CSV in the data room) feed the exact engines; everything else is a document
+            analyses = csv_analyses if Path(unit["path"]).suffix.lower() == ".csv" else pdf_analyses
+            analyses[unit["path"]] = metadata
+            # A line identical to last run's can stay where it is in the log
+            line_unchanged = metadata is unit["metadata"]
+            log_lines.append((unit["key"], (json.dumps(metadata), line_unchanged)))
+            processed_files += 1
+        
+        self._write_metadata_log(log_lines)
+        self.harvest_manifest.save()
         
         # Log comprehensive summary
         self.logger.info(f"Cache Statistics: {new_caches} new caches created, {reused_caches} existing caches reused")
         self.logger.info(f"Created {len(cache_names)} total caches: {cache_names}")
-        self.logger.info(f"Processed {processed_files} files. Metadata written to {self.log_file}")
+        self.logger.info(f"Processed {processed_files} files ({unchanged_files} unchanged since last harvest). Metadata written to {self.log_file}")
+        
+        results = {
+            "pdf_analyses": pdf_analyses,
+            "csv_analyses": csv_analyses,
+            "processing_summary": {
+                "total_files_processed": processed_files,
+                "unchanged_files": unchanged_files,
+                "failed_files": failed_files,
+                "documents": len(pdf_analyses),
+                "sheets": len(csv_analyses)
+            },
+            "processed_files": processed_files,
+            "unchanged_files": unchanged_files,
+            "cache_names": cache_names,
+            "new_caches": new_caches,
+            "reused_caches": reused_caches,
+            "excel_ingestion": self.ingestion_stats,
+            "total_token_usage": self.get_total_token_usage()
+        }
+        
+        # Build the routing index once per harvest over exactly the documents this stage hands on;
+        # the analyst routes over the same set and so loads this index by fingerprint
+        try:
+            DocumentRouter.from_documents(harvested_documents(results))
+        except Exception as e:
+            self.logger.warning(f"Could not build document routing index: {e}")
         
         process_log.log(
             self.__class__.__name__, 
             "document_harvest", 
-            {
-                "processed_files": processed_files,
-                "cache_names": cache_names,
-                "new_caches": new_caches,
-                "reused_caches": reused_caches,
-                "total_token_usage": self.get_total_token_usage()
-            }, 
+            results, 
             AgentStatus.COMPLETED
         )
+        return results
 
 if __name__ == "__main__":
     import sys
@@ -1,10 +1,135 @@
 import time
+import asyncio
 from google.genai.types import Tool, GenerateContentConfig, GoogleSearch
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
-from typing import Dict, Any
+from agentic.base.concurrency import run_async
+from agentic.base.rate_limiter import get_rate_limiter
+from pydantic import BaseModel
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 load_dotenv()
 
+# Web search results go stale quickly, so keep them for a day rather than the default cache TTL
+SEARCH_CACHE_TTL_SECONDS = 24 * 3600
+
+class CompanyMetrics(BaseModel):
+    aum_growth_fy24: str
+    gnpa_percent: str
+    average_ltv: str
+    cost_of_funds: str
+    roa: str
+    crar: str
+
+class PeerFinancialMetrics(BaseModel):
+    muthoot_finance: CompanyMetrics
+    manappuram: CompanyMetrics
+    data_quality: str
+
+class CompanyShare(BaseModel):
+    name: str
+    fy22_share: str
+    fy23_share: str
+    fy24_share: str
+    trend: str
+
+class MarketShareTrends(BaseModel):
+    top_5_companies: List[CompanyShare]
+    market_insights: List[str]
+    total_market_size_fy24: str
+
+class QuarterlyDataPoint(BaseModel):
+    quarter: str
+    gold_price_change: str
+    aum_growth: str
+
+class GoldPriceCorrelation(BaseModel):
+    correlation_coefficient: str
+    sector_beta: str
+    key_findings: List[str]
+    quarterly_data_points: List[QuarterlyDataPoint]
+
+class RegulatoryDevelopments(BaseModel):
+    circular_date: str
+    key_changes: List[str]
+    auction_timeline_new: str
+    auction_timeline_old: str
+    impact_assessment: str
+    compliance_deadline: str
+    industry_reaction: str
+
+class ProductivityRange(BaseModel):
+    min: str
+    max: str
+
+class BranchPerformer(BaseModel):
+    company: str
+    aum_per_branch: str
+
+class BranchProductivityBenchmark(BaseModel):
+    peer_median_aum_per_branch: str
+    peer_range: ProductivityRange
+    top_performers: List[BranchPerformer]
+    industry_benchmark: str
+
+class Fintech(BaseModel):
+    name: str
+    aum: str
+    business_model: str
+    threat_level: str
+
+class FintechDisruptors(BaseModel):
+    major_fintechs: List[Fintech]
+    threat_assessment: str
+    key_differentiators: List[str]
+    market_disruption_timeline: str
+
+class LegalCase(BaseModel):
+    case_name: str
+    court: str
+    status: str
+    impact: str
+
+class LegalDevelopments(BaseModel):
+    recent_cases: List[LegalCase]
+    rule_changes: List[str]
+    industry_impact: str
+    compliance_requirements: List[str]
+
+class StructuralTrend(BaseModel):
+    trend: str
+    description: str
+    impact: str
+    timeline: str
+
+class StructuralTrends(BaseModel):
+    structural_trends: List[StructuralTrend]
+
+class PeerMultiple(BaseModel):
+    company: str
+    p_bv: str
+    p_abv: str
+    market_cap: str
+
+class ValuationRange(BaseModel):
+    p_bv_min: str
+    p_bv_max: str
+
+class ValuationBenchmarks(BaseModel):
+    peer_multiples: List[PeerMultiple]
+    average_p_bv: str
+    average_p_abv: str
+    valuation_range: ValuationRange
+    premium_discount_factors: List[str]
+
+class GoldPriceOutlook(BaseModel):
+    fy26_price_target: str
+    current_price: str
+    expected_change: str
+    demand_elasticity: str
+    key_drivers: List[str]
+    risk_factors: List[str]
+    broker_consensus: str
+
 class SectorSpecialistAgent(BaseAgent):
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         super().__init__(model_id)
@@ -21,27 +146,58 @@ class SectorSpecialistAgent(BaseAgent):
             "listed gold loan NBFC valuation P/BV P/ABV multiples peer comparison",
             "gold price forecast FY2026 demand elasticity broker consensus India"
         ]
+        self._prefetched_searches = {}
+    
+    def _search_config(self) -> GenerateContentConfig:
+        return GenerateContentConfig(
+            tools=[self.search_tool],
+            temperature=0.3,
+            max_output_tokens=600
+        )
+    
+    def _search_prompt(self, query: str) -> str:
+        return f"Research and analyze: {query}. Provide specific data points, financial metrics, and recent developments."
+    
+    async def _asearch_with_retry(self, query: str, max_retries: int = 3) -> str:
+        for attempt in range(max_retries):
+            try:
+                text, _ = await self._agenerate_content(self._search_prompt(query), self._search_config(), cache_ttl=SEARCH_CACHE_TTL_SECONDS)
+                return text
+            except Exception as e:
+                self.logger.warning(f"Search attempt {attempt+1} failed for query: {query[:50]}... Error: {str(e)}")
+                if attempt < max_retries - 1:
+                    # Throttling is already retried inside _agenerate_content; only honour an active cooldown here
+                    await asyncio.sleep(get_rate_limiter(self.model_id).cooldown_remaining())
+                else:
+                    return f"Search failed after {max_retries} attempts: {str(e)}"
+    
+    async def _aprefetch_searches(self, queries: list) -> Dict[str, str]:
+        results = await asyncio.gather(*(self._asearch_with_retry(query) for query in queries))
+        return dict(zip(queries, results))
     
     def _search_with_retry(self, query: str, max_retries: int = 3) -> str:
+        if query in self._prefetched_searches:
+            return self._prefetched_searches.pop(query)
+        
         for attempt in range(max_retries):
             try:
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=f"Research and analyze: {query}. Provide specific data points, financial metrics, and recent developments.",
-                    config=GenerateContentConfig(
-                        tools=[self.search_tool],
-                        temperature=0.3,
-                        max_output_tokens=600
-                    )
-                )
-                return response.text
+                text, _ = self._generate_content(self._search_prompt(query), self._search_config(), cache_ttl=SEARCH_CACHE_TTL_SECONDS)
+                return text
             except Exception as e:
                 self.logger.warning(f"Search attempt {attempt+1} failed for query: {query[:50]}... Error: {str(e)}")
                 if attempt < max_retries - 1:
-                    time.sleep(2)
+                    time.sleep(get_rate_limiter(self.model_id).cooldown_remaining())
                 else:
                     return f"Search failed after {max_retries} attempts: {str(e)}"
     
+    def _extract_research(self, analysis_prompt: str, schema: type, search_result: str, error: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+        try:
+            research, _ = self._generate_structured(analysis_prompt, schema, temperature=temperature, max_tokens=max_tokens)
+            return research
+        except Exception as e:
+            self.logger.warning(f"{error}: {str(e)}")
+            return {"error": error, "raw_data": search_result[:500]}
+    
     def _analyze_peer_financial_metrics(self) -> Dict[str, Any]:
         query = self.research_queries[0]
         search_result = self._search_with_retry(query)
@@ -75,11 +231,7 @@ class SectorSpecialistAgent(BaseAgent):
         Use 'N/A' for unavailable metrics.
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.2, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not extract peer metrics", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, PeerFinancialMetrics, search_result, "Could not extract peer metrics", temperature=0.2, max_tokens=400)
     
     def _analyze_market_share_trends(self) -> Dict[str, Any]:
         query = self.research_queries[1]
@@ -100,11 +252,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=500)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze market trends", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, MarketShareTrends, search_result, "Could not analyze market trends", temperature=0.3, max_tokens=500)
     
     def _analyze_gold_price_correlation(self) -> Dict[str, Any]:
         query = self.research_queries[2]
@@ -126,11 +274,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze correlation", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, GoldPriceCorrelation, search_result, "Could not analyze correlation", temperature=0.3, max_tokens=400)
     
     def _analyze_regulatory_developments(self) -> Dict[str, Any]:
         query = self.research_queries[3]
@@ -153,11 +297,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.2, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze regulatory changes", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, RegulatoryDevelopments, search_result, "Could not analyze regulatory changes", temperature=0.2, max_tokens=400)
     
     def _benchmark_branch_productivity(self, target_company_data: Dict) -> Dict[str, Any]:
         query = self.research_queries[4]
@@ -179,11 +319,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=300)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not benchmark productivity", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, BranchProductivityBenchmark, search_result, "Could not benchmark productivity", temperature=0.3, max_tokens=300)
     
     def _identify_fintech_disruptors(self) -> Dict[str, Any]:
         query = self.research_queries[5]
@@ -205,11 +341,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not identify fintechs", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, FintechDisruptors, search_result, "Could not identify fintechs", temperature=0.3, max_tokens=400)
     
     def _analyze_legal_developments(self) -> Dict[str, Any]:
         query = self.research_queries[6]
@@ -231,11 +363,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze legal developments", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, LegalDevelopments, search_result, "Could not analyze legal developments", temperature=0.3, max_tokens=400)
     
     def _analyze_structural_trends(self) -> Dict[str, Any]:
         query = self.research_queries[7]
@@ -252,30 +380,26 @@ class SectorSpecialistAgent(BaseAgent):
                 {{
                     "trend": "Rural wage growth",
                     "description": "Brief description",
-                    "impact_on_demand": "POSITIVE/NEGATIVE",
+                    "impact": "POSITIVE/NEGATIVE (on demand)",
                     "timeline": "Short/Medium/Long term"
                 }},
                 {{
                     "trend": "Digital KYC adoption", 
                     "description": "Brief description",
-                    "impact_on_operations": "POSITIVE/NEGATIVE",
+                    "impact": "POSITIVE/NEGATIVE (on operations)",
                     "timeline": "Short/Medium/Long term"
                 }},
                 {{
                     "trend": "Gold recycling patterns",
                     "description": "Brief description", 
-                    "impact_on_supply": "POSITIVE/NEGATIVE",
+                    "impact": "POSITIVE/NEGATIVE (on supply)",
                     "timeline": "Short/Medium/Long term"
                 }}
             ]
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=500)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze trends", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, StructuralTrends, search_result, "Could not analyze trends", temperature=0.3, max_tokens=500)
     
     def _analyze_valuation_benchmarks(self) -> Dict[str, Any]:
         query = self.research_queries[8]
@@ -298,11 +422,7 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.2, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze valuations", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, ValuationBenchmarks, search_result, "Could not analyze valuations", temperature=0.2, max_tokens=400)
     
     def _analyze_gold_price_outlook(self) -> Dict[str, Any]:
         query = self.research_queries[9]
@@ -325,57 +445,50 @@ class SectorSpecialistAgent(BaseAgent):
         }}
         """
         
-        try:
-            response = self._generate_response(analysis_prompt, temperature=0.3, max_tokens=400)
-            return eval(response.strip())
-        except:
-            return {"error": "Could not analyze price outlook", "raw_data": search_result[:500]}
+        return self._extract_research(analysis_prompt, GoldPriceOutlook, search_result, "Could not analyze price outlook", temperature=0.3, max_tokens=400)
     
     def execute(self, process_log: ProcessLog) -> Dict[str, Any]:
         process_log.log(self.__class__.__name__, "sector_research", "Starting external benchmark & macro analysis", AgentStatus.RUNNING)
         
-        associate_data = process_log.get_stage_data("financial_ratio_analysis")
-        if not associate_data:
-            process_log.log(self.__class__.__name__, "sector_research", "No associate data found", AgentStatus.FAILED)
-            return {"error": "Cannot proceed without associate financial analysis"}
+        # Sector research only uses external web data, so it runs alongside the associate stage
+        # and only needs the ingested resources to have passed QA
+        verification_data = process_log.get_stage_data("ingestion_qa")
+        if not verification_data:
+            process_log.log(self.__class__.__name__, "sector_research", "No verified resources found", AgentStatus.FAILED)
+            return {"error": "Cannot proceed without verified resources"}
         
         sector_research = {}
         
+        # The web searches are independent of each other, so run them all up front concurrently
+        process_log.log(self.__class__.__name__, "web_search", f"Running {len(self.research_queries)} searches concurrently", AgentStatus.RUNNING)
+        self._prefetched_searches = run_async(self._aprefetch_searches(self.research_queries))
+        
         process_log.log(self.__class__.__name__, "peer_metrics", "Analyzing peer financial metrics", AgentStatus.RUNNING)
         sector_research["peer_financial_metrics"] = self._analyze_peer_financial_metrics()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "market_share", "Analyzing market share trends", AgentStatus.RUNNING)
         sector_research["market_share_trends"] = self._analyze_market_share_trends()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "gold_correlation", "Analyzing gold price correlation", AgentStatus.RUNNING)
         sector_research["gold_price_correlation"] = self._analyze_gold_price_correlation()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "regulatory", "Analyzing regulatory developments", AgentStatus.RUNNING)
         sector_research["regulatory_developments"] = self._analyze_regulatory_developments()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "productivity", "Benchmarking branch productivity", AgentStatus.RUNNING)
         sector_research["branch_productivity"] = self._benchmark_branch_productivity({})
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "fintechs", "Identifying fintech disruptors", AgentStatus.RUNNING)
         sector_research["fintech_disruptors"] = self._identify_fintech_disruptors()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "legal", "Analyzing legal developments", AgentStatus.RUNNING)
         sector_research["legal_developments"] = self._analyze_legal_developments()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "trends", "Analyzing structural trends", AgentStatus.RUNNING)
         sector_research["structural_trends"] = self._analyze_structural_trends()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "valuations", "Analyzing valuation benchmarks", AgentStatus.RUNNING)
         sector_research["valuation_benchmarks"] = self._analyze_valuation_benchmarks()
-        time.sleep(2)
         
         process_log.log(self.__class__.__name__, "outlook", "Analyzing gold price outlook", AgentStatus.RUNNING)
         sector_research["gold_price_outlook"] = self._analyze_gold_price_outlook()
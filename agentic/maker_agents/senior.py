@@ -1,5 +1,7 @@
 from agentic.base.base_agent import BaseAgent, ProcessLog, AgentStatus
-from typing import Dict, Any
+from agentic.retrieval.chunks import ChunkIndex, render_chunks
+from agentic.retrieval.routing import harvested_documents
+from typing import Dict, Any, List
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
@@ -62,13 +64,32 @@ class SeniorAgent(BaseAgent):
             }
         }
     
-    def _assess_transaction_structure(self, financial_data: Dict) -> Dict[str, Any]:
+    def _retrieve_ic_evidence(self, all_data: Dict) -> Dict[str, List[Any]]:
+        """Top document excerpts per IC question from the local chunk index, so the prompts carry only relevant pages and rows"""
+        sources = list(harvested_documents(all_data.get("document_harvest")))
+        if not sources:
+            return {}
+        try:
+            index = ChunkIndex.for_sources(sources)
+        except Exception as e:
+            self.logger.warning(f"Could not build chunk index for IC questions: {str(e)}")
+            return {}
+        return {question: index.retrieve(question, top_k=2) for question in self.ic_questions}
+    
+    def _assess_transaction_structure(self, financial_data: Dict, ic_evidence: Dict[str, List[Any]] = None) -> Dict[str, Any]:
+        evidence = "\n\n".join(
+            f"Q: {question}\n{render_chunks(chunks, max_chars=1200)}"
+            for question, chunks in (ic_evidence or {}).items() if chunks
+        )
         structure_prompt = f"""
         Based on the financial analysis, assess the optimal transaction structure for this gold loan NBFC investment:
         
         Financial Health Score: {financial_data.get('financial_health_score', 'N/A')}/10
         Red Flags Count: {len(financial_data.get('red_flags', []))}
         
+        Relevant document excerpts per IC question:
+        {evidence or 'None retrieved'}
+        
         For each IC question, provide assessment:
         
         1. Security Structure: Recommend first-ranking charge vs negative pledge based on credit quality
@@ -89,6 +110,7 @@ class SeniorAgent(BaseAgent):
         
         return {
             "transaction_structure_assessment": response,
+            "evidence": {question: [chunk.chunk_id for chunk in chunks] for question, chunks in (ic_evidence or {}).items()},
             "risk_adjusted_recommendations": {
                 "security_level": "HIGH" if financial_data.get('financial_health_score', 0) < 7 else "STANDARD",
                 "covenant_intensity": "TIGHT" if len(financial_data.get('red_flags', [])) > 3 else "STANDARD",
@@ -245,10 +267,7 @@ class SeniorAgent(BaseAgent):
         process_log.log(self.__class__.__name__, "ic_synthesis", "Starting IC-level synthesis & risk-return analysis", AgentStatus.RUNNING)
         
         # Gather all previous stage data
-        all_stage_data = {}
-        for entry in process_log.entries:
-            if entry["status"] in ["completed", "verified"]:
-                all_stage_data[entry["stage"]] = entry["data"]
+        all_stage_data = process_log.successful_stage_data()
         
         if len(all_stage_data) < 4:  # Should have at least 4 completed stages
             process_log.log(self.__class__.__name__, "ic_synthesis", "Insufficient data for synthesis", AgentStatus.FAILED)
@@ -258,7 +277,8 @@ class SeniorAgent(BaseAgent):
         investment_thesis = self._synthesize_investment_thesis(all_stage_data)
         
         process_log.log(self.__class__.__name__, "transaction_structure", "Assessing transaction structure", AgentStatus.RUNNING)
-        transaction_structure = self._assess_transaction_structure(all_stage_data.get("financial_ratio_analysis", {}))
+        ic_evidence = self._retrieve_ic_evidence(all_stage_data)
+        transaction_structure = self._assess_transaction_structure(all_stage_data.get("financial_ratio_analysis", {}), ic_evidence)
         
         process_log.log(self.__class__.__name__, "return_analysis", "Calculating expected returns", AgentStatus.RUNNING)
         return_analysis = self._calculate_expected_returns(all_stage_data)
@@ -8,6 +8,10 @@ from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
 from agentic.base.base_agent import ProcessLog, AgentStatus
+from agentic.base.stage_scheduler import StageScheduler
+from agentic.base.checkpoint import CheckpointStore
+from agentic.base.log_sink import JsonlLogSink
+from agentic.base.structured_output import StructuredOutputStats
 from maker_agents.resource_pooler import ResourcePoolerAgent
 from checker_agents.resource_pooler_checker import ResourcePoolerCheckerAgent
 from maker_agents.analyst import AnalystAgent
@@ -19,9 +23,10 @@ from maker_agents.senior import SeniorAgent
 load_dotenv()
 
 class MetaAgent:
-    def __init__(self, config_path: str = "agentic/config.yaml"):
+    def __init__(self, config_path: str = "agentic/config.yaml", max_parallel_stages: Optional[int] = None):
         self.process_log = ProcessLog()
         self.config_path = config_path
+        self.max_parallel_stages = max_parallel_stages
         self.setup_logging()
         
         # Initialize all agents
@@ -81,7 +86,8 @@ class MetaAgent:
                 "name": "sector_research",
                 "agent": "sector_specialist",
                 "description": "External benchmark & macro analysis",
-                "dependencies": ["financial_ratio_analysis"],
+                # Only reads external web data, so it can overlap with the analyst/associate branch
+                "dependencies": ["ingestion_qa"],
                 "timeout_minutes": 25,
                 "retry_count": 1
             },
@@ -89,7 +95,7 @@ class MetaAgent:
                 "name": "ic_synthesis",
                 "agent": "senior",
                 "description": "IC-level synthesis & risk-return",
-                "dependencies": ["sector_research"],
+                "dependencies": ["financial_ratio_analysis", "sector_research"],
                 "timeout_minutes": 10,
                 "retry_count": 1
             }
@@ -131,44 +137,22 @@ class MetaAgent:
         
         return True
     
-    def _execute_stage_with_retry(self, stage: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+    def _execute_stage(self, stage: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Run one attempt of a stage; retries and timeouts are handled by StageScheduler"""
         stage_name = stage["name"]
-        agent_name = stage["agent"]
-        max_retries = stage.get("retry_count", 1)
-        
-        for attempt in range(max_retries + 1):
-            try:
-                self.logger.info(f"Executing stage {stage_name} (attempt {attempt + 1}/{max_retries + 1})")
-                
-                agent = self.agents[agent_name]
-                
-                # Execute the agent
-                if stage_name == "document_harvest":
-                    result = agent.execute(self.process_log, **kwargs)
-                else:
-                    result = agent.execute(self.process_log)
-                
-                # Check if execution was successful
-                if "error" in result:
-                    raise Exception(f"Agent returned error: {result['error']}")
-                
-                return result
-                
-            except Exception as e:
-                self.logger.error(f"Stage {stage_name} attempt {attempt + 1} failed: {str(e)}")
-                
-                if attempt == max_retries:
-                    self.process_log.log(
-                        "MetaAgent", 
-                        stage_name, 
-                        {"error": str(e), "attempts": attempt + 1}, 
-                        AgentStatus.FAILED
-                    )
-                    raise Exception(f"Stage {stage_name} failed after {attempt + 1} attempts: {str(e)}")
-                
-                # Wait before retry
-                import time
-                time.sleep(5 * (attempt + 1))
+        agent = self.agents[stage["agent"]]
+        
+        # Execute the agent
+        if stage_name == "document_harvest":
+            result = agent.execute(self.process_log, **kwargs)
+        else:
+            result = agent.execute(self.process_log)
+        
+        # Check if execution was successful
+        if "error" in result:
+            raise Exception(f"Agent returned error: {result['error']}")
+        
+        return result
     
     def _validate_stage_output(self, stage: Dict[str, Any], result: Dict[str, Any]) -> bool:
         stage_name = stage["name"]
@@ -217,15 +201,26 @@ class MetaAgent:
         
         return True
     
+    def _token_usage_summary(self) -> Dict[str, Any]:
+        by_agent = {name: agent.get_total_token_usage() for name, agent in self.agents.items()}
+        return {
+            "prompt": sum(usage["prompt"] for usage in by_agent.values()),
+            "candidates": sum(usage["candidates"] for usage in by_agent.values()),
+            "total": sum(usage["total"] for usage in by_agent.values()),
+            "cached_responses": sum(agent.cached_responses for agent in self.agents.values()),
+            "by_agent": by_agent
+        }
+    
+    def _structured_output_summary(self) -> Dict[str, Any]:
+        merged = StructuredOutputStats()
+        for name, agent in self.agents.items():
+            for schema, counts in agent.structured_output_stats.by_schema.items():
+                merged.record(f"{name}.{schema}", **counts)
+        return merged.summary()
+    
     def _generate_pipeline_summary(self) -> Dict[str, Any]:
-        completed_stages = []
-        failed_stages = []
-        
-        for entry in self.process_log.entries:
-            if entry["status"] == "completed":
-                completed_stages.append(entry["stage"])
-            elif entry["status"] == "failed":
-                failed_stages.append(entry["stage"])
+        completed_stages = [entry.stage for entry in self.process_log.entries_with_status(AgentStatus.COMPLETED)]
+        failed_stages = [entry.stage for entry in self.process_log.entries_with_status(AgentStatus.FAILED)]
         
         total_duration = (datetime.now() - self.process_log.start_time).total_seconds()
         
@@ -236,6 +231,8 @@ class MetaAgent:
             "total_stages": len(self.pipeline_stages),
             "completion_rate": len(completed_stages) / len(self.pipeline_stages),
             "total_duration_minutes": round(total_duration / 60, 2),
+            "token_usage": self._token_usage_summary(),
+            "structured_output": self._structured_output_summary(),
             "started_at": self.process_log.start_time.isoformat(),
             "completed_at": datetime.now().isoformat()
         }
@@ -251,9 +248,11 @@ class MetaAgent:
         with open(results_file, 'w') as f:
             json.dump(results, f, indent=2, default=str)
         
-        # Save process log separately
-        log_file = output_dir / f"process_log_{timestamp}.json"
-        self.process_log.save_to_file(str(log_file))
+        # The process log is already on disk as a JSONL trace referenced from the results;
+        # only runs without a trace sink need it written out here
+        if self.process_log.sink is None:
+            log_file = output_dir / f"process_log_{timestamp}.json"
+            self.process_log.save_to_file(str(log_file))
         
         # Save IC memorandum separately for easy access
         if "final_results" in results and "ic_synthesis" in results["final_results"]:
@@ -266,75 +265,133 @@ class MetaAgent:
         self.logger.info(f"Results saved to {output_dir}")
         return str(results_file)
     
-    def execute_pipeline(self, data_directory: str, save_results: bool = True) -> Dict[str, Any]:
+    def _restore_checkpoint(self, checkpoint: CheckpointStore, data_directory: str, stage_names: list) -> Dict[str, Any]:
+        restored = checkpoint.load(data_directory, stage_names)
+        if restored is None:
+            self.logger.info("No usable checkpoint found; running the full pipeline")
+            return {}
+        
+        self.process_log.restore(restored["process_log_entries"], restored["started_at"])
+        stage_results = restored["stage_results"]
+        expired = self._expired_harvest_caches(stage_results.get("document_harvest"))
+        if expired:
+            # Downstream stages query these caches, so the harvest runs again to re-point them;
+            # the scheduler only restores a stage whose dependencies were restored too
+            self.logger.info(f"{len(expired)} checkpointed context caches have expired; re-running document_harvest: {expired}")
+            stage_results = {name: result for name, result in stage_results.items() if name != "document_harvest"}
+        self.logger.info(f"Resuming from checkpoint with completed stages: {list(stage_results)}")
+        return stage_results
+    
+    def _expired_harvest_caches(self, harvest: Optional[Dict[str, Any]]) -> list:
+        """Checkpointed harvest caches that are no longer the live cache for their content, checked the way the harvest reuses metadata"""
+        if not harvest:
+            return []
+        resource_pooler = self.agents["resource_pooler"]
+        expired = []
+        for cache_name in harvest.get("cache_names", []):
+            content_hash = resource_pooler.file_manifest.content_hash_for_cache(cache_name)
+            live_cache = resource_pooler.file_manifest.live_cache(content_hash, resource_pooler.model_id) if content_hash else None
+            if not live_cache or live_cache["name"] != cache_name:
+                expired.append(cache_name)
+        return expired
+    
+    def _checkpoint_stage(self, checkpoint: CheckpointStore, stage: Dict[str, Any], result: Dict[str, Any]):
+        try:
+            checkpoint.save_stage(stage["name"], result, self.process_log.to_dicts())
+        except OSError as e:
+            # A failed checkpoint only costs resumability, never the run itself
+            self.logger.warning(f"Could not checkpoint stage {stage['name']}: {e}")
+    
+    def execute_pipeline(self, data_directory: str, save_results: bool = True, resume: bool = False) -> Dict[str, Any]:
         """
         Execute the complete gold loan NBFC investment analysis pipeline.
         
         Args:
             data_directory: Path to directory containing PDF and Excel files
             save_results: Whether to save results to disk
+            resume: Continue from the last checkpoint in data_directory instead of starting over
             
         Returns:
             Dictionary containing pipeline results and summary
         """
         self.logger.info(f"Starting gold loan NBFC analysis pipeline for: {data_directory}")
-        self.process_log.log("MetaAgent", "pipeline_start", f"Data directory: {data_directory}", AgentStatus.RUNNING)
         
         # Validate data directory
         if not Path(data_directory).exists():
             error_msg = f"Data directory does not exist: {data_directory}"
             self.logger.error(error_msg)
+            self.process_log.log("MetaAgent", "pipeline_start", f"Data directory: {data_directory}", AgentStatus.RUNNING)
             return {"status": "failed", "error": error_msg}
         
+        # Stream the process log to an append-only trace so a crashed run still leaves a complete record
+        trace_dir = Path(data_directory) / "analysis_output" / "traces"
+        trace_path = trace_dir / f"process_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self.process_log.attach_sink(JsonlLogSink(str(trace_path), blob_dir=str(trace_dir / "blobs")))
+        try:
+            results = self._run_pipeline(data_directory, save_results, resume)
+        finally:
+            self.process_log.close()
+        results["process_log_trace"] = str(trace_path)
+        return results
+    
+    def _run_pipeline(self, data_directory: str, save_results: bool, resume: bool) -> Dict[str, Any]:
+        stage_names = [stage["name"] for stage in self.pipeline_stages]
+        checkpoint = CheckpointStore.for_data_directory(data_directory)
+        restored_results = self._restore_checkpoint(checkpoint, data_directory, stage_names) if resume else {}
+        if not restored_results:
+            checkpoint.start(data_directory, stage_names, self.process_log.start_time)
+        
+        self.process_log.log(
+            "MetaAgent",
+            "pipeline_resume" if restored_results else "pipeline_start",
+            f"Data directory: {data_directory}",
+            AgentStatus.RUNNING,
+            f"Restored stages: {', '.join(restored_results)}" if restored_results else ""
+        )
+        
         pipeline_results = {"final_results": {}}
         
         try:
-            # Execute each stage in sequence
+            # Run stages as a dependency graph; independent branches execute concurrently
+            scheduler_kwargs = {} if self.max_parallel_stages is None else {"max_workers": self.max_parallel_stages}
+            scheduler = StageScheduler(
+                self.pipeline_stages,
+                execute=lambda stage: self._execute_stage(stage, data_directory=data_directory),
+                validate=self._validate_stage_output,
+                can_start=self._validate_dependencies,
+                on_complete=lambda stage, result: self._checkpoint_stage(checkpoint, stage, result),
+                completed=restored_results,
+                **scheduler_kwargs
+            )
+            outcomes = scheduler.run()
+            
+            failed_outcomes = []
             for stage in self.pipeline_stages:
-                stage_name = stage["name"]
-                
-                self.logger.info(f"Starting stage: {stage_name} - {stage['description']}")
-                
-                # Validate dependencies
-                if not self._validate_dependencies(stage):
-                    error_msg = f"Dependencies not satisfied for stage {stage_name}"
-                    self.process_log.log("MetaAgent", stage_name, error_msg, AgentStatus.FAILED)
-                    return {
-                        "status": "failed",
-                        "stage": stage_name,
-                        "error": error_msg,
-                        "pipeline_summary": self._generate_pipeline_summary()
-                    }
-                
-                # Execute stage with retry logic
-                try:
-                    if stage_name == "document_harvest":
-                        stage_result = self._execute_stage_with_retry(stage, data_directory=data_directory)
-                    else:
-                        stage_result = self._execute_stage_with_retry(stage)
-                    
-                    # Validate output
-                    if not self._validate_stage_output(stage, stage_result):
-                        error_msg = f"Stage {stage_name} output validation failed"
-                        return {
-                            "status": "failed",
-                            "stage": stage_name,
-                            "error": error_msg,
-                            "pipeline_summary": self._generate_pipeline_summary()
-                        }
-                    
-                    pipeline_results["final_results"][stage_name] = stage_result
-                    self.logger.info(f"Stage {stage_name} completed successfully")
-                    
-                except Exception as e:
-                    error_msg = f"Stage {stage_name} execution failed: {str(e)}"
-                    self.logger.error(error_msg)
-                    return {
-                        "status": "failed",
-                        "stage": stage_name,
-                        "error": error_msg,
-                        "pipeline_summary": self._generate_pipeline_summary()
-                    }
+                outcome = outcomes[stage["name"]]
+                if outcome.status == "completed":
+                    pipeline_results["final_results"][outcome.name] = outcome.result
+                    continue
+                failed_outcomes.append(outcome)
+                self.process_log.log(
+                    "MetaAgent",
+                    outcome.name,
+                    {"error": outcome.error, "attempts": outcome.attempts, "outcome": outcome.status, "blocked_by": outcome.blocked_by},
+                    AgentStatus.FAILED
+                )
+            
+            if failed_outcomes:
+                # Report the first stage that actually failed rather than one skipped because of it
+                root_failure = next((o for o in failed_outcomes if o.status != "skipped"), failed_outcomes[0])
+                error_msg = f"Stage {root_failure.name} execution failed: {root_failure.error}"
+                self.logger.error(error_msg)
+                return {
+                    "status": "failed",
+                    "stage": root_failure.name,
+                    "error": error_msg,
+                    "stage_outcomes": {o.name: o.status for o in outcomes.values()},
+                    "pipeline_summary": self._generate_pipeline_summary(),
+                    "partial_results": pipeline_results["final_results"]
+                }
             
             # Pipeline completed successfully
             pipeline_summary = self._generate_pipeline_summary()
@@ -343,7 +400,8 @@ class MetaAgent:
                 "status": "completed",
                 "pipeline_summary": pipeline_summary,
                 "final_results": pipeline_results["final_results"],
-                "process_log_entries": self.process_log.entries,
+                "process_log_entries": self.process_log.to_dicts(),
+                "process_log_trace": str(self.process_log.sink.path),
                 "human_review_required": True,
                 "ic_ready": True,
                 "next_actions": {
@@ -384,33 +442,35 @@ class MetaAgent:
         return {
             "current_stage": self.process_log.current_stage,
             "elapsed_time_minutes": (datetime.now() - self.process_log.start_time).total_seconds() / 60,
-            "completed_stages": [entry["stage"] for entry in self.process_log.entries if entry["status"] == "completed"],
-            "failed_stages": [entry["stage"] for entry in self.process_log.entries if entry["status"] == "failed"],
+            "completed_stages": [entry.stage for entry in self.process_log.entries_with_status(AgentStatus.COMPLETED)],
+            "failed_stages": [entry.stage for entry in self.process_log.entries_with_status(AgentStatus.FAILED)],
             "total_entries": len(self.process_log.entries)
         }
 
 # Convenience function for running the pipeline
-def run_gold_loan_analysis(data_directory: str, config_path: str = "agentic/config.yaml") -> Dict[str, Any]:
+def run_gold_loan_analysis(data_directory: str, config_path: str = "agentic/config.yaml", resume: bool = False) -> Dict[str, Any]:
     """
     Convenience function to run the complete gold loan NBFC analysis pipeline.
     
     Args:
         data_directory: Path to directory containing analysis documents
         config_path: Path to configuration file
+        resume: Continue from the last checkpoint instead of re-running completed stages
         
     Returns:
         Pipeline execution results
     """
     meta_agent = MetaAgent(config_path)
-    return meta_agent.execute_pipeline(data_directory)
+    return meta_agent.execute_pipeline(data_directory, resume=resume)
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: uv run agentic/meta_agent.py <data_directory>")
+    args = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    if len(args) != 1:
+        print("Usage: uv run agentic/meta_agent.py <data_directory> [--resume]")
         sys.exit(1)
-    data_dir = sys.argv[1]
-    result = run_gold_loan_analysis(data_dir)
+    data_dir = args[0]
+    result = run_gold_loan_analysis(data_dir, resume="--resume" in sys.argv[1:])
     print("\n" + "="*50)
     print("GOLD LOAN NBFC ANALYSIS PIPELINE RESULTS")
     print("="*50)
@@ -0,0 +1,3 @@
+from agentic.retrieval.bm25 import *
+from agentic.retrieval.routing import *
+from agentic.retrieval.chunks import *
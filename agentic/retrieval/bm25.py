@@ -0,0 +1,120 @@
+import re
+import json
+from pathlib import Path
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "has", "have",
+    "how", "if", "in", "into", "is", "it", "its", "of", "on", "or", "than", "that", "the", "their",
+    "this", "to", "vs", "was", "were", "what", "when", "which", "with", "within"
+}
+
+def _stem(token: str) -> str:
+    # Plural folding is enough for report vocabulary ("loans"/"loan", "provisions"/"provision")
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in TOKEN.findall(str(text).lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over an inverted index held as CSR arrays.
+
+    Term ``t`` owns ``doc_ids[indptr[t]:indptr[t + 1]]`` with matching term frequencies,
+    so a query touches only the postings of its own terms and scores every document in
+    one vectorised pass. ``save`` writes plain .npy files that ``load`` memory-maps.
+    """
+
+    def __init__(self, doc_ids: List[str], terms: List[str], indptr: np.ndarray, postings: np.ndarray, frequencies: np.ndarray, doc_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.indptr = indptr
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.metadata: Dict = {}
+        self.average_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        document_frequency = np.diff(indptr).astype(np.float64)
+        self.idf = np.log1p((len(self.doc_ids) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        doc_ids = list(documents)
+        counts = [Counter(tokenize(documents[doc_id])) for doc_id in doc_ids]
+        terms = sorted({term for count in counts for term in count})
+        vocabulary = {term: i for i, term in enumerate(terms)}
+
+        term_index = np.fromiter((vocabulary[term] for count in counts for term in count), dtype=np.int64)
+        doc_index = np.fromiter((d for d, count in enumerate(counts) for _ in count), dtype=np.int32)
+        frequency = np.fromiter((n for count in counts for n in count.values()), dtype=np.float32)
+        order = np.argsort(term_index, kind="stable")
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_index, minlength=len(terms)), out=indptr[1:])
+        doc_lengths = np.array([sum(count.values()) for count in counts], dtype=np.float32)
+        return cls(doc_ids, terms, indptr, doc_index[order], frequency[order], doc_lengths, k1, b)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.doc_ids))
+        if not self.doc_ids:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.average_length, 1e-9))
+        for term, query_count in Counter(tokenize(query)).items():
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            start, stop = self.indptr[t], self.indptr[t + 1]
+            docs = self.postings[start:stop]
+            tf = self.frequencies[start:stop]
+            scores[docs] += query_count * self.idf[t] * tf * (self.k1 + 1) / (tf + norm[docs])
+        return scores
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Best ``top_k`` documents scoring above ``min_score``, best first"""
+        scores = self.scores(query)
+        if not len(scores):
+            return []
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > min_score]
+
+    def save(self, directory: str, metadata: Optional[Dict] = None):
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("indptr", "postings", "frequencies", "doc_lengths"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "index.json").write_text(json.dumps({
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "terms": self.terms,
+            "metadata": metadata or {}
+        }))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        """The index saved in ``directory`` with its arrays memory-mapped, or None if absent or stale"""
+        path = Path(directory)
+        try:
+            header = json.loads((path / "index.json").read_text())
+            if header.get("version") != INDEX_VERSION:
+                return None
+            arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ("indptr", "postings", "frequencies", "doc_lengths")}
+        except (OSError, ValueError):
+            return None
+        index = cls(header["doc_ids"], header["terms"], k1=header["k1"], b=header["b"], **arrays)
+        index.metadata = header["metadata"]
+        return index
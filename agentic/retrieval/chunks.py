@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import importlib.util
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.base.file_manifest import hash_file
+from agentic.retrieval.bm25 import INDEX_VERSION, BM25Index
+
+CHUNKER_VERSION = 1
+CHUNK_INDEX_DIR = DEFAULT_CACHE_DIR / "chunk_index"
+MAX_CHUNK_CHARS = int(os.getenv("RETRIEVAL_MAX_CHUNK_CHARS", "4000"))
+CHUNK_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+CHUNK_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "2.0"))
+# Retrieved context up to this size goes inline in the prompt; above it the document's context cache is cheaper
+INLINE_CONTEXT_CHARS = int(os.getenv("RETRIEVAL_INLINE_CONTEXT_CHARS", "24000"))
+
+def pdf_available() -> bool:
+    return importlib.util.find_spec("pypdf") is not None
+
+@dataclass
+class Chunk:
+    source: str
+    locator: str
+    text: str
+    score: float = 0.0
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{Path(self.source).name}#{self.locator}"
+
+def _split_text(text: str, max_chars: int) -> List[str]:
+    """Paragraph-aligned pieces of at most ``max_chars`` (a single longer paragraph is cut hard)"""
+    pieces, current = [], ""
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+def chunk_pdf(pdf_path: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    """One chunk per page (long pages split on paragraphs); needs pypdf"""
+    from pypdf import PdfReader
+    chunks = []
+    for number, page in enumerate(PdfReader(pdf_path).pages, start=1):
+        text = re.sub(r"[ \t]+", " ", page.extract_text() or "")
+        pieces = _split_text(text.strip(), max_chars)
+        for i, piece in enumerate(pieces):
+            locator = f"page {number}" if len(pieces) == 1 else f"page {number}.{i + 1}"
+            chunks.append(Chunk(source=str(pdf_path), locator=locator, text=piece))
+    return chunks
+
+TITLE_BLOCK_LINES = 2
+
+def _sheet_blocks(lines: List[str]) -> List[tuple]:
+    """(start, stop) row spans separated by blank rows; a short title block is joined to the block after it"""
+    blocks, start = [], None
+    for r in range(len(lines) + 1):
+        if r < len(lines) and lines[r]:
+            start = r if start is None else start
+        elif start is not None:
+            blocks.append((start, r))
+            start = None
+    merged = []
+    for span in blocks:
+        if merged and merged[-1][1] - merged[-1][0] <= TITLE_BLOCK_LINES and merged[-1][2]:
+            title_start = merged.pop()[0]
+            span = (title_start, span[1])
+        merged.append((span[0], span[1], span[1] - span[0] <= TITLE_BLOCK_LINES))
+    return [(start, stop) for start, stop, _ in merged]
+
+def chunk_sheet(csv_path: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    """
+    One chunk per section block of an extracted sheet (blocks are separated by blank rows,
+    titles stay with their table), rendered as pipe-delimited rows. A block longer than
+    ``max_chars`` is split into row groups that each repeat the block's first rows.
+    """
+    grid = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False, skip_blank_lines=False).to_numpy()
+    lines = [" | ".join(cell.strip() for cell in row if cell.strip()) for row in grid]
+    chunks = []
+    for start, stop in _sheet_blocks(lines):
+        block = [line for line in lines[start:stop] if line]
+        header = block[:TITLE_BLOCK_LINES]
+        header_size = sum(len(line) + 1 for line in header)
+        rows, first, size = [], start, header_size
+        for offset, line in enumerate(block[len(header):], start=start + len(header)):
+            if rows and size + len(line) + 1 > max_chars:
+                chunks.append(Chunk(source=str(csv_path), locator=f"rows {first + 1}-{offset}", text="\n".join(header + rows)))
+                rows, first, size = [], offset, header_size
+            rows.append(line)
+            size += len(line) + 1
+        chunks.append(Chunk(source=str(csv_path), locator=f"rows {first + 1}-{stop}", text="\n".join(header + rows)))
+    return chunks
+
+def chunk_document(path: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return chunk_sheet(path, max_chars)
+    if suffix == ".pdf" and pdf_available():
+        return chunk_pdf(path, max_chars)
+    return []
+
+def render_chunks(chunks: List[Chunk], max_chars: Optional[int] = None) -> str:
+    """Retrieved chunks as a prompt section, each headed by its source and location"""
+    blocks = [f"[{chunk.chunk_id}]\n{chunk.text[:max_chars] if max_chars else chunk.text}" for chunk in chunks]
+    return "\n\n".join(blocks)
+
+class ChunkIndex:
+    """Page- and section-level retrieval over a set of local documents.
+
+    Each document is chunked once per content hash (PDF pages need pypdf; sheets are
+    split into section blocks) and the chunks kept as JSONL. A BM25 index over the
+    chunks of the whole set is saved under a fingerprint of the member hashes and
+    memory-mapped on later loads, so re-runs neither re-read PDFs nor rebuild postings.
+    """
+
+    def __init__(self, chunks: List[Chunk], index: BM25Index):
+        self.chunks = chunks
+        self.index = index
+        self._positions: Dict[str, np.ndarray] = {}
+        sources = np.array([chunk.source for chunk in chunks], dtype=object)
+        for source in set(sources):
+            self._positions[source] = np.flatnonzero(sources == source)
+
+    @classmethod
+    def for_sources(cls, paths, index_dir: Optional[str] = None) -> "ChunkIndex":
+        logger = logging.getLogger("ChunkIndex")
+        directory = Path(index_dir) if index_dir else CHUNK_INDEX_DIR
+        members = []
+        for path in sorted(set(str(p) for p in paths)):
+            if Path(path).is_file() and (Path(path).suffix.lower() == ".csv" or (Path(path).suffix.lower() == ".pdf" and pdf_available())):
+                members.append((path, hash_file(path)))
+        fingerprint = hashlib.sha256(json.dumps([CHUNKER_VERSION, INDEX_VERSION, MAX_CHUNK_CHARS, members]).encode()).hexdigest()[:16]
+
+        chunks = []
+        for path, content_hash in members:
+            chunks.extend(cls._document_chunks(path, content_hash, directory, logger))
+        index = BM25Index.load(str(directory / "sets" / fingerprint))
+        if index is None or len(index) != len(chunks):
+            index = BM25Index.build({str(i): chunk.text for i, chunk in enumerate(chunks)})
+            try:
+                index.save(str(directory / "sets" / fingerprint), metadata={"sources": len(members), "chunks": len(chunks)})
+            except OSError as e:
+                logger.warning(f"Could not save chunk index: {e}")
+        return cls(chunks, index)
+
+    @staticmethod
+    def _document_chunks(path: str, content_hash: str, directory: Path, logger: logging.Logger) -> List[Chunk]:
+        cache_path = directory / "documents" / f"v{CHUNKER_VERSION}-{MAX_CHUNK_CHARS}" / f"{content_hash}.jsonl"
+        if cache_path.exists():
+            return [Chunk(**{**json.loads(line), "source": path}) for line in cache_path.read_text().splitlines() if line]
+        try:
+            chunks = chunk_document(path)
+        except Exception as e:
+            logger.warning(f"Could not chunk {path}: {e}")
+            return []
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text("".join(json.dumps(asdict(chunk)) + "\n" for chunk in chunks))
+            tmp_path.replace(cache_path)
+        except OSError as e:
+            logger.warning(f"Could not cache chunks of {path}: {e}")
+        return chunks
+
+    def retrieve(self, query: str, top_k: int = CHUNK_TOP_K, min_score: float = CHUNK_MIN_SCORE, sources: Optional[List[str]] = None) -> List[Chunk]:
+        """Best chunks for ``query``, optionally only from ``sources``, best first"""
+        scores = self.index.scores(query)
+        if sources is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            for source in sources:
+                if source in self._positions:
+                    allowed[self._positions[source]] = True
+            scores = np.where(allowed, scores, 0.0)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [Chunk(**{**asdict(self.chunks[i]), "score": float(scores[i])}) for i in top if scores[i] > min_score]
@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from agentic.base.response_cache import DEFAULT_CACHE_DIR
+from agentic.retrieval.bm25 import INDEX_VERSION, BM25Index
+
+DOCUMENT_INDEX_DIR = DEFAULT_CACHE_DIR / "document_index"
+ROUTING_TOP_K = int(os.getenv("ANALYST_ROUTING_TOP_K", "3"))
+ROUTING_MIN_SCORE = float(os.getenv("ANALYST_ROUTING_MIN_SCORE", "1.0"))
+# Documents scoring under this share of the best match for a question are not worth a call
+ROUTING_RELATIVE_CUTOFF = float(os.getenv("ANALYST_ROUTING_RELATIVE_CUTOFF", "0.5"))
+
+# Added to each question's query so short questions still reach the category's vocabulary
+CATEGORY_TERMS = {
+    "business_strategy": "business strategy branch digital products",
+    "asset_quality": "npa stage provision asset quality restructured",
+    "underwriting_risk": "ltv underwriting fraud risk policy",
+    "financial_performance": "nim profit performance auction yield",
+    "liquidity_alm": "alm liquidity maturity gap securitisation",
+    "capital_governance": "capital crar tier regulatory governance"
+}
+
+HEADER_ROWS = 30
+
+def sheet_headers(csv_path: str, max_rows: int = HEADER_ROWS) -> str:
+    """Text cells of the first rows of an extracted sheet: titles, column headers and row labels"""
+    try:
+        grid = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False, nrows=max_rows)
+    except (OSError, ValueError, pd.errors.ParserError):
+        return ""
+    cells = dict.fromkeys(cell.strip() for cell in grid.to_numpy().ravel() if cell.strip() and not cell.strip().replace(".", "", 1).isdigit())
+    return " ".join(cells)
+
+def document_text(path: str, entry: Dict[str, Any]) -> str:
+    """What the router indexes for one harvested document: its summaries, analyst notes and sheet headers"""
+    parts = [Path(path).stem.replace("_", " ")]
+    parts += [str(entry[field]) for field in ("content_summary", "summary", "analyst_info") if entry.get(field)]
+    if str(path).lower().endswith(".csv") and Path(path).exists():
+        parts.append(sheet_headers(path))
+    return "\n".join(parts)
+
+def harvested_documents(harvest: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Every document and sheet of a ``document_harvest`` result by path: the set its routing index is built over"""
+    harvest = harvest or {}
+    return {**harvest.get("pdf_analyses", {}), **harvest.get("csv_analyses", {})}
+
+def _cache_id(entry: Dict[str, Any]) -> Optional[str]:
+    return entry.get("cache_id") or entry.get("cache_name")
+
+class DocumentRouter:
+    """Routes each analysis question to the cached documents most likely to answer it.
+
+    One BM25 index over every document's summary, analyst notes and sheet headers is
+    built per harvest and kept on disk under a fingerprint of that text, so later
+    stages (and re-runs) load it instead of rebuilding. A question is sent to at most
+    ``top_k`` documents that clear both an absolute score and a share of the best
+    match; when nothing clears them it falls back to the single most useful document.
+    """
+
+    def __init__(self, index: BM25Index, cache_ids: Dict[str, str], usefulness: Dict[str, float]):
+        self.index = index
+        self.cache_ids = cache_ids
+        self.usefulness = usefulness
+        self.logger = logging.getLogger("DocumentRouter")
+
+    @classmethod
+    def from_documents(cls, documents: Dict[str, Dict[str, Any]], index_dir: Optional[str] = None) -> "DocumentRouter":
+        usable = {path: entry for path, entry in documents.items() if "error" not in entry and _cache_id(entry)}
+        texts = {path: document_text(path, entry) for path, entry in sorted(usable.items())}
+        fingerprint = hashlib.sha256(json.dumps([INDEX_VERSION, texts], sort_keys=True).encode()).hexdigest()[:16]
+        directory = Path(index_dir) if index_dir else DOCUMENT_INDEX_DIR
+        index = BM25Index.load(str(directory / fingerprint))
+        if index is None:
+            index = BM25Index.build(texts)
+            try:
+                index.save(str(directory / fingerprint), metadata={"documents": len(texts)})
+            except OSError as e:
+                logging.getLogger("DocumentRouter").warning(f"Could not save document index: {e}")
+        return cls(
+            index,
+            {path: _cache_id(entry) for path, entry in usable.items()},
+            {path: entry.get("classification", {}).get("indicative_usefulness", 0) for path, entry in usable.items()}
+        )
+
+    def rank(self, question: str, category: Optional[str] = None, top_k: int = ROUTING_TOP_K, min_score: float = ROUTING_MIN_SCORE) -> List[Dict[str, Any]]:
+        query = f"{question} {CATEGORY_TERMS.get(category, '')}"
+        hits = self.index.search(query, top_k=top_k, min_score=min_score)
+        if hits:
+            cutoff = hits[0][1] * ROUTING_RELATIVE_CUTOFF
+            return [{"path": path, "cache_id": self.cache_ids[path], "score": score} for path, score in hits if score >= cutoff]
+        if not self.cache_ids:
+            return []
+        fallback = max(self.cache_ids, key=lambda path: self.usefulness.get(path, 0))
+        return [{"path": fallback, "cache_id": self.cache_ids[fallback], "score": 0.0}]
+
+    def route(self, question: str, category: Optional[str] = None, top_k: int = ROUTING_TOP_K, min_score: float = ROUTING_MIN_SCORE) -> List[str]:
+        """Cache ids for ``question``, best first"""
+        return [hit["cache_id"] for hit in self.rank(question, category, top_k, min_score)]
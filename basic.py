@@ -14,6 +14,9 @@ from google.genai import types
 from google.genai.types import Tool, GenerateContentConfig, GoogleSearch
 from dotenv import load_dotenv
 
+from agentic.base.genai_client import get_shared_client
+from agentic.base.cache_registry import get_cache_registry
+
 class AgentStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -47,7 +50,8 @@ class ProcessLog:
 class BaseAgent:
     def __init__(self, model_id: str = "gemini-2.5-flash-lite-preview-06-17"):
         self.model_id = model_id
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.client = get_shared_client()
+        self.cache_registry = get_cache_registry(self.client)
         self.logger = logging.getLogger(self.__class__.__name__)
     
     def execute(self, process_log: ProcessLog, **kwargs) -> Dict[str, Any]:
@@ -78,9 +82,9 @@ class ResourcePoolerAgent(BaseAgent):
     def _get_or_create_cache(self, file_path: str, ttl: str = "3600s") -> Any:
         cache_name = f"cache_{Path(file_path).stem}"
         
-        for cache in self.client.caches.list():
-            if getattr(cache, "display_name", None) == cache_name:
-                return cache
+        existing = self.cache_registry.lookup(self.model_id, display_name=cache_name)
+        if existing:
+            return existing
         
         uploaded_file = self.client.files.upload(file=file_path)
         cache = self.client.caches.create(
@@ -91,6 +95,7 @@ class ResourcePoolerAgent(BaseAgent):
                 ttl=ttl
             )
         )
+        self.cache_registry.register(cache)
         self.cached_files[file_path] = cache
         return cache
     
@@ -0,0 +1,71 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Every on-disk cache (responses, indexes, manifests, portfolio store) lives under this directory,
+# which is read at import time, so it has to be set before anything from agentic is imported
+os.environ.setdefault("AGENTIC_CACHE_DIR", tempfile.mkdtemp(prefix="agentic-cache-"))
+
+import pytest
+
+from agentic.base import base_agent
+from agentic.base.base_agent import ProcessLog
+from agentic.base.response_cache import ResponseCache
+from agentic.ingestion.harvest_manifest import HarvestManifest
+from agentic.maker_agents.resource_pooler import ResourcePoolerAgent
+
+@pytest.fixture
+def offline_agents(monkeypatch, tmp_path):
+    """Agents construct without an API key: a mock client, no response cache and no uploads"""
+    monkeypatch.setattr(base_agent, "get_shared_client", mock.MagicMock)
+    monkeypatch.setattr(base_agent, "get_response_cache", lambda: ResponseCache(str(tmp_path / "responses.sqlite"), enabled=False))
+    monkeypatch.setattr(base_agent, "get_cache_registry", lambda client: mock.MagicMock())
+    monkeypatch.setattr(base_agent, "get_file_manifest", lambda *args, **kwargs: mock.MagicMock())
+    monkeypatch.setenv("HARVEST_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("HARVEST_SHEETS_DIR", str(tmp_path / "extracted_sheets"))
+    return tmp_path
+
+def _fake_metadata(path: str, file_info):
+    return {
+        "name": Path(path).name,
+        "summary": f"Summary of {Path(path).stem}: asset liability maturity gap and gold loan book",
+        "analyst_info": "Structural liquidity buckets and interest rate sensitivity",
+        "file_path": str(path),
+        "cache_name": f"cachedContents/{Path(path).stem}",
+        "file_id": "",
+        "token_usage": {},
+        "reused_cache": False
+    }
+
+@pytest.fixture
+def run_harvest(offline_agents, monkeypatch):
+    """Harvest a data room offline: ``run_harvest({name: text or bytes})`` returns (process_log, stage result)"""
+    def _run(files):
+        data_dir = offline_agents / "data_room"
+        data_dir.mkdir()
+        for name, content in files.items():
+            (data_dir / name).write_bytes(content if isinstance(content, bytes) else content.encode())
+
+        agent = ResourcePoolerAgent()
+        agent.harvest_manifest = HarvestManifest(str(offline_agents / "harvest_manifest.json"))
+        monkeypatch.setattr(agent, "upload_and_cache_file", lambda path, reuse_cache=True: {"cache_name": f"cachedContents/{Path(path).stem}", "reused": False})
+        monkeypatch.setattr(agent, "_generate_metadata", _fake_metadata)
+        process_log = ProcessLog()
+        result = agent.execute(process_log, str(data_dir))
+        return process_log, result
+    return _run
+
+@pytest.fixture
+def harvest(run_harvest):
+    """A data room holding a PDF and two CSVs"""
+    return run_harvest({
+        "annual_report.pdf": b"%PDF-1.4 not a real pdf",
+        "alm.csv": "Bucket,Inflows,Outflows,Gap\n1-7 days,120,80,40\n8-14 days,60,90,-30\n",
+        "term_sheet.csv": (
+            "Term,Value\n"
+            "DSRA size,3 months of coupon\n"
+            "Tier-I CRAR,18.4% as of Mar-25 against a 10% regulatory minimum\n"
+            "Coupon,9.25% fixed\n"
+        )
+    })
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from agentic.base.base_agent import AgentStatus
+from agentic.maker_agents.analyst import AnalystAgent
+from agentic.maker_agents.associate import AssociateAgent
+
+SHEETS_DIR = Path(__file__).resolve().parent.parent / "extracted_sheets"
+
+def _bundled_sheets(*patterns):
+    return {path.name: path.read_bytes() for pattern in patterns for path in sorted(SHEETS_DIR.glob(pattern))}
+
+def _run_associate(process_log):
+    process_log.log("AnalystAgent", "analyst_verification", {"verified": True}, AgentStatus.COMPLETED)
+    return AssociateAgent().execute(process_log)
+
+def test_analyst_computes_alm_answers_from_the_harvest(run_harvest):
+    process_log, result = run_harvest(_bundled_sheets("alm_*.csv"))
+    analyst = AnalystAgent()
+
+    answers = analyst._computed_answers(process_log.get_stage_data("document_harvest"))
+
+    assert set(answers) == set(analyst.computed_questions)
+    sources = {source for answer in answers.values() for source in answer["sources"]}
+    assert sources == set(result["csv_analyses"])
+
+def test_associate_liquidity_coverage_reads_the_harvested_alm_return(run_harvest):
+    process_log, result = run_harvest(_bundled_sheets("alm_*.csv"))
+
+    liquidity = _run_associate(process_log)["ratio_analyses"]["liquidity_coverage"]
+
+    assert set(liquidity["sources"].values()) == set(result["csv_analyses"])
+    latest = liquidity["ratios_by_year"]["latest_return"]
+    assert latest["one_year_cumulative_gap"] == liquidity["structural_liquidity"]["one_year_cumulative_gap"]
+    assert latest["nii_impact_100bp"] == liquidity["interest_rate_sensitivity"]["nii_impact"]
+
+def test_associate_migration_and_financials_read_the_harvested_sheets(run_harvest):
+    process_log, result = run_harvest(_bundled_sheets("portfolio_cuts_*.csv", "operations_*.csv"))
+
+    ratio_analyses = _run_associate(process_log)["ratio_analyses"]
+
+    migration = ratio_analyses["dpd_migration"]["migration"]
+    assert migration["months"][0] == "2024-01" and migration["months"][-1] == "2025-03"
+    assert set(migration["sources"]) <= set(result["csv_analyses"])
+    assert ratio_analyses["dpd_migration"]["latest_month"]["month"] == "2025-03"
+
+    financial_data = AssociateAgent()._extract_financial_data_from_csvs(result["csv_analyses"])
+    assert financial_data["extraction_summary"]["fiscal_years"] == ["FY2023", "FY2024", "FY2025"]
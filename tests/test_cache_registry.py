@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from agentic.base.cache_registry import ContextCacheRegistry
+from agentic.base.file_manifest import account_fingerprint
+
+EXPIRES = 4_102_444_800.0  # 2100-01-01
+
+def _cache(name, model, display_name="cache_report_abc"):
+    return SimpleNamespace(name=name, display_name=display_name, model=model, expire_time=EXPIRES)
+
+def _registry(tmp_path, caches, api_key="key-a"):
+    client = mock.MagicMock()
+    client.caches.list.return_value = caches
+    return ContextCacheRegistry(client, manifest_path=str(tmp_path / f"{api_key}.json"), api_key=api_key)
+
+def test_lookup_only_returns_caches_for_the_requested_model(tmp_path):
+    registry = _registry(tmp_path, [
+        _cache("cachedContents/flash", "models/gemini-2.5-flash"),
+        _cache("cachedContents/lite", "models/gemini-2.5-flash-lite-preview-06-17")
+    ])
+
+    assert registry.lookup("gemini-2.5-flash", display_name="cache_report_abc").name == "cachedContents/flash"
+    assert registry.lookup("gemini-2.5-flash-lite-preview-06-17", display_name="cache_report_abc").name == "cachedContents/lite"
+    assert registry.lookup("gemini-2.5-pro", display_name="cache_report_abc") is None
+
+def test_registered_content_hash_is_scoped_to_its_model(tmp_path):
+    registry = _registry(tmp_path, [])
+    registry.register(_cache("cachedContents/flash", "models/gemini-2.5-flash"), content_hash="sha")
+
+    assert registry.lookup("gemini-2.5-flash", content_hash="sha").name == "cachedContents/flash"
+    assert registry.lookup("gemini-2.5-pro", content_hash="sha") is None
+
+def test_default_manifest_is_kept_per_account():
+    first = ContextCacheRegistry(mock.MagicMock(), api_key="key-a")
+    second = ContextCacheRegistry(mock.MagicMock(), api_key="key-b")
+
+    assert first.manifest_path.name == f"context_caches_{account_fingerprint('key-a')}.json"
+    assert first.manifest_path != second.manifest_path
@@ -0,0 +1,44 @@
+import pytest
+
+from agentic.base.checkpoint import CheckpointStore
+from agentic.meta_agent import MetaAgent
+
+HARVEST = {"cache_names": ["cachedContents/report", "cachedContents/alm"], "pdf_analyses": {}, "csv_analyses": {}}
+
+@pytest.fixture
+def checkpointed(offline_agents, monkeypatch):
+    """A MetaAgent and a checkpoint holding the harvest and its QA stage"""
+    monkeypatch.chdir(offline_agents)
+    meta = MetaAgent()
+    stage_names = [stage["name"] for stage in meta.pipeline_stages]
+    data_dir = offline_agents / "data_room"
+    data_dir.mkdir()
+    checkpoint = CheckpointStore.for_data_directory(str(data_dir))
+    checkpoint.start(str(data_dir), stage_names, meta.process_log.start_time)
+    checkpoint.save_stage("document_harvest", HARVEST, meta.process_log.to_dicts())
+    checkpoint.save_stage("ingestion_qa", {"ready_for_analysis": True}, meta.process_log.to_dicts())
+    return meta, checkpoint, str(data_dir), stage_names
+
+def _live_caches(meta, *live_names):
+    file_manifest = meta.agents["resource_pooler"].file_manifest
+    file_manifest.content_hash_for_cache.side_effect = lambda cache_name: f"sha-{cache_name}"
+    file_manifest.live_cache.side_effect = lambda content_hash, model_id: (
+        {"name": content_hash[len("sha-"):]} if content_hash[len("sha-"):] in live_names else None
+    )
+
+def test_restore_keeps_a_harvest_whose_caches_are_live(checkpointed):
+    meta, checkpoint, data_dir, stage_names = checkpointed
+    _live_caches(meta, *HARVEST["cache_names"])
+
+    restored = meta._restore_checkpoint(checkpoint, data_dir, stage_names)
+
+    assert list(restored) == ["document_harvest", "ingestion_qa"]
+
+def test_restore_reruns_the_harvest_when_a_cache_expired(checkpointed):
+    meta, checkpoint, data_dir, stage_names = checkpointed
+    _live_caches(meta, "cachedContents/report")
+
+    restored = meta._restore_checkpoint(checkpoint, data_dir, stage_names)
+
+    assert "document_harvest" not in restored
+    meta.agents["resource_pooler"].file_manifest.live_cache.assert_any_call("sha-cachedContents/alm", meta.agents["resource_pooler"].model_id)
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from agentic.retrieval import routing
+from agentic.retrieval.routing import harvested_documents
+from agentic.maker_agents.analyst import AnalystAgent
+
+def test_harvest_returns_and_logs_its_documents(harvest):
+    process_log, result = harvest
+    assert process_log.get_stage_data("document_harvest") is result
+    assert [Path(path).name for path in result["pdf_analyses"]] == ["annual_report.pdf"]
+    assert [Path(path).name for path in result["csv_analyses"]] == ["alm.csv", "term_sheet.csv"]
+    assert result["processing_summary"]["total_files_processed"] == 3
+    assert all(entry["cache_name"] for entry in harvested_documents(result).values())
+
+def test_analyst_loads_the_harvest_routing_index(harvest, offline_agents, monkeypatch):
+    process_log, _ = harvest
+    builds = []
+    build = routing.BM25Index.build
+    monkeypatch.setattr(routing.BM25Index, "build", lambda texts, *args, **kwargs: builds.append(texts) or build(texts, *args, **kwargs))
+
+    analyst = AnalystAgent()
+    routes = analyst._route_questions(harvested_documents(process_log.get_stage_data("document_harvest")))
+
+    assert builds == [], "the analyst rebuilt the routing index instead of loading the harvest's by fingerprint"
+    assert any("cachedContents/alm" in cache_ids for cache_ids in routes.values())
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from agentic.analytics.portfolio_cuts import month_from_name, parse_portfolio_sheet
+
+SHEETS_DIR = Path(__file__).resolve().parent.parent / "extracted_sheets"
+MONTHLY_SHEETS = [path for path in sorted(SHEETS_DIR.glob("portfolio_cuts_*.csv")) if month_from_name(str(path))]
+
+# Where the workbook's own rows do not add up to its Total row: the Dec-24 LTV rows are
+# 68 loans short, and some ticket-size/IRR blocks leave the "PAR >0 days" column at zero
+SOURCE_MISMATCHES = {
+    ("2024-12", "ltv"): {"loans", "principal_outstanding_cr", "standard_cr"},
+    **{(month, section): {"par_0_plus_cr"} for month in ("2024-12", "2025-01", "2025-02", "2025-03") for section in ("ticket_size", "irr")}
+}
+
+@pytest.mark.parametrize("csv_path", MONTHLY_SHEETS, ids=lambda path: path.stem)
+def test_section_rows_sum_to_their_totals(csv_path):
+    month = month_from_name(str(csv_path))
+    sections = parse_portfolio_sheet(str(csv_path))
+    assert sections
+    for name, section in sections.items():
+        assert section.totals, f"{name} has no Total row"
+        # Shares do not add up across rows; every amount and count does
+        for column, total in section.totals.items():
+            if column.endswith("_pct") or column in SOURCE_MISMATCHES.get((month, name), ()):
+                continue
+            assert np.isclose(section.table[column].sum(), total, rtol=1e-6, atol=1e-6), f"{name}.{column}"
+
+def test_numbered_total_row_is_not_data():
+    balance_sheet = parse_portfolio_sheet(str(SHEETS_DIR / "portfolio_cuts_Mar25.csv"))["balance_sheet"]
+    assert balance_sheet.table["segment"].tolist() == ["On Balance Sheet"]
+    assert balance_sheet.table["principal_outstanding_cr"].sum() == pytest.approx(2348.50, abs=0.01)
@@ -0,0 +1,31 @@
+from agentic.base.base_agent import AgentStatus, ProcessLog
+from agentic.base.log_sink import JsonlLogSink, is_blob_ref
+
+LARGE = {"rows": [{"bucket": i, "gap": i * 1.5} for i in range(50)]}
+
+def _sink(tmp_path):
+    return JsonlLogSink(str(tmp_path / "trace.jsonl"), flush_interval_seconds=0, blob_threshold_bytes=256)
+
+def test_completed_payloads_spill_and_read_back(tmp_path):
+    process_log = ProcessLog(sink=_sink(tmp_path))
+    process_log.log("ResourcePoolerAgent", "document_harvest", LARGE, AgentStatus.COMPLETED)
+    process_log.log("ResourcePoolerCheckerAgent", "ingestion_qa", {"ready_for_analysis": True}, AgentStatus.VERIFIED)
+    process_log.close()
+
+    harvest_entry, qa_entry = process_log.entries
+    assert is_blob_ref(harvest_entry.data)
+    assert qa_entry.data == {"ready_for_analysis": True}
+    assert process_log.get_stage_data("document_harvest") == LARGE
+    assert process_log.get_agent_data("ResourcePoolerAgent") == LARGE
+    assert process_log.successful_stage_data()["document_harvest"] == LARGE
+    assert process_log.to_dicts()[0]["data"] == LARGE
+
+def test_restore_from_resolved_entries(tmp_path):
+    process_log = ProcessLog(sink=_sink(tmp_path))
+    process_log.log("ResourcePoolerAgent", "document_harvest", LARGE, AgentStatus.COMPLETED)
+    checkpointed = process_log.to_dicts()
+    process_log.close()
+
+    resumed = ProcessLog()
+    resumed.restore(checkpointed)
+    assert resumed.get_stage_data("document_harvest") == LARGE
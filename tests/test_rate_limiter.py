@@ -0,0 +1,18 @@
+import threading
+
+import pytest
+
+from agentic.base.rate_limiter import AdaptiveRateLimiter
+
+def test_waits_are_counted_by_the_reservation_that_returns_them(monkeypatch):
+    limiter = AdaptiveRateLimiter("test-model", rpm=60, tpm=100_000)
+    monkeypatch.setattr(limiter.requests, "wait_time", lambda amount, now=None: 0.001)
+    monkeypatch.setattr(limiter.tokens, "wait_time", lambda amount, now=None: 0.0)
+
+    threads = [threading.Thread(target=lambda: [limiter._reserve(0) for _ in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.snapshot()["waited_seconds"] == pytest.approx(8 * 2000 * 0.001)
@@ -0,0 +1,37 @@
+from agentic.maker_agents.analyst import AnalystAgent
+from agentic.maker_agents.senior import SeniorAgent
+from agentic.retrieval.routing import harvested_documents
+
+DSRA_QUESTION = "What DSRA size (months of coupon) is stipulated; compare to peer precedents?"
+CRAR_QUESTION = ("capital_governance", "Has Tier-I CRAR ever fallen within 200 bp of regulatory minimum; what remedial actions?")
+
+def test_ic_prompt_carries_harvested_sheet_rows(harvest, monkeypatch):
+    process_log, _ = harvest
+    senior = SeniorAgent()
+    prompts = []
+    monkeypatch.setattr(senior, "_generate_response", lambda prompt, **kwargs: prompts.append(prompt) or ("", {}))
+
+    evidence = senior._retrieve_ic_evidence(process_log.successful_stage_data())
+    senior._assess_transaction_structure({}, evidence)
+
+    assert any("term_sheet.csv" in chunk.source for chunk in evidence[DSRA_QUESTION])
+    assert "3 months of coupon" in prompts[0]
+    assert "None retrieved" not in prompts[0]
+
+def test_analyst_prompt_carries_harvested_sheet_rows(harvest, monkeypatch):
+    _, result = harvest
+    analyst = AnalystAgent()
+    prompts = []
+
+    async def _capture(prompt, schema, **kwargs):
+        prompts.append(prompt)
+        return [], {}
+
+    monkeypatch.setattr(analyst, "_agenerate_structured", _capture)
+    documents = harvested_documents(result)
+    routes = analyst._route_questions(documents)
+    analyst._retrieved_answers(documents, {CRAR_QUESTION: routes[CRAR_QUESTION]})
+
+    assert len(prompts) == 1
+    assert CRAR_QUESTION[1] in prompts[0]
+    assert "18.4% as of Mar-25" in prompts[0]
@@ -0,0 +1,40 @@
+import threading
+
+from agentic.base.base_agent import LATE_WRITE_TAG, AgentStatus, ProcessLog
+from agentic.base.stage_scheduler import StageScheduler
+
+def test_abandoned_stage_frees_its_slot_and_its_late_writes_are_tagged():
+    process_log = ProcessLog()
+    release = threading.Event()
+    finished = threading.Event()
+
+    def execute(stage):
+        if stage["name"] == "slow":
+            release.wait(5)
+            process_log.log("SlowAgent", "slow", {"late": True}, AgentStatus.COMPLETED)
+            finished.set()
+            return {"late": True}
+        process_log.log("FastAgent", stage["name"], {"ok": True}, AgentStatus.COMPLETED)
+        return {"ok": True}
+
+    stages = [
+        {"name": "slow", "timeout_minutes": 0.002, "retry_count": 0},
+        {"name": "fast", "retry_count": 0},
+        {"name": "after_fast", "dependencies": ["fast"], "retry_count": 0}
+    ]
+    # One worker: "fast" and "after_fast" can only run once the abandoned "slow" gives its slot up
+    outcomes = StageScheduler(stages, execute=execute, max_workers=1).run()
+    assert not finished.is_set()
+    release.set()
+    assert finished.wait(5)
+
+    assert outcomes["slow"].status == "timed_out"
+    assert outcomes["fast"].status == "completed" and outcomes["after_fast"].status == "completed"
+    assert process_log.get_stage_data("slow") is None
+    late_entry, = process_log.entries_for_stage("slow")
+    assert late_entry.details.endswith(LATE_WRITE_TAG)
+
+    restored = ProcessLog()
+    restored.restore(process_log.to_dicts())
+    assert restored.get_stage_data("slow") is None
+    assert restored.get_stage_data("fast") == {"ok": True}
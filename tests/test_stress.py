@@ -0,0 +1,14 @@
+import pytest
+
+from agentic.analytics.stress import CapitalPosition, StressEngine
+
+POSITION = CapitalPosition(tier1_capital=400.0, total_assets=2600.0, loan_book=2350.0, total_debt=2100.0, stage3_ratio=0.01, operating_profit=120.0, interest_expense=210.0)
+
+@pytest.mark.parametrize("n_scenarios", [0, -5])
+def test_simulate_rejects_an_empty_scenario_set(n_scenarios):
+    with pytest.raises(ValueError, match="n_scenarios"):
+        StressEngine().simulate(POSITION, n_scenarios=n_scenarios)
+
+def test_single_scenario_has_defined_tails():
+    tail = StressEngine(seed=7).simulate(POSITION, n_scenarios=1)["tail_loss"]
+    assert all(value == value for value in tail.values())